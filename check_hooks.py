@@ -1,34 +1,28 @@
+import argparse
 import os
-import re
+import sys
 
-hooks = ['useState', 'useEffect', 'useCallback', 'useMemo', 'useRef', 'useContext', 'useReducer', 'useLayoutEffect']
-issues = []
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from source_scanner import HOOK_IMPORT_RULE, ResultCache, changed_files, scan
 
-for root, dirs, files in os.walk('src'):
-    for file in files:
-        if file.endswith(('.tsx', '.ts')):
-            filepath = os.path.join(root, file)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
+parser = argparse.ArgumentParser(description='Report React hooks that are used but not imported')
+parser.add_argument('--changed', nargs='?', const='HEAD', metavar='REF',
+                    help='only check files changed against REF (default HEAD), including untracked files')
+parser.add_argument('--staged', action='store_true', help='only check files staged in the index (pre-commit)')
+parser.add_argument('--workers', type=int, default=1, help='check files in N processes (0 = one per CPU)')
+parser.add_argument('--no-cache', action='store_true', help='ignore and do not update the per-file result cache')
+args = parser.parse_args()
 
-                    if 'react' not in content.lower():
-                        continue
+files = None
+if args.staged or args.changed:
+    files = changed_files('src', ref=args.changed, staged=args.staged)
 
-                    import_pattern = r'import.*from ["\']react["\']'
-                    import_match = re.search(import_pattern, content, re.IGNORECASE)
-                    if not import_match:
-                        continue
+cache = None if args.no_cache else ResultCache(os.path.join('.scanner-cache', 'check_hooks.json'))
+findings = scan([HOOK_IMPORT_RULE], 'src', files=files, workers=args.workers or os.cpu_count() or 1, cache=cache)
+if cache:
+    cache.save()
 
-                    import_line = import_match.group(0)
-
-                    for hook in hooks:
-                        hook_pattern = r'\b' + hook + r'\s*\('
-                        if re.search(hook_pattern, content):
-                            if hook not in import_line:
-                                issues.append(f'{filepath}: uses {hook} but not imported')
-            except Exception as e:
-                pass
+issues = [f'{finding.path}: {finding.message}' for finding in findings[HOOK_IMPORT_RULE.name]]
 
 if issues:
     print('MISSING IMPORTS FOUND:')
@@ -3,241 +3,1336 @@
 TypeScript Error Fixer - Automatically fix common TypeScript strict mode errors
 """
 
+import argparse
+import bisect
+import difflib
+import hashlib
+import importlib
+import importlib.util
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+import queue
 import re
 import subprocess
 import sys
-from typing import List, Dict, Tuple
+import threading
+import time
+from typing import Callable, List, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
 import tempfile
 
+TOOL_DIR = '.tsc-fixer'
+TSC_MODES = ('cold', 'incremental', 'watch')
+
+# tsc --watch ends every compile cycle with e.g. "Found 3 errors. Watching for file changes."
+WATCH_CYCLE_END = re.compile(r'Found (\d+) errors?\. Watching for file changes')
+
+# Pattern: file.ts(line,col): error TSxxxx: message
+DIAGNOSTIC_RE = re.compile(r'^(.+?)\((\d+),(\d+)\): error (TS\d+): (.+)$')
+
+
+class Diagnostic(NamedTuple):
+    """One tsc diagnostic; continuation lines are folded into `message`"""
+    file: str
+    line: int
+    col: int
+    code: str
+    message: str
+
+
+def iter_diagnostics(lines: Iterable[str]) -> Iterator[Diagnostic]:
+    """Turn raw tsc output into diagnostics without buffering the whole stream.
+
+    tsc prints the elaboration of a diagnostic (e.g. "Property 'x' is missing...")
+    on indented lines after the header; those are stitched onto the message.
+    """
+    pending = None
+    continuation = []
+
+    for line in lines:
+        if ' error TS' in line:
+            match = DIAGNOSTIC_RE.match(line.rstrip('\r\n'))
+            if match:
+                if pending is not None:
+                    yield _finish_diagnostic(pending, continuation)
+                    continuation = []
+                pending = match
+                continue
+        if pending is None:
+            continue
+        text = line.strip()
+        if text and line[0] in ' \t':
+            continuation.append(text)
+        else:
+            yield _finish_diagnostic(pending, continuation)
+            pending = None
+            continuation = []
+
+    if pending is not None:
+        yield _finish_diagnostic(pending, continuation)
+
+
+def _finish_diagnostic(header: re.Match, continuation: List[str]) -> Diagnostic:
+    file, line_no, col, code, message = header.groups()
+    if continuation:
+        message = '\n'.join([message] + continuation)
+    return Diagnostic(file, int(line_no), int(col), code, message)
+
+
+# Lightweight TypeScript tokenizer and span index: fixers turn diagnostics into
+# column-precise edits against the original text instead of rewriting whole lines
+
+class Token(NamedTuple):
+    kind: str  # 'name', 'number', 'string', 'template', 'regex' or 'punct'
+    value: str
+    start: int
+    end: int
+
+
+class Edit(NamedTuple):
+    start: int
+    end: int
+    text: str
+
+
+TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\\n]|\\.)*'?|"(?:[^"\\\n]|\\.)*"?)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<punct>\?\.(?!\d)|\.\.\.|=>|\?\?|.)
+''', re.VERBOSE | re.DOTALL)
+
+# A '/' after one of these starts a regex literal rather than a division
+REGEX_PREFIX_PUNCT = set('(,=:[!&|?{;+-*%~^')
+REGEX_PREFIX_NAMES = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'yield', 'await'}
+REGEX_LITERAL_RE = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+OPEN_BRACKETS = {'(': ')', '[': ']', '{': '}'}
+CLOSE_BRACKETS = {')', ']', '}'}
+DECLARATION_KEYWORDS = {'const', 'let', 'var'}
+# Tokens after which a newline does not end a statement
+CONTINUATION_TOKENS = set('=,(.[{?:+-*/%&|^<>!~') | {'=>', '?.', '??', '...'}
+# Tokens that continue the previous line's expression when they start a line
+LEADING_CONTINUATION_TOKENS = set('.?:=*/%&|^<>,') | {'=>', '?.', '??'}
+ASSIGNMENT_RE = re.compile(r'\s*(?:=(?![=>])|[-+*/%&|^]=|\*\*=|<<=|>>>?=|\+\+|--|\?\?=|&&=|\|\|=)')
+
+
+def _scan_template(text: str, pos: int) -> int:
+    """Return the offset just past the template literal starting at `pos`"""
+    i, n, depth = pos + 1, len(text), 0
+    while i < n:
+        c = text[i]
+        if c == '\\':
+            i += 2
+            continue
+        if depth == 0:
+            if c == '`':
+                return i + 1
+            if c == '$' and text.startswith('{', i + 1):
+                depth = 1
+                i += 2
+                continue
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        elif c == '`':
+            i = _scan_template(text, i)
+            continue
+        elif c in '\'"':
+            end = text.find(c, i + 1)
+            newline = text.find('\n', i + 1)
+            i = end if end != -1 and (newline == -1 or end < newline) else i
+        i += 1
+    return n
+
+
+def tokenize(text: str) -> List[Token]:
+    """Split TypeScript source into significant tokens (comments and whitespace dropped)"""
+    tokens: List[Token] = []
+    pos, n = 0, len(text)
+    while pos < n:
+        c = text[pos]
+        if c == '`':
+            end = _scan_template(text, pos)
+            tokens.append(Token('template', text[pos:end], pos, end))
+            pos = end
+            continue
+        if c == '"' and tokens and tokens[-1].value == '=':
+            # JSX attribute strings may span lines: placeholder="..."
+            end = text.find('"', pos + 1)
+            if end != -1 and '\n' in text[pos:end]:
+                tokens.append(Token('string', text[pos:end + 1], pos, end + 1))
+                pos = end + 1
+                continue
+        if c == '/' and not text.startswith(('//', '/*'), pos):
+            prev = tokens[-1] if tokens else None
+            if prev is None or (prev.kind == 'punct' and prev.value in REGEX_PREFIX_PUNCT) or \
+                    (prev.kind == 'name' and prev.value in REGEX_PREFIX_NAMES):
+                match = REGEX_LITERAL_RE.match(text, pos)
+                if match:
+                    tokens.append(Token('regex', match.group(), pos, match.end()))
+                    pos = match.end()
+                    continue
+        match = TOKEN_RE.match(text, pos)
+        kind = match.lastgroup
+        if kind not in ('ws', 'comment'):
+            tokens.append(Token(kind, match.group(), pos, match.end()))
+        pos = match.end()
+    return tokens
+
+
+class SourceBuffer:
+    """Token and bracket index over one file, built once and shared by every fixer"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+        self.tokens = tokenize(text)
+        self.token_starts = [token.start for token in self.tokens]
+        # partner[i]: index of the matching bracket; parent[i]: index of the enclosing open bracket
+        self.partner: List[int] = [-1] * len(self.tokens)
+        self.parent: List[int] = [-1] * len(self.tokens)
+        stack: List[int] = []
+        for i, token in enumerate(self.tokens):
+            if token.kind == 'punct' and token.value in CLOSE_BRACKETS and stack and \
+                    OPEN_BRACKETS[self.tokens[stack[-1]].value] == token.value:
+                opener = stack.pop()
+                self.partner[opener], self.partner[i] = i, opener
+            self.parent[i] = stack[-1] if stack else -1
+            if token.kind == 'punct' and token.value in OPEN_BRACKETS:
+                stack.append(i)
+
+    def offset(self, line: int, col: int) -> int:
+        """Convert a 1-based tsc line/column (UTF-16 units) into a string offset"""
+        if line - 1 >= len(self.line_starts):
+            return len(self.text)
+        start = self.line_starts[line - 1]
+        pos, units = start, 1
+        while units < col and pos < len(self.text) and self.text[pos] != '\n':
+            units += 2 if ord(self.text[pos]) > 0xFFFF else 1
+            pos += 1
+        return pos
+
+    def token_index_at(self, offset: int) -> Optional[int]:
+        i = bisect.bisect_right(self.token_starts, offset) - 1
+        if i >= 0 and self.tokens[i].end > offset:
+            return i
+        return None
+
+    def is_punct(self, index: int, value: str) -> bool:
+        return 0 <= index < len(self.tokens) and self.tokens[index].kind == 'punct' and \
+            self.tokens[index].value == value
+
+    def line_token_range(self, line: int) -> range:
+        """Indices of the tokens that start on a 1-based line"""
+        if line - 1 >= len(self.line_starts):
+            return range(0)
+        first = bisect.bisect_left(self.token_starts, self.line_starts[line - 1])
+        stop = len(self.tokens) if line >= len(self.line_starts) else \
+            bisect.bisect_left(self.token_starts, self.line_starts[line])
+        return range(first, stop)
+
+    def is_name(self, index: int, *values: str) -> bool:
+        return 0 <= index < len(self.tokens) and self.tokens[index].kind == 'name' and \
+            (not values or self.tokens[index].value in values)
+
+    def elements(self, opener: int) -> List[Tuple[int, int]]:
+        """Token ranges of the comma-separated items directly inside a bracket pair"""
+        items = []
+        first = None
+        for i in range(opener + 1, self.partner[opener]):
+            if self.parent[i] != opener:
+                continue
+            if self.is_punct(i, ','):
+                if first is not None:
+                    items.append((first, last))
+                first = None
+            else:
+                if first is None:
+                    first = i
+                last = i
+        if first is not None:
+            items.append((first, last))
+        return items
+
+    def element_containing(self, opener: int, index: int) -> Optional[int]:
+        for k, (first, last) in enumerate(self.elements(opener)):
+            if first <= index <= last:
+                return k
+        return None
+
+    def last_token(self, index: int) -> int:
+        """Extend a token index over the bracket group it opens, if any"""
+        return self.partner[index] if self.partner[index] > index else index
+
+    def starts_line(self, index: int) -> bool:
+        prev = self.tokens[index - 1].end if index > 0 else 0
+        return '\n' in self.text[prev:self.tokens[index].start]
+
+    def statement_end(self, first: int) -> int:
+        """Last token index of the statement starting at `first`, honouring ASI at line breaks"""
+        scope = self.parent[first]
+        i = first
+        while True:
+            last = self.last_token(i)
+            nxt = last + 1
+            if nxt >= len(self.tokens) or self.parent[nxt] != scope:
+                return last
+            token = self.tokens[nxt]
+            if token.kind == 'punct' and token.value == ';':
+                return nxt
+            prev = self.tokens[last]
+            if self.starts_line(nxt) and not (prev.kind == 'punct' and prev.value in CONTINUATION_TOKENS) \
+                    and not (token.kind == 'punct' and token.value in LEADING_CONTINUATION_TOKENS):
+                return last
+            i = nxt
+
+    def full_line_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Widen [start, end) to whole lines when nothing else shares those lines"""
+        line_start = self.text.rfind('\n', 0, start) + 1
+        if self.text[line_start:start].strip():
+            return start, end
+        line_end = self.text.find('\n', end)
+        line_end = len(self.text) if line_end == -1 else line_end + 1
+        if self.text[end:line_end].strip():
+            return start, end
+        return line_start, line_end
+
+
+class EditPlan:
+    """Edits collected from all fixers for one file and applied in a single pass"""
+
+    def __init__(self, source: SourceBuffer):
+        self.source = source
+        self.edits: List[Edit] = []
+        # opener token index -> indices of list elements to drop, merged in finish()
+        self.element_removals: Dict[int, set] = {}
+
+    def pending(self) -> int:
+        """Number of edits recorded so far, used to tell whether a fixer did anything"""
+        return len(self.edits) + sum(len(removed) for removed in self.element_removals.values())
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        self.edits.append(Edit(start, end, text))
+
+    def insert(self, offset: int, text: str) -> None:
+        self.edits.append(Edit(offset, offset, text))
+
+    def remove_element(self, opener: int, element: int) -> None:
+        self.element_removals.setdefault(opener, set()).add(element)
+
+    def remove_statement(self, first: int, last: int) -> None:
+        tokens = self.source.tokens
+        self.replace(*self.source.full_line_span(tokens[first].start, tokens[last].end), '')
+
+    def finish(self) -> List[Edit]:
+        """Resolve list-element removals into concrete edits"""
+        src = self.source
+        tokens = src.tokens
+        for opener, removed in self.element_removals.items():
+            items = src.elements(opener)
+            kept = [k for k in range(len(items)) if k not in removed]
+            if not kept:
+                self.remove_list(opener)
+                continue
+            if tokens[opener].value == '[':
+                # Array patterns are positional: only a trailing run can be dropped
+                removed = {k for k in removed if k > kept[-1]}
+            for k in sorted(removed):
+                if k - 1 in removed:
+                    continue
+                run_end = k
+                while run_end + 1 in removed:
+                    run_end += 1
+                if run_end + 1 < len(items):
+                    start, end = tokens[items[k][0]].start, tokens[items[run_end + 1][0]].start
+                else:
+                    start = tokens[items[k - 1][1]].end
+                    end = tokens[items[run_end][1]].end
+                self.replace(start, end, '')
+        return self.edits
+
+    def remove_list(self, opener: int) -> None:
+        """Every named import is unused: drop the braces, or the whole import statement"""
+        src = self.source
+        before = opener - 1
+        if src.is_name(before, 'type') and src.is_name(before - 1, 'import'):
+            before -= 1
+        if src.is_name(before, 'import'):
+            self.remove_statement(before, src.statement_end(before))
+        elif src.is_punct(before, ',') and src.is_name(before - 1) and src.is_name(before - 2, 'import'):
+            # import Default, { a } from '...'  ->  import Default from '...'
+            self.replace(src.tokens[before].start, src.tokens[src.partner[opener]].end, '')
+
+    def apply(self) -> str:
+        """Apply all edits in one pass; an edit overlapping an earlier one is skipped"""
+        text = self.source.text
+        out = []
+        pos = 0
+        for edit in sorted(set(self.finish()), key=lambda e: (e.start, e.end)):
+            if edit.start < pos:
+                continue
+            out.append(text[pos:edit.start])
+            out.append(edit.text)
+            pos = edit.end
+        out.append(text[pos:])
+        return ''.join(out)
+
+
+class FileFixResult(NamedTuple):
+    """Outcome of fixing one file, produced by a worker and merged by run_fixes"""
+    file: str
+    attempted: int
+    original: List[str]
+    fixed: Optional[List[str]]  # None when the fixers left the file unchanged
+    rule_stats: Dict[str, 'RuleStats'] = {}
+
+    @property
+    def changed(self) -> bool:
+        return self.fixed is not None
+
+
+class IterationStats(NamedTuple):
+    """Error counts and where the time went for one fix-and-recheck iteration"""
+    iteration: int
+    errors_before: int
+    errors_after: int
+    files_written: int
+    tsc_seconds: float
+    fix_seconds: float
+
+
+class FixRule(NamedTuple):
+    """A fixer for one or more TS codes; `func(fixer, error, plan)` records edits on the plan"""
+    name: str
+    codes: Tuple[str, ...]
+    func: Callable[['TypeScriptErrorFixer', Diagnostic, EditPlan], None]
+
+
+# Every known rule by name; built-ins register below, plugins via --plugin
+FIX_RULES: Dict[str, FixRule] = {}
+
+
+def register_fixer(*codes: str, name: Optional[str] = None):
+    """Decorator registering a fixer for the given TS codes.
+
+    Plugins are plain Python files that do
+    `from fix_typescript_errors import register_fixer` and decorate
+    `def fix_something(fixer, error, plan)` functions.
+    """
+    def decorator(func):
+        rule = FixRule(name or func.__name__, codes, func)
+        FIX_RULES[rule.name] = rule
+        return func
+    return decorator
+
+
+def load_plugin(spec: str) -> None:
+    """Import a fixer plugin given as a .py path or a module name"""
+    if spec.endswith('.py') or os.path.exists(spec):
+        module_name = 'tsfix_plugin_' + hashlib.sha256(os.path.abspath(spec).encode()).hexdigest()[:12]
+        module_spec = importlib.util.spec_from_file_location(module_name, spec)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        importlib.import_module(spec)
+
+
+class RuleStats:
+    """Per-rule counters collected while planning fixes"""
+    __slots__ = ('invocations', 'edits', 'noops', 'seconds')
+
+    def __init__(self):
+        self.invocations = 0
+        self.edits = 0
+        self.noops = 0
+        self.seconds = 0.0
+
+    def merge(self, other: 'RuleStats') -> None:
+        self.invocations += other.invocations
+        self.edits += other.edits
+        self.noops += other.noops
+        self.seconds += other.seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'invocations': self.invocations,
+            'edits': self.edits,
+            'noops': self.noops,
+            'seconds': round(self.seconds, 6),
+            'hit_rate': round((self.invocations - self.noops) / self.invocations, 4) if self.invocations else 0.0,
+        }
+
+
+# Fixer instance owned by each pool worker; created once by _init_fix_worker
+_worker_fixer = None
+
+
+def _init_fix_worker(project_root: str, plugins: Tuple[str, ...] = ()) -> None:
+    global _worker_fixer
+    # Under spawn this module runs as __mp_main__ when the parent was started as a script; plugins
+    # import register_fixer by name and must register into this copy's FIX_RULES, not a fresh one
+    sys.modules['fix_typescript_errors'] = sys.modules[__name__]
+    for plugin in plugins:
+        load_plugin(plugin)
+    _worker_fixer = TypeScriptErrorFixer(project_root)
+
+
+def _fix_file_worker(job: Tuple[str, List[Diagnostic]]) -> FileFixResult:
+    filepath, errors = job
+    return _worker_fixer.plan_file_fixes(filepath, errors)
+
+
+_JSONC_RE = re.compile(r'("(?:[^"\\]|\\.)*")|//[^\n]*|/\*.*?\*/|,(?=\s*[}\]])', re.DOTALL)
+
+
+def load_tsconfig(path: str) -> dict:
+    """tsconfig.json allows comments and trailing commas; an unreadable file means tsc's defaults"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return json.loads(_JSONC_RE.sub(lambda m: m.group(1) or '', text))
+    except (OSError, ValueError):
+        return {}
+
+
+def tsconfig_pattern(pattern: str, is_include: bool = False) -> re.Pattern:
+    """Compile a tsconfig include/exclude glob; a bare directory covers everything below it"""
+    pattern = pattern.replace('\\', '/').strip('/')
+    while pattern.startswith('./'):
+        pattern = pattern[2:]
+    last = pattern.rsplit('/', 1)[-1]
+    if is_include and '*' not in last and '?' not in last and '.' not in last:
+        pattern += '/**/*'
+    out = []
+    for part in re.split(r'(\*\*/|\*|\?)', pattern):
+        out.append({'**/': '(?:[^/]+/)*', '*': '[^/]*', '?': '[^/]'}.get(part, re.escape(part)))
+    # An excluded directory also excludes everything inside it
+    return re.compile(''.join(out) + ('$' if is_include else '(?:/.*)?$'))
+
+
+class FixCache:
+    """Content-addressed cache of tsc diagnostics and fix results under TOOL_DIR/cache.
+
+    Diagnostics are keyed by a digest of every source tsc compiles (tsconfig `include`
+    minus `exclude`) plus the tsc version, tsconfig and lockfile, so an unchanged tree
+    skips tsc entirely. Fix results are keyed by (file digest, that file's diagnostics,
+    fixer and plugin code), so unchanged files skip fixing.
+    """
+
+    # Never part of a compilation unless tsconfig names them explicitly
+    SKIP_DIRS = {'node_modules', '.git', TOOL_DIR}
+
+    def __init__(self, project_root: str, max_bytes: int = 64 * 1024 * 1024):
+        self.project_root = project_root
+        self.max_bytes = max_bytes
+        self.dir = os.path.join(project_root, TOOL_DIR, 'cache')
+        self.index_path = os.path.join(self.dir, 'files.json')
+        # path -> [mtime_ns, size, sha256], so unchanged files are never re-hashed
+        self.file_index: Dict[str, list] = {}
+        self.index_dirty = False
+        self._environment: Optional[str] = None
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.file_index = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def file_digest(self, filepath: str) -> str:
+        stat = os.stat(filepath)
+        entry = self.file_index.get(filepath)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        with open(filepath, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self.file_index[filepath] = [stat.st_mtime_ns, stat.st_size, digest]
+        self.index_dirty = True
+        return digest
+
+    def environment_digest(self) -> str:
+        """Digest of everything besides the sources that changes what tsc or the fixers report"""
+        if self._environment is None:
+            h = hashlib.sha256()
+            for name in ('tsconfig.json', 'package-lock.json', 'node_modules/typescript/package.json'):
+                path = os.path.join(self.project_root, name)
+                h.update(name.encode())
+                h.update(self.file_digest(path).encode() if os.path.exists(path) else b'-')
+            h.update(self.file_digest(os.path.abspath(__file__)).encode())
+            self._environment = h.hexdigest()
+        return self._environment
+
+    def compiled_files(self) -> Iterator[str]:
+        """Relative paths of the sources tsconfig.json puts in the compilation, in walk order"""
+        config = load_tsconfig(os.path.join(self.project_root, 'tsconfig.json'))
+        options = config.get('compilerOptions') or {}
+        suffixes = ('.ts', '.tsx') + (('.js', '.jsx') if options.get('allowJs') else ())
+        include = [tsconfig_pattern(pattern, is_include=True) for pattern in config.get('include', ['**/*'])]
+        exclude = [tsconfig_pattern(pattern) for pattern in config.get('exclude', ['node_modules'])]
+        for root, dirs, files in os.walk(self.project_root):
+            rel_root = os.path.relpath(root, self.project_root).replace(os.sep, '/')
+            rel_root = '' if rel_root == '.' else rel_root + '/'
+            dirs[:] = sorted(d for d in dirs if d not in self.SKIP_DIRS and
+                             not any(pattern.match(rel_root + d) for pattern in exclude))
+            for name in sorted(files):
+                rel = rel_root + name
+                if name.endswith(suffixes) and any(pattern.match(rel) for pattern in include) and \
+                        not any(pattern.match(rel) for pattern in exclude):
+                    yield rel
+
+    def tree_digest(self) -> str:
+        h = hashlib.sha256(self.environment_digest().encode())
+        for rel in self.compiled_files():
+            h.update(rel.encode())
+            h.update(self.file_digest(os.path.join(self.project_root, rel)).encode())
+        return h.hexdigest()
+
+    def rules_digest(self, rules: Iterable[FixRule]) -> str:
+        """Digest of the rule names and the code of every module defining them, plugins included"""
+        h = hashlib.sha256()
+        sources = set()
+        for rule in sorted(rules, key=lambda rule: rule.name):
+            h.update(rule.name.encode() + b'\0')
+            sources.add(os.path.abspath(rule.func.__code__.co_filename))
+        for path in sorted(sources):
+            h.update(self.file_digest(path).encode() if os.path.exists(path) else path.encode())
+        return h.hexdigest()
+
+    def fix_key(self, filepath: str, errors: List[Diagnostic], salt: str = '') -> str:
+        h = hashlib.sha256(self.environment_digest().encode())
+        h.update(salt.encode())
+        h.update(self.file_digest(filepath).encode())
+        for error in sorted(errors):
+            h.update(repr(tuple(error)).encode())
+        return h.hexdigest()
+
+    def _entry_path(self, kind: str, key: str) -> str:
+        return os.path.join(self.dir, f'{kind}-{key}.json')
+
+    def load(self, kind: str, key: str):
+        path = self._entry_path(kind, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # eviction drops the least recently used entries first
+        return value
+
+    def store(self, kind: str, key: str, value) -> None:
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.entry-', dir=self.dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, self._entry_path(kind, key))
+        except OSError as e:
+            print(f"Error writing cache entry: {e}")
+
+    def save(self) -> None:
+        """Persist the file digest index and trim the cache to its size budget"""
+        if self.index_dirty:
+            self.store_index()
+        entries = []
+        try:
+            for name in os.listdir(self.dir):
+                path = os.path.join(self.dir, name)
+                if path != self.index_path:
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.unlink(path)
+            total -= size
+
+    def store_index(self) -> None:
+        live = {path: entry for path, entry in self.file_index.items() if os.path.exists(path)}
+        os.makedirs(self.dir, exist_ok=True)
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(live, f)
+        self.index_dirty = False
+
+
+class TscWatchSession:
+    """Long-lived `tsc --watch` process that hands out diagnostics per compile cycle"""
+
+    def __init__(self, project_root: str, cycle_timeout: float = 600.0):
+        self.project_root = project_root
+        self.cycle_timeout = cycle_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.reader: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Spawn tsc in watch mode and start pumping its output into the queue"""
+        self.process = subprocess.Popen(
+            ['npx', 'tsc', '--noEmit', '--watch', '--preserveWatchOutput', '--pretty', 'false'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            cwd=self.project_root
+        )
+        self.reader = threading.Thread(target=self._pump, daemon=True)
+        self.reader.start()
+
+    def _pump(self) -> None:
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip('\n'))
+        self.lines.put(None)  # EOF marker
+
+    def iter_cycle(self) -> Iterator[str]:
+        """Yield output lines of the next compile cycle as tsc produces them"""
+        if self.process is None:
+            self.start()
+
+        while True:
+            try:
+                line = self.lines.get(timeout=self.cycle_timeout)
+            except queue.Empty:
+                print(f"tsc --watch produced no result within {self.cycle_timeout:.0f}s")
+                return
+            if line is None:
+                print("tsc --watch exited unexpectedly")
+                return
+            if WATCH_CYCLE_END.search(line):
+                return
+            yield line
+
+    def next_cycle(self) -> List[str]:
+        """Block until tsc finishes its next compile cycle and return that cycle's output"""
+        return list(self.iter_cycle())
+
+    def stop(self) -> None:
+        """Terminate the watch process"""
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
 class TypeScriptErrorFixer:
-    def __init__(self, project_root: str):
+    def __init__(self, project_root: str, tsc_mode: str = 'cold', workers: int = 1,
+                 dry_run: bool = False, diff_path: Optional[str] = None, max_iterations: int = 1,
+                 cache: Optional[FixCache] = None, plugins: Iterable[str] = ()):
         self.project_root = project_root
-        self.error_patterns = {
-            'TS6133': self.fix_unused_variable,
-            'TS2532': self.fix_potentially_undefined,
-            'TS2345': self.fix_argument_type_mismatch,
-            'TS2322': self.fix_type_assignment,
-        }
+        self.plugins = tuple(plugins)
+        for plugin in self.plugins:
+            load_plugin(plugin)
+        self.cache = cache
+        self.max_iterations = max(1, max_iterations)
+        if self.max_iterations > 1 and tsc_mode == 'cold':
+            # Every iteration re-checks the tree; only pay for the files the previous pass touched
+            print("Iterative mode: switching tsc to incremental")
+            tsc_mode = 'incremental'
+        self.dry_run = dry_run
+        self.diff_path = diff_path
+        self.tsc_mode = tsc_mode
+        self.workers = workers or os.cpu_count() or 1
+        self.watch_session: Optional[TscWatchSession] = None
+        # TS code -> rules to run, in registration order
+        self.error_patterns: Dict[str, List[FixRule]] = {}
+        for rule in FIX_RULES.values():
+            for code in rule.codes:
+                self.error_patterns.setdefault(code, []).append(rule)
+        self.rule_stats: Dict[str, RuleStats] = {name: RuleStats() for name in FIX_RULES}
+        self.cached_files = 0
+
+    def tsc_command(self) -> List[str]:
+        """Build the one-shot tsc command line for the configured mode"""
+        cmd = ['npx', 'tsc', '--noEmit']
+        if self.tsc_mode == 'incremental':
+            # A dedicated .tsbuildinfo lets the recheck skip every file we did not touch
+            build_info = os.path.join(TOOL_DIR, 'tsconfig.tsbuildinfo')
+            os.makedirs(os.path.join(self.project_root, TOOL_DIR), exist_ok=True)
+            cmd += ['--incremental', '--tsBuildInfoFile', build_info, '--pretty', 'false']
+        return cmd
+
+    def stream_tsc_output(self) -> Iterator[str]:
+        """Run TypeScript compiler and yield its output line by line"""
+        if self.tsc_mode == 'watch':
+            if self.watch_session is None:
+                self.watch_session = TscWatchSession(self.project_root)
+            yield from self.watch_session.iter_cycle()
+            return
 
-    def run_tsc_check(self) -> List[str]:
-        """Run TypeScript compiler and get error output"""
         try:
-            result = subprocess.run(
-                ['npx', 'tsc', '--noEmit'],
-                capture_output=True,
+            # tsc reports diagnostics on stdout; stderr only carries npx/node failures
+            process = subprocess.Popen(
+                self.tsc_command(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
                 cwd=self.project_root
             )
-            return result.stderr.split('\n') if result.stderr else []
         except Exception as e:
             print(f"Error running tsc: {e}")
-            return []
+            return
+
+        try:
+            for line in process.stdout:
+                yield line.rstrip('\n')
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+
+    def run_tsc_check(self) -> List[str]:
+        """Run TypeScript compiler and get error output"""
+        return list(self.stream_tsc_output())
+
+    def iter_tsc_diagnostics(self) -> Iterator[Diagnostic]:
+        """Run TypeScript compiler and yield parsed diagnostics as they arrive"""
+        return iter_diagnostics(self.stream_tsc_output())
+
+    def close(self) -> None:
+        """Release the long-lived tsc process, if any, and flush the cache"""
+        if self.cache is not None:
+            self.cache.save()
+        if self.watch_session is not None:
+            self.watch_session.stop()
+            self.watch_session = None
 
-    def parse_error(self, error_line: str) -> Dict[str, str]:
+    def parse_error(self, error_line: str) -> Optional[Diagnostic]:
         """Parse TypeScript error line"""
-        # Pattern: file.ts(line,col): error TSxxxx: message
-        pattern = r'^(.+?)\((\d+),(\d+)\): error (TS\d+): (.+)$'
-        match = re.match(pattern, error_line)
-
-        if match:
-            return {
-                'file': match.group(1),
-                'line': int(match.group(2)),
-                'col': int(match.group(3)),
-                'code': match.group(4),
-                'message': match.group(5)
-            }
-        return {}
+        return next(iter_diagnostics([error_line]), None)
 
-    def read_file_lines(self, filepath: str) -> List[str]:
-        """Read file and return lines"""
+    def read_file_text(self, filepath: str) -> str:
+        """Read file and return its content"""
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                return f.readlines()
+                return f.read()
         except Exception as e:
             print(f"Error reading {filepath}: {e}")
-            return []
+            return ''
 
     def write_file_lines(self, filepath: str, lines: List[str]) -> bool:
         """Write lines to file"""
+        return self.write_files_atomically({filepath: lines}) == 1
+
+    def write_files_atomically(self, edits: Dict[str, List[str]]) -> int:
+        """Write a batch of files: stage every temp file first, then rename them into place.
+
+        If staging fails nothing is touched. If a rename fails partway, the files already
+        replaced are restored from their original bytes and the error is re-raised.
+        Returns the number of files written.
+        """
+        staged = []
+        originals: Dict[str, bytes] = {}
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
-            return True
+            for filepath, lines in sorted(edits.items()):
+                with open(filepath, 'rb') as f:
+                    originals[filepath] = f.read()
+                fd, tmp_path = tempfile.mkstemp(prefix='.tsfix-', dir=os.path.dirname(filepath) or '.')
+                staged.append((tmp_path, filepath))
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.writelines(lines)
+                os.chmod(tmp_path, os.stat(filepath).st_mode & 0o7777)
         except Exception as e:
-            print(f"Error writing {filepath}: {e}")
-            return False
+            print(f"Error staging {filepath}: {e}")
+            self._discard_staged(staged)
+            return 0
 
-    def fix_unused_variable(self, error: Dict[str, str], lines: List[str]) -> List[str]:
-        """Fix TS6133 unused variable/import errors"""
-        line_idx = error['line'] - 1
-        line = lines[line_idx]
+        replaced = []
+        try:
+            for tmp_path, filepath in staged:
+                os.replace(tmp_path, filepath)
+                replaced.append(filepath)
+        except BaseException:
+            self._discard_staged(staged)
+            for filepath in replaced:
+                self._restore_original(filepath, originals[filepath])
+            raise
+        return len(staged)
+
+    @staticmethod
+    def _discard_staged(staged: List[Tuple[str, str]]) -> None:
+        for tmp_path, _ in staged:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    @staticmethod
+    def _restore_original(filepath: str, data: bytes) -> None:
+        """Put a replaced file's original bytes back, again through a temp file and a rename"""
+        fd, tmp_path = tempfile.mkstemp(prefix='.tsfix-', dir=os.path.dirname(filepath) or '.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, os.stat(filepath).st_mode & 0o7777)
+        os.replace(tmp_path, filepath)
+
+    def format_diff(self, results: List[FileFixResult]) -> str:
+        """Render the planned edits as one unified diff relative to the project root"""
+        chunks = []
+        for result in results:
+            if not result.changed:
+                continue
+            rel = os.path.relpath(result.file, self.project_root).replace(os.sep, '/')
+            chunks.extend(difflib.unified_diff(result.original, result.fixed,
+                                               fromfile=f'a/{rel}', tofile=f'b/{rel}'))
+        return ''.join(chunks)
+
+    def find_name_token(self, src: SourceBuffer, error: Diagnostic, name: str) -> Optional[int]:
+        """Token index of `name` at the diagnostic position, or on the same line as a fallback"""
+        index = src.token_index_at(src.offset(error.line, error.col))
+        if index is not None and src.is_name(index, name):
+            return index
+        for i in src.line_token_range(error.line):
+            if src.is_name(i, name):
+                return i
+        return None
+
+    def is_import_list(self, src: SourceBuffer, opener: int) -> bool:
+        before = opener - 1
+        if src.is_name(before, 'type'):
+            before -= 1
+        elif src.is_punct(before, ','):
+            before -= 2
+        return src.is_name(before, 'import')
 
+    def is_parameter_list(self, src: SourceBuffer, opener: int) -> bool:
+        after = src.partner[opener] + 1
+        return src.partner[opener] > opener and (src.is_punct(after, '=>') or src.is_punct(after, '{') or
+                                                 src.is_punct(after, ':'))
+
+    def is_binding_pattern(self, src: SourceBuffer, opener: int) -> bool:
+        """True for [..]/{..} destructuring in a declaration or a parameter list"""
+        outer = opener
+        # Climb out of nested patterns such as const { a: { b } } = ...
+        while src.parent[outer] >= 0 and src.tokens[src.parent[outer]].value in ('[', '{') and \
+                any(src.is_punct(outer - 1, value) for value in (',', '[', '{', ':', '...')):
+            outer = src.parent[outer]
+        if src.is_name(outer - 1, *DECLARATION_KEYWORDS):
+            return src.is_punct(src.partner[outer] + 1, '=') or src.is_punct(src.partner[outer] + 1, ':')
+        paren = src.parent[outer]
+        return paren >= 0 and src.tokens[paren].value == '(' and self.is_parameter_list(src, paren)
+
+    def comment_out(self, plan: EditPlan, first: int, last: int) -> None:
+        src = plan.source
+        line_start = src.text.rfind('\n', 0, src.tokens[first].start) + 1
+        while line_start < src.tokens[last].end:
+            indent = len(src.text[line_start:]) - len(src.text[line_start:].lstrip(' \t'))
+            plan.insert(line_start + indent, '// ')
+            next_line = src.text.find('\n', line_start)
+            if next_line == -1:
+                break
+            line_start = next_line + 1
+
+    @register_fixer('TS6133')
+    def fix_unused_variable(self, error: Diagnostic, plan: EditPlan) -> None:
+        """Fix TS6133 unused variable/import errors"""
         # Extract the unused identifier from the error message
-        match = re.search(r"'([^']+)' is declared but its value is never read", error['message'])
+        match = re.search(r"'([^']+)' is declared but its value is never read", error.message)
         if not match:
-            return lines
+            return
 
         unused_name = match.group(1)
+        src = plan.source
+        index = self.find_name_token(src, error, unused_name)
+        if index is None:
+            return
+        opener = src.parent[index]
+        opener_value = src.tokens[opener].value if opener >= 0 else None
+        prev = index - 1
 
-        # Handle import statements
-        if 'import' in line:
-            # Remove from import statement
-            line = self.remove_from_import(line, unused_name)
-            lines[line_idx] = line
-
-            # If import line becomes empty, remove it
-            if re.match(r'^\s*import\s*{\s*}\s*from', line):
-                lines[line_idx] = ''
-
-        # Handle variable declarations
-        elif unused_name.startswith('set') and 'useState' in line:
-            # For useState destructuring, keep only the getter
-            pattern = r'const\s*\[\s*(\w+)\s*,\s*' + re.escape(unused_name) + r'\s*\]'
-            match = re.search(pattern, line)
-            if match:
-                getter = match.group(1)
-                lines[line_idx] = re.sub(pattern, f'const [{getter}]', line)
+        # Handle import statements, including named imports spread over several lines
+        if opener_value == '{' and self.is_import_list(src, opener):
+            element = src.element_containing(opener, index)
+            if element is not None:
+                plan.remove_element(opener, element)
+            return
 
-        elif 'const' in line or 'let' in line or 'var' in line:
-            # For regular variables, comment out or remove the line
+        namespace = src.is_name(prev, 'as') and src.is_punct(prev - 1, '*')
+        if src.is_name(prev, 'import') or namespace:
+            first = prev - 2 if namespace else prev
+            if src.is_punct(index + 1, ','):
+                # import a, { b } from '...'  ->  import { b } from '...'
+                plan.replace(src.tokens[first + 1].start, src.tokens[index + 2].start, '')
+            elif src.is_punct(first, ','):
+                # import a, * as b from '...'  ->  import a from '...'
+                plan.replace(src.tokens[first].start, src.tokens[index].end, '')
+            elif src.is_name(first, 'import'):
+                plan.remove_statement(first, src.statement_end(first))
+            return
+
+        # Handle destructuring, e.g. keep only the getter of a useState pair
+        if opener_value in ('[', '{') and self.is_binding_pattern(src, opener):
+            if opener_value == '{' and any(src.is_punct(i, '...') and src.parent[i] == opener
+                                           for i in range(opener, src.partner[opener])):
+                return  # dropping a property would change what ...rest collects
+            element = src.element_containing(opener, index)
+            if element is not None:
+                plan.remove_element(opener, element)
+            return
+
+        # Unused parameters get an underscore prefix, which tsc treats as intentional
+        if (opener_value == '(' and self.is_parameter_list(src, opener)) or src.is_punct(index + 1, '=>'):
+            if not unused_name.startswith('_'):
+                plan.insert(src.tokens[index].start, '_')
+            return
+
+        # Handle variable declarations spanning any number of lines
+        if src.is_name(prev, *DECLARATION_KEYWORDS):
+            last = src.statement_end(prev)
+            if any(src.is_punct(i, ',') and src.parent[i] == src.parent[prev] for i in range(prev, last + 1)):
+                return  # several declarators share this statement
             if unused_name in ['previousValue', 'request', 'body', 'id']:
                 # Comment out instead of removing
-                lines[line_idx] = '  // ' + line.lstrip()
+                self.comment_out(plan, prev, last)
             else:
-                # Remove the variable declaration line
-                lines[line_idx] = ''
-
-        return lines
-
-    def remove_from_import(self, import_line: str, unused_name: str) -> str:
-        """Remove unused import from import statement"""
-        # Handle different import patterns
-        patterns = [
-            # Named import: import { a, b, c } from 'module'
-            (r'import\s*{\s*([^}]+)\s*}\s*from', self.remove_from_named_imports),
-            # Default import with named: import Default, { a, b } from 'module'
-            (r'import\s+\w+\s*,\s*{\s*([^}]+)\s*}\s*from', self.remove_from_named_imports),
-        ]
-
-        for pattern, handler in patterns:
-            match = re.search(pattern, import_line)
-            if match:
-                return handler(import_line, unused_name, match)
-
-        return import_line
-
-    def remove_from_named_imports(self, import_line: str, unused_name: str, match: re.Match) -> str:
-        """Remove from named imports"""
-        imports_part = match.group(1)
-        imports = [imp.strip() for imp in imports_part.split(',')]
-        imports = [imp for imp in imports if imp and imp != unused_name]
+                # Remove the variable declaration
+                plan.remove_statement(prev, last)
 
-        if not imports:
-            return ''  # Empty import
+    @register_fixer('TS2532', 'TS18048')
+    def fix_potentially_undefined(self, error: Diagnostic, plan: EditPlan) -> None:
+        """Fix TS18048 potentially undefined errors; TS2532 has no span, so it is left for a human"""
+        message = error.message
+        if not ('.possibly undefined' in message or 'Object is possibly' in message or
+                "is possibly 'undefined'" in message):
+            return
 
-        new_imports = ', '.join(imports)
-        return import_line.replace(match.group(1), new_imports)
+        src = plan.source
+        index = src.token_index_at(src.offset(error.line, error.col))
+        if index is None or src.is_name(index - 1, 'new'):
+            return
 
-    def fix_potentially_undefined(self, error: Dict[str, str], lines: List[str]) -> List[str]:
-        """Fix TS2532 potentially undefined errors"""
-        line_idx = error['line'] - 1
-        line = lines[line_idx]
+        # TS18048 names the expression ('user.profile' is possibly 'undefined'); TS2532 only points at
+        # the start of it, and guessing where `arr[0].x` or `getUser().name` ends breaks the chain
+        named = re.match(r"'(.+?)' is possibly", message)
+        if not named:
+            return
+        end = src.tokens[index].start + len(named.group(1))
+        if src.text[src.tokens[index].start:end] != named.group(1):
+            return
+        last = bisect.bisect_left(src.token_starts, end) - 1
 
-        # Add optional chaining or null checks
-        if '.possibly undefined' in error['message'] or 'Object is possibly' in error['message']:
-            # Simple fixes for common patterns
-            if '?.(' in line or '?.' in line:
-                return lines  # Already has optional chaining
+        link = last + 1
+        if not (src.is_punct(link, '.') or src.is_punct(link, '[') or src.is_punct(link, '(')):
+            return
 
-            # Add non-null assertion for now (can be refined later)
-            if '.' in line and not '?.' in line:
-                # Find the object access and add optional chaining
-                line = re.sub(r'(\w+)\.(\w+)', r'\1?.\2', line)
-                lines[line_idx] = line
+        # a?.b = 1 is not valid, so leave assignment targets alone
+        chain_end = link
+        while src.is_punct(chain_end, '.') or src.is_punct(chain_end, '?.') or src.is_punct(chain_end, '!') or \
+                src.is_punct(chain_end, '[') or src.is_punct(chain_end, '('):
+            if src.is_punct(chain_end, '.') or src.is_punct(chain_end, '?.'):
+                chain_end = src.last_token(chain_end + 1) + 1
+            else:
+                chain_end = src.last_token(chain_end) + 1
+        if ASSIGNMENT_RE.match(src.text, src.tokens[chain_end - 1].end):
+            return
 
-        return lines
+        if src.is_punct(link, '.'):
+            plan.replace(src.tokens[link].start, src.tokens[link].end, '?.')
+        else:
+            plan.insert(src.tokens[link].start, '?.')
 
-    def fix_argument_type_mismatch(self, error: Dict[str, str], lines: List[str]) -> List[str]:
+    @register_fixer('TS2345')
+    def fix_argument_type_mismatch(self, error: Diagnostic, plan: EditPlan) -> None:
         """Fix TS2345 argument type mismatch errors"""
-        line_idx = error['line'] - 1
-        line = lines[line_idx]
-
         # Handle string | undefined -> string conversions
-        if 'string | undefined' in error['message'] and 'string' in error['message']:
-            # Add null coalescing operator
-            if 'setFirstName(' in line or 'setLastName(' in line:
-                line = re.sub(r'(\w+)\)', r'\1 || "")', line)
-                lines[line_idx] = line
+        if not re.search(r"of type 'string \| undefined' is not assignable to parameter of type 'string'",
+                         error.message):
+            return
 
-        return lines
+        src = plan.source
+        index = src.token_index_at(src.offset(error.line, error.col))
+        if index is None or src.parent[index] < 0 or src.tokens[src.parent[index]].value != '(':
+            return
+        opener = src.parent[index]
+        element = src.element_containing(opener, index)
+        if element is None:
+            return
+        first, last = src.elements(opener)[element]
 
-    def fix_type_assignment(self, error: Dict[str, str], lines: List[str]) -> List[str]:
-        """Fix TS2322 type assignment errors"""
-        line_idx = error['line'] - 1
-        line = lines[line_idx]
+        # Add null coalescing, parenthesising anything more complex than a member chain
+        simple = all(src.tokens[i].kind != 'punct' or src.tokens[i].value in ('.', '?.', '!', ')', ']')
+                     or src.parent[i] != opener for i in range(first, last + 1)) and \
+            not any(src.is_name(i, 'as') and src.parent[i] == opener for i in range(first, last + 1))
+        if simple:
+            plan.insert(src.tokens[last].end, ' || ""')
+        else:
+            plan.insert(src.tokens[first].start, '(')
+            plan.insert(src.tokens[last].end, ') || ""')
 
+    @register_fixer('TS2322')
+    def fix_type_assignment(self, error: Diagnostic, plan: EditPlan) -> None:
+        """Fix TS2322 type assignment errors"""
         # Handle common type assignment issues
-        if 'string' in error['message'] and 'MessageType' in error['message']:
-            # Fix enum assignments
-            if 'type:' in line:
-                line = re.sub(r"type:\s*'(\w+)'", r"type: '\1' as MessageType", line)
-                lines[line_idx] = line
+        if not ('string' in error.message and 'MessageType' in error.message):
+            return
+
+        # Fix enum assignments: type: 'x'  ->  type: 'x' as MessageType
+        src = plan.source
+        index = src.token_index_at(src.offset(error.line, error.col))
+        candidates = src.line_token_range(error.line)
+        if index is not None and index in candidates:
+            candidates = range(index, candidates.stop)
+        for i in candidates:
+            if src.is_name(i, 'type') and src.is_punct(i + 1, ':') and i + 2 < len(src.tokens) and \
+                    src.tokens[i + 2].kind == 'string' and not src.is_name(i + 3, 'as'):
+                plan.insert(src.tokens[i + 2].end, ' as MessageType')
+                return
 
-        return lines
+    def plan_file_fixes(self, filepath: str, errors: List[Diagnostic]) -> FileFixResult:
+        """Apply all fixers for one file in memory without touching the disk"""
+        text = self.read_file_text(filepath)
+        original = text.splitlines(keepends=True)
+        if not text:
+            return FileFixResult(filepath, len(errors), original, None)
 
-    def fix_errors_in_file(self, filepath: str, errors: List[Dict[str, str]]) -> bool:
+        # Every fixer records column-precise edits against the original text;
+        # they are applied together in one pass, so errors need no particular order
+        plan = EditPlan(SourceBuffer(text))
+        stats: Dict[str, RuleStats] = {}
+        for error in errors:
+            for rule in self.error_patterns.get(error.code, ()):
+                before = plan.pending()
+                started = time.perf_counter()
+                rule.func(self, error, plan)
+                rule_stats = stats.setdefault(rule.name, RuleStats())
+                rule_stats.seconds += time.perf_counter() - started
+                rule_stats.invocations += 1
+                added = plan.pending() - before
+                rule_stats.edits += added
+                if not added:
+                    rule_stats.noops += 1
+        fixed = plan.apply()
+
+        # Unchanged files are never rewritten, so file watchers are not woken for nothing
+        return FileFixResult(filepath, len(errors), original,
+                             None if fixed == text else fixed.splitlines(keepends=True), stats)
+
+    def fix_errors_in_file(self, filepath: str, errors: List[Diagnostic]) -> bool:
         """Fix all errors in a single file"""
-        lines = self.read_file_lines(filepath)
-        if not lines:
-            return False
+        result = self.plan_file_fixes(filepath, errors)
+        return result.changed and self.write_file_lines(filepath, result.fixed)
 
-        # Sort errors by line number in reverse order to avoid line number shifts
-        errors.sort(key=lambda x: x['line'], reverse=True)
+    def commit_results(self, results: List[FileFixResult]) -> int:
+        """Emit the diff if requested and write all changed files in one batch"""
+        if self.diff_path or self.dry_run:
+            diff = self.format_diff(results)
+            if self.diff_path and self.diff_path != '-':
+                with open(self.diff_path, 'w', encoding='utf-8') as f:
+                    f.write(diff)
+                print(f"Diff written to {self.diff_path}")
+            else:
+                sys.stdout.write(diff)
 
-        for error in errors:
-            if error['code'] in self.error_patterns:
-                lines = self.error_patterns[error['code']](error, lines)
+        if self.dry_run:
+            return 0
+        return self.write_files_atomically({r.file: r.fixed for r in results if r.changed})
 
-        return self.write_file_lines(filepath, lines)
+    def fix_files(self, files_errors: Dict[str, List[Diagnostic]]) -> List[FileFixResult]:
+        """Plan fixes for every file, in a process pool when more than one worker is configured.
 
-    def run_fixes(self) -> None:
-        """Run all fixes"""
-        print("Getting TypeScript errors...")
-        error_lines = self.run_tsc_check()
+        Results come back in sorted file order regardless of which worker finishes first.
+        """
+        results: Dict[str, FileFixResult] = {}
+        jobs = []
+        keys = {}
+        # Editing a plugin changes what it would fix, so its code is part of every fix key
+        salt = self.cache.rules_digest(FIX_RULES.values()) if self.cache else ''
+        for filepath, errors in sorted(files_errors.items()):
+            cached = None
+            if self.cache and os.path.exists(filepath):
+                keys[filepath] = self.cache.fix_key(filepath, errors, salt=salt)
+                cached = self.cache.load('fix', keys[filepath])
+            if cached is None:
+                print(f"Fixing {len(errors)} errors in {os.path.relpath(filepath, self.project_root)}")
+                jobs.append((filepath, errors))
+            elif cached['fixed'] is None:
+                results[filepath] = FileFixResult(filepath, len(errors), [], None)
+            else:
+                original = self.read_file_text(filepath).splitlines(keepends=True)
+                results[filepath] = FileFixResult(filepath, len(errors), original,
+                                                  cached['fixed'].splitlines(keepends=True))
+        if self.cache and len(jobs) < len(files_errors):
+            print(f"Reused cached fixes for {len(files_errors) - len(jobs)} unchanged files")
+
+        if self.workers <= 1 or len(jobs) <= 1:
+            planned = [self.plan_file_fixes(filepath, errors) for filepath, errors in jobs]
+        else:
+            workers = min(self.workers, len(jobs))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_fix_worker,
+                                     initargs=(self.project_root, self.plugins)) as pool:
+                chunksize = max(1, len(jobs) // (workers * 4))
+                planned = list(pool.map(_fix_file_worker, jobs, chunksize=chunksize))
+
+        self.cached_files += len(files_errors) - len(jobs)
+        for result in planned:
+            results[result.file] = result
+            for name, rule_stats in result.rule_stats.items():
+                self.rule_stats.setdefault(name, RuleStats()).merge(rule_stats)
+            if result.file in keys:
+                self.cache.store('fix', keys[result.file],
+                                 {'fixed': ''.join(result.fixed) if result.changed else None})
+        return [results[filepath] for filepath in sorted(results)]
 
-        # Group errors by file
-        files_errors = {}
+    def collect_diagnostics(self) -> Tuple[int, int, Dict[str, List[Diagnostic]]]:
+        """Run tsc once; returns (total errors, files with errors, fixable errors by file)"""
+        tree = None
+        if self.cache:
+            tree = self.cache.tree_digest()
+            cached = self.cache.load('diagnostics', tree)
+            if cached is not None:
+                print("Source tree unchanged since last check, reusing cached diagnostics")
+                files_errors = {}
+                for row in cached['fixable']:
+                    error = Diagnostic(*row)
+                    files_errors.setdefault(os.path.join(self.project_root, error.file), []).append(error)
+                return cached['total'], cached['files'], files_errors
+
+        # Group fixable errors by file; everything else is only counted
+        fixable_codes = set(self.error_patterns.keys())
+        files_errors: Dict[str, List[Diagnostic]] = {}
+        error_files = set()
         total_errors = 0
 
-        for error_line in error_lines:
-            if 'error TS' in error_line:
-                error = self.parse_error(error_line)
-                if error:
-                    filepath = os.path.join(self.project_root, error['file'])
-                    if filepath not in files_errors:
-                        files_errors[filepath] = []
-                    files_errors[filepath].append(error)
-                    total_errors += 1
+        for error in self.iter_tsc_diagnostics():
+            total_errors += 1
+            error_files.add(error.file)
+            if error.code in fixable_codes:
+                filepath = os.path.join(self.project_root, error.file)
+                files_errors.setdefault(filepath, []).append(error)
+
+        if self.cache:
+            self.cache.store('diagnostics', tree, {
+                'total': total_errors,
+                'files': len(error_files),
+                'fixable': [list(error) for errors in files_errors.values() for error in errors],
+            })
+        return total_errors, len(error_files), files_errors
 
-        print(f"Found {total_errors} errors in {len(files_errors)} files")
+    def run_fixes(self) -> List[IterationStats]:
+        """Run all fixes, repeating until the error count stops dropping or max_iterations is hit"""
+        print("Getting TypeScript errors...")
+        started = time.perf_counter()
+        total_errors, error_file_count, files_errors = self.collect_diagnostics()
+        tsc_seconds = time.perf_counter() - started
+        print(f"Found {total_errors} errors in {error_file_count} files")
+        if not files_errors:
+            print("Nothing to do")
+            return []
+
+        history: List[IterationStats] = []
+        for iteration in range(1, self.max_iterations + 1):
+            if self.max_iterations > 1:
+                print(f"\n--- Iteration {iteration} ---")
+
+            started = time.perf_counter()
+            results = self.fix_files(files_errors)
+            changed_files = sum(1 for result in results if result.changed)
+            attempted = sum(result.attempted for result in results)
+            print(f"Attempted {attempted} fixes in {len(results)} files, {changed_files} files changed")
+
+            written = self.commit_results(results)
+            fix_seconds = time.perf_counter() - started
+            if self.dry_run:
+                print("Dry run: no files written")
+                break
+            print(f"Wrote {written} files")
+
+            if written == 0:
+                print("No files changed, skipping TypeScript re-check")
+                print(f"Remaining errors: {total_errors}")
+                history.append(IterationStats(iteration, total_errors, total_errors, 0, tsc_seconds, fix_seconds))
+                break
 
-        # Fix errors file by file
-        for filepath, errors in files_errors.items():
-            error_codes = set(error['code'] for error in errors)
-            fixable_codes = set(self.error_patterns.keys())
-            fixable_errors = [e for e in errors if e['code'] in fixable_codes]
+            print("Fixes complete! Running TypeScript check again...")
+            started = time.perf_counter()
+            remaining_errors, error_file_count, files_errors = self.collect_diagnostics()
+            tsc_seconds += time.perf_counter() - started
+            print(f"Remaining errors: {remaining_errors}")
 
-            if fixable_errors:
-                print(f"Fixing {len(fixable_errors)} errors in {os.path.relpath(filepath, self.project_root)}")
-                self.fix_errors_in_file(filepath, fixable_errors)
+            history.append(IterationStats(iteration, total_errors, remaining_errors, written, tsc_seconds, fix_seconds))
+            if remaining_errors >= total_errors:
+                print("Error count stopped decreasing")
+                break
+            total_errors = remaining_errors
+            tsc_seconds = 0.0
+
+        if self.max_iterations > 1 and history:
+            self.print_iteration_report(history)
+        return history
+
+    def print_iteration_report(self, history: List[IterationStats]) -> None:
+        """Summarise errors fixed per iteration and time spent in tsc versus the fixers"""
+        print("\nIteration  Before  After  Fixed  Files   tsc(s)  fix(s)")
+        for stats in history:
+            print(f"{stats.iteration:>9}  {stats.errors_before:>6}  {stats.errors_after:>5}  "
+                  f"{stats.errors_before - stats.errors_after:>5}  {stats.files_written:>5}  "
+                  f"{stats.tsc_seconds:>7.2f}  {stats.fix_seconds:>6.2f}")
+        tsc_total = sum(stats.tsc_seconds for stats in history)
+        fix_total = sum(stats.fix_seconds for stats in history)
+        print(f"Total: {history[0].errors_before - history[-1].errors_after} errors fixed, "
+              f"{tsc_total:.2f}s in tsc, {fix_total:.2f}s in fixers")
+
+    def write_profile(self, path: str, history: List[IterationStats]) -> None:
+        """Print per-rule counters and write them, with the iteration history, as JSON"""
+        print("\nRule                            Calls   Edits  No-ops  Hit rate  Time(s)")
+        rules = {}
+        for name, stats in sorted(self.rule_stats.items()):
+            report = stats.as_dict()
+            report['codes'] = list(FIX_RULES[name].codes) if name in FIX_RULES else []
+            rules[name] = report
+            print(f"{name:<30}  {stats.invocations:>5}  {stats.edits:>6}  {stats.noops:>6}  "
+                  f"{report['hit_rate']:>8.1%}  {stats.seconds:>7.3f}")
+
+        profile = {
+            'rules': rules,
+            'cached_files': self.cached_files,
+            'iterations': [stats._asdict() for stats in history],
+            'tsc_seconds': round(sum(stats.tsc_seconds for stats in history), 6),
+            'fix_seconds': round(sum(stats.fix_seconds for stats in history), 6),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+        print(f"Profile written to {path}")
 
-        print("Fixes complete! Running TypeScript check again...")
-        remaining_errors = len([line for line in self.run_tsc_check() if 'error TS' in line])
-        print(f"Remaining errors: {remaining_errors}")
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Automatically fix common TypeScript strict mode errors')
+    parser.add_argument('project_root', nargs='?', default='.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes used to fix files in parallel (0 = one per CPU)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='plan all fixes and print them as a unified diff without writing any file')
+    parser.add_argument('--diff', dest='diff_path', metavar='PATH',
+                        help="also write the planned edits as a unified diff to PATH ('-' for stdout)")
+    parser.add_argument('--max-iterations', type=int, default=1,
+                        help='keep fixing and re-checking until the error count stops dropping, at most N times')
+    parser.add_argument('--plugin', action='append', default=[], metavar='PATH_OR_MODULE',
+                        help='load extra fixer rules registered with @register_fixer (repeatable)')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='write per-rule invocation, edit, no-op and timing counters as JSON')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'do not read or write the diagnostics/fix cache in {TOOL_DIR}/cache')
+    parser.add_argument('--cache-size-mb', type=int, default=64,
+                        help='evict least recently used cache entries beyond this size')
+    parser.add_argument('--tsc-mode', choices=TSC_MODES, default='cold',
+                        help="cold: full `tsc --noEmit` per check; incremental: reuse a .tsbuildinfo; "
+                             "watch: keep one `tsc --watch` process alive across checks")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
-    project_root = sys.argv[1] if len(sys.argv) > 1 else '.'
-    fixer = TypeScriptErrorFixer(project_root)
-    fixer.run_fixes()
\ No newline at end of file
+    # Plugins import register_fixer from this module; make sure they get this copy
+    sys.modules.setdefault('fix_typescript_errors', sys.modules[__name__])
+    args = parse_args(sys.argv[1:])
+    fixer = TypeScriptErrorFixer(args.project_root, tsc_mode=args.tsc_mode, workers=args.workers,
+                                 dry_run=args.dry_run, diff_path=args.diff_path,
+                                 max_iterations=args.max_iterations,
+                                 cache=None if args.no_cache else
+                                 FixCache(args.project_root, max_bytes=args.cache_size_mb * 1024 * 1024),
+                                 plugins=args.plugin)
+    try:
+        history = fixer.run_fixes()
+        if args.profile:
+            fixer.write_profile(args.profile, history)
+    finally:
+        fixer.close()
\ No newline at end of file
@@ -4,10 +4,15 @@ Safely add 'export const dynamic = "force-dynamic"' to API route files.
 This version properly handles multi-line imports and function definitions.
 """
 
+import argparse
 import os
 import re
 from pathlib import Path
 
+from codemod import Codemod, apply, plan
+from route_manifest import build_manifest
+from source_scanner import has_dynamic_export, is_api_route
+
 def find_insertion_point(lines):
     """
     Find the correct insertion point after imports and before any code.
@@ -53,61 +58,76 @@ def find_insertion_point(lines):
     # Insert after last import line
     return last_import_line + 1 if last_import_line >= 0 else 0
 
-def has_dynamic_export(content):
-    """Check if file already has dynamic export."""
-    return "export const dynamic = 'force-dynamic'" in content or \
-           'export const dynamic = "force-dynamic"' in content
-
-def process_file(file_path):
-    """Add dynamic export to a single file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Skip if already has dynamic export
-        if has_dynamic_export(content):
-            return 'skipped', 'already has export'
+def plan_dynamic_export(file_path, content):
+    """Plan the dynamic export for a single file: returns (status, detail, new content or None)."""
+    # Skip if already has dynamic export
+    if has_dynamic_export(content):
+        return 'skipped', 'already has export', None
 
-        lines = content.split('\n')
+    # Routes moved to time-based revalidation by analyze-route-cacheability.py stay cacheable
+    if re.search(r'^export\s+const\s+revalidate\b', content, re.MULTILINE):
+        return 'skipped', 'exports revalidate', None
 
-        # Find where to insert
-        insert_line = find_insertion_point(lines)
+    lines = content.split('\n')
 
-        if insert_line == 0:
-            return 'skipped', 'no imports found'
+    # Find where to insert
+    insert_line = find_insertion_point(lines)
 
-        # Insert the export with proper spacing
-        export_statement = "\nexport const dynamic = 'force-dynamic'\n"
-        lines.insert(insert_line, export_statement)
+    if insert_line == 0:
+        return 'skipped', 'no imports found', None
 
-        # Write back
-        new_content = '\n'.join(lines)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+    # Insert the export with proper spacing
+    export_statement = "\nexport const dynamic = 'force-dynamic'\n"
+    lines.insert(insert_line, export_statement)
 
-        return 'updated', f'inserted at line {insert_line + 1}'
+    return 'updated', f'inserted at line {insert_line + 1}', '\n'.join(lines)
 
-    except Exception as e:
-        return 'error', str(e)
+DYNAMIC_EXPORT_CODEMOD = Codemod('add-dynamic-export', plan_dynamic_export, suffixes=('.ts',),
+                                 path_filter=is_api_route)
 
 def main():
     """Main function to process all API route files."""
-    api_dir = Path('src/app/api')
+    parser = argparse.ArgumentParser(description='Add force-dynamic exports to API route files')
+    parser.add_argument('root', nargs='?', default='src/app/api', help='directory to process (default: src/app/api)')
+    parser.add_argument('--workers', type=int, default=0, help='plan and write in N workers (0 = one per CPU)')
+    parser.add_argument('--dry-run', action='store_true', help='report planned changes without writing')
+    args = parser.parse_args()
+
+    api_dir = Path(args.root)
 
     if not api_dir.exists():
         print(f"API directory not found: {api_dir}")
         return
 
-    # Find all route.ts files
-    route_files = list(api_dir.rglob('route.ts'))
+    # Route handlers come from the cached route manifest instead of a fresh tree walk;
+    # both sides are absolute so a relative or an absolute root argument selects the same files
+    api_prefix = os.path.join(os.path.abspath(api_dir), '')
+    route_files = [route.file for route in build_manifest().api_routes()
+                   if os.path.abspath(route.file).startswith(api_prefix)]
+
+    # The manifest leaves out _private folders, which are not routable; say so instead of dropping them silently
+    private_files = [str(path) for path in sorted(api_dir.rglob('route.ts'))
+                     if any(part.startswith('_') for part in path.relative_to(api_dir).parts[:-1])]
 
-    print(f"Found {len(route_files)} API route files\n")
+    # Plan every edit first, then write the changed files in one batch
+    workers = args.workers or os.cpu_count() or 1
+    edits = plan(DYNAMIC_EXPORT_CODEMOD, str(api_dir), files=route_files, workers=workers)
 
-    stats = {'updated': 0, 'skipped': 0, 'error': 0}
+    print(f"Found {len(edits)} API route files\n")
 
-    for file_path in sorted(route_files):
-        rel_path = file_path.relative_to(api_dir.parent.parent)
-        status, message = process_file(file_path)
+    for path in private_files:
+        print(f"[SKIP] {os.path.relpath(path)}: in a _private folder, not a route")
+
+    result = None if args.dry_run else apply(DYNAMIC_EXPORT_CODEMOD.name, edits, workers=workers)
+    failed = dict(result.failed) if result else {}
+
+    stats = {'updated': 0, 'skipped': len(private_files), 'error': 0}
+
+    for edit in edits:
+        status, message = edit.status, edit.detail
+        if edit.path in failed:
+            status, message = 'error', failed[edit.path]
+        rel_path = os.path.relpath(edit.path)
 
         stats[status] += 1
 
@@ -115,9 +135,14 @@ def main():
         print(f"{prefix} {rel_path}: {message}")
 
     print(f"\nSummary:")
-    print(f"  Updated: {stats['updated']}")
+    print(f"  {'Would update' if args.dry_run else 'Updated'}: {stats['updated']}")
     print(f"  Skipped: {stats['skipped']}")
     print(f"  Errors: {stats['error']}")
 
+    if result and result.rolled_back:
+        print(f"\nWrite failed; all {len(result.written)} written files were restored from {result.journal}")
+    elif result and result.journal:
+        print(f"\nUndo with: python3 scripts/codemod.py rollback {result.journal}")
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
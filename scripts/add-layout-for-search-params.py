@@ -1,27 +1,24 @@
 #!/usr/bin/env python3
 """
 为所有使用 useSearchParams() 的页面创建 layout.tsx 文件
+
+--discover: 并行扫描整个 src 树，沿 import 关系找出间接使用 useSearchParams() 的页面，
+            只为还没有 force-dynamic 的路由段批量创建缺失的 layout.tsx
 """
 
+import argparse
 import os
+import sys
+from collections import deque
 from pathlib import Path
 
-# 所有使用 useSearchParams 的页面路径
-pages_with_search_params = [
-    "src/app/workshops/idea-refinement",
-    "src/app/workshops/mvp-visualization",
-    "src/app/workshops/[workshopId]",
-    "src/app/workshop/[id]",
-    "src/app/marketplace/bidding",
-    "src/app/business-plan",
-    "src/app/business-plan/workspace",
-    "src/app/business-plan/generating",
-    "src/app/business-plan/intelligent",
-    "src/app/auth/login",
-    "src/app/auth/register",
-    "src/app/agents/search",
-    "src/app/collaboration/result",
-]
+from codemod import apply, create_file
+from route_manifest import build_manifest
+from source_scanner import MODULE_IMPORTS_RULE, SOURCE_ROOT, ResultCache, resolve_import, scan
+
+# 所有使用 useSearchParams 的页面路径（来自路由清单，不再手工维护）
+def pages_with_search_params():
+    return [os.path.dirname(route.file) for route in build_manifest().pages() if route.uses_search_params]
 
 layout_template = """export const dynamic = 'force-dynamic'
 
@@ -52,12 +49,109 @@ def create_layout_file(page_dir: str):
 
     return 'created', f'created at {layout_path}'
 
+def find_search_param_users(workers: int):
+    """所有直接或通过 import 间接调用 useSearchParams() 的文件 -> 通往调用处的下一个文件"""
+    cache = ResultCache(os.path.join('.scanner-cache', 'module-imports.json'))
+    findings = scan([MODULE_IMPORTS_RULE], SOURCE_ROOT, workers=workers, cache=cache)[MODULE_IMPORTS_RULE.name]
+    cache.save()
+
+    importers = {}  # 被导入文件 -> 导入它的文件
+    queue = deque()
+    via = {}
+    for finding in findings:
+        path = os.path.normpath(finding.path)
+        if finding.message['uses_search_params']:
+            via[path] = None
+            queue.append(path)
+        for module in finding.message['imports']:
+            target = resolve_import(path, module)
+            if target:
+                importers.setdefault(target, []).append(path)
+
+    # 反向沿 import 边传播：导入了“用户”的文件本身也是用户
+    while queue:
+        path = queue.popleft()
+        for importer in importers.get(path, ()):
+            if importer not in via:
+                via[importer] = path
+                queue.append(importer)
+    return via
+
+def plan_missing_layouts(workers: int):
+    """返回 (需要创建的 layout, 已覆盖的页面, 需手工处理的已有 layout)"""
+    manifest = build_manifest()
+    users = find_search_param_users(workers)
+
+    planned, covered, manual = [], [], []
+    for route in manifest.pages():
+        page = os.path.normpath(route.file)
+        if page not in users:
+            continue
+
+        # 找到实际调用 useSearchParams() 的文件，便于报告
+        source = page
+        while users[source] is not None:
+            source = users[source]
+
+        if manifest.segment_config(route, 'dynamic') == 'force-dynamic':
+            covered.append((route, source))
+            continue
+
+        layout_path = os.path.join(os.path.dirname(route.file), 'layout.tsx')
+        if os.path.exists(layout_path):
+            manual.append((route, source, layout_path))
+        else:
+            detail = f'{route.route} uses useSearchParams() via {source}' if source != page else \
+                     f'{route.route} uses useSearchParams()'
+            planned.append(create_file(layout_path, layout_template.strip() + '\n', detail))
+    return planned, covered, manual
+
+def discover(workers: int, dry_run: bool):
+    print("Discovering pages that use useSearchParams()...\n")
+
+    planned, covered, manual = plan_missing_layouts(workers)
+
+    for route, source in covered:
+        print(f"[SKIP] {route.route}: already force-dynamic ({source})")
+    for route, source, layout_path in manual:
+        print(f"[WARN] {layout_path}: exists without force-dynamic, add it by hand ({source})")
+
+    result = None if dry_run or not planned else apply('add-search-params-layouts', planned)
+    failed = dict(result.failed) if result else {}
+    for edit in planned:
+        if edit.path in failed:
+            print(f"[ERR] {edit.path}: {failed[edit.path]}")
+        else:
+            print(f"[{'PLAN' if dry_run else 'OK'}] {edit.path}: {edit.detail}")
+
+    created = 0 if result and result.rolled_back else len(planned)
+    print(f"\nSummary:")
+    print(f"  Pages using useSearchParams: {len(planned) + len(covered) + len(manual)}")
+    print(f"  {'Would create' if dry_run else 'Created'}: {created}")
+    print(f"  Already dynamic: {len(covered)}")
+    print(f"  Needs manual fix: {len(manual)}")
+    if result and result.rolled_back:
+        print(f"\nWrite failed; created layouts were removed again ({result.journal})")
+    elif result and result.journal:
+        print(f"\nUndo with: python3 scripts/codemod.py rollback {result.journal}")
+    return 1 if failed or manual else 0
+
 def main():
+    parser = argparse.ArgumentParser(description='Create force-dynamic layouts for pages that use useSearchParams()')
+    parser.add_argument('--discover', action='store_true',
+                        help='find pages through the import graph and create only the missing layouts')
+    parser.add_argument('--workers', type=int, default=0, help='scan in N processes (0 = one per CPU)')
+    parser.add_argument('--dry-run', action='store_true', help='with --discover, only report the plan')
+    args = parser.parse_args()
+
+    if args.discover:
+        return discover(args.workers or os.cpu_count() or 1, args.dry_run)
+
     print("Creating layout.tsx files for pages using useSearchParams...\n")
 
     stats = {'created': 0, 'skipped': 0, 'error': 0}
 
-    for page_dir in pages_with_search_params:
+    for page_dir in pages_with_search_params():
         page_path = Path(page_dir)
 
         if not page_path.exists():
@@ -82,4 +176,4 @@ def main():
     print(f"  Errors: {stats['error']}")
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
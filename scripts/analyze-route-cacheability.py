@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Cacheability report for the API route handlers, and a codemod that replaces the
+blanket force-dynamic export with `revalidate` where the GET response is safe to cache.
+
+Each route is classified from what its GET handler touches:
+  dynamic  headers, cookies, auth, DB writes, helpers of unknown effect, generated output
+           (documents, examples, exports), other side effects, liveness routes, or data
+           another route writes
+  stub     a handler answers 501 or the file serves mock data: left alone until it is real
+  query    reads search params: keeps force-dynamic, cache at the CDN with Cache-Control instead
+  isr      reads the database, upstream APIs or the clock: revalidate every 60s
+  static   only module-level data: revalidate every hour
+  no-get   no GET handler, nothing to cache
+Every verdict is printed with the signals that produced it; only isr and static are rewritten.
+
+The expected hit ratio of a revalidated route is λT / (λT + 1) for λ requests per second
+and a revalidate window of T seconds (one regeneration per window). λ defaults to --rps,
+or comes per route from a `test-deployment.py loadtest --output` report via --traffic.
+
+Usage:
+  python3 scripts/analyze-route-cacheability.py [--rps N] [--traffic loadtest.json] [--json]
+  python3 scripts/analyze-route-cacheability.py --apply [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from codemod import Codemod, apply, plan
+from route_manifest import APP_DIR, build_manifest
+from source_scanner import HTTP_METHODS, ResultCache, ScanRule, check_route_info, matching_bracket, scan
+
+CACHE_PATH = os.path.join('.scanner-cache', 'cacheability.json')
+
+_FORCE_DYNAMIC_RE = re.compile(r'''^export\s+const\s+dynamic\s*=\s*['"]force-dynamic['"];?[ \t]*\n''', re.MULTILINE)
+_REVALIDATE_EXPORT_RE = re.compile(r'^export\s+const\s+revalidate\b', re.MULTILINE)
+# Comments the codebase puts right above the export, e.g. "// 强制动态渲染"
+_DYNAMIC_COMMENT_RE = re.compile(r'^[ \t]*//[^\n]*(?:动态|dynamic)[^\n]*\n\Z', re.IGNORECASE)
+
+
+# --- route handler classification (the scan rule) ---
+
+CACHE_SIGNALS = {
+    'headers': re.compile(r'\bheaders\s*\(\s*\)|\b(?:request|req)\.headers\b'),
+    'cookies': re.compile(r'\bcookies\s*\(\s*\)|\b(?:request|req)\.cookies\b'),
+    'auth': re.compile(r'\b(?:getUserFromRequest|getUserFromToken|requireAdmin|verifyToken|authenticateToken|'
+                       r'authenticateRequest|getServerSession|getCurrentUser|withAuth|auth)\s*\(|[Aa]uthorization'),
+    'db-write': re.compile(r'\bprisma\.\w+\.(?:create|createMany|update|updateMany|upsert|delete|deleteMany)\b'
+                           r'|\$executeRaw|\$transaction'),
+    # Helpers handed the request object may read any of the above
+    'request-passed': re.compile(r'\b(?!NextResponse\b)[A-Za-z_$][\w$]*\s*\(\s*(?:request|req)\s*[,)]'),
+    'search-params': re.compile(r'\bsearchParams\b|\bnextUrl\b|\b(?:request|req)\.url\b'),
+    'db-read': re.compile(r'\bprisma\.\w+\.(?:find\w*|count|aggregate|groupBy)\b|\$queryRaw'),
+    'time': re.compile(r'\bDate\.now\s*\(|\bnew\s+Date\s*\(\s*\)|\bMath\.random\s*\('),
+    'fetch': re.compile(r'\bfetch\s*\('),
+    # A helper of unknown effect: it may write, log an audit event or read request state
+    'awaited-call': re.compile(r'\bawait\s+(?!(?:request|req|prisma|fetch|readFile|readdir|stat|access)\b)'
+                              r'[A-Za-z_$][\w$]*\s*\('),
+    # Output produced per call (documents, examples, exports) rather than read from somewhere
+    'generator': re.compile(r'\b(?:generate|render|build|create)[A-Z][\w$]*\s*\(|\bnew\s+PDFDocument\b'),
+    'side-effect': re.compile(r'\b(?:setTimeout|setInterval|writeFile\w*|appendFile\w*|unlink\w*|mkdir\w*)\s*\(|'
+                              r'\.(?:send|emit|publish|enqueue|track|increment)\s*\('),
+}
+# Any of these makes a GET response depend on who is asking or when, or have side effects
+PER_REQUEST_SIGNALS = ('headers', 'cookies', 'auth', 'db-write', 'request-passed', 'awaited-call', 'generator',
+                       'side-effect', 'liveness', 'mutated-here')
+STATIC_REVALIDATE = 3600  # seconds, for GET handlers that only read code-level data
+DATA_REVALIDATE = 60  # seconds, for GET handlers that read the database or upstream APIs
+
+_LIVE_ROUTE_RE = re.compile(r'/api/(?:.+/)?(?:health|monitoring|metrics|status)(?:/|$)')
+_GENERATOR_ROUTE_RE = re.compile(r'/api/(?:.+/)?[\w-]*(?:generate|export|download|pdf)[\w-]*(?:/|$)')
+# Placeholder handlers: 501 responses or canned mock data, so the GET verdict says nothing about the real route
+_STUB_RE = re.compile(r'\bstatus\s*:\s*501\b|\bfrom\s+[\'"][^\'"]*mock[^\'"]*[\'"]', re.IGNORECASE)
+_MODEL_READ_RE = re.compile(r'\bprisma\.(\w+)\.(?:find\w*|count|aggregate|groupBy)\b')
+_MODEL_WRITE_RE = re.compile(r'\bprisma\.(\w+)\.(?:create|createMany|update|updateMany|upsert|delete|deleteMany)\b')
+_REVALIDATE_CALL_RE = re.compile(r'\brevalidate(?:Path|Tag)\s*\(')
+_HANDLER_START_RE = re.compile(r'\bexport\s+(?:async\s+)?function\s*(%s)\s*\(' % '|'.join(HTTP_METHODS))
+
+
+def handler_spans(content: str) -> Dict[str, Tuple[int, int]]:
+    """method -> (start, end) of each `export function METHOD(...) {...}` declaration"""
+    spans = {}
+    for match in _HANDLER_START_RE.finditer(content):
+        params_end = matching_bracket(content, match.end() - 1, '(', ')')
+        body = content.find('{', params_end)
+        if body != -1:
+            spans[match.group(1)] = (match.start(), matching_bracket(content, body, '{', '}'))
+    return spans
+
+
+def check_route_cacheability(path: str, content: str) -> Iterable[dict]:
+    """Classify a route handler file by what its GET response depends on"""
+    methods = next(iter(check_route_info(path, content)))['methods']
+    if 'GET' not in methods:
+        yield {'class': 'no-get', 'signals': [], 'revalidate': None, 'reads': [],
+               'writes': sorted(set(_MODEL_WRITE_RE.findall(content))),
+               'revalidates': bool(_REVALIDATE_CALL_RE.search(content))}
+        return
+
+    # Other method handlers never run for a GET; everything else (helpers, module scope) might
+    relevant, siblings = content, ''
+    for method, (start, end) in sorted(handler_spans(content).items(), key=lambda item: -item[1][0]):
+        if method not in ('GET', 'HEAD'):
+            siblings += relevant[start:end]
+            relevant = relevant[:start] + relevant[end:]
+
+    signals = [name for name, regex in CACHE_SIGNALS.items() if regex.search(relevant)]
+    if _LIVE_ROUTE_RE.search(path.replace(os.sep, '/')):
+        signals.append('liveness')
+    if _GENERATOR_ROUTE_RE.search(path.replace(os.sep, '/')) and 'generator' not in signals:
+        signals.append('generator')
+    if CACHE_SIGNALS['db-write'].search(siblings) and not _REVALIDATE_CALL_RE.search(siblings):
+        signals.append('mutated-here')  # a cached GET would serve stale data right after a write
+    if _STUB_RE.search(content):
+        signals.append('stub')
+    if any(signal in PER_REQUEST_SIGNALS for signal in signals):
+        verdict, revalidate = 'dynamic', None
+    elif 'stub' in signals:
+        verdict, revalidate = 'stub', None  # decide once the handlers are real
+    elif 'search-params' in signals:
+        verdict, revalidate = 'query', None  # reading the request opts the handler out of the route cache
+    elif any(signal in ('db-read', 'fetch', 'time') for signal in signals):
+        verdict, revalidate = 'isr', DATA_REVALIDATE
+    else:
+        verdict, revalidate = 'static', STATIC_REVALIDATE
+    yield {'class': verdict, 'signals': signals, 'revalidate': revalidate,
+           'reads': sorted(set(_MODEL_READ_RE.findall(relevant))),
+           'writes': sorted(set(_MODEL_WRITE_RE.findall(content))),
+           'revalidates': bool(_REVALIDATE_CALL_RE.search(content))}
+
+
+def is_route_handler_file(path: str) -> bool:
+    return os.path.splitext(os.path.basename(path))[0] == 'route' and '/app/' in path.replace(os.sep, '/')
+
+
+ROUTE_CACHE_RULE = ScanRule('route-cacheability', check_route_cacheability, suffixes=('.ts', '.js'),
+                            path_filter=is_route_handler_file)
+
+
+class RouteCacheability(NamedTuple):
+    route: str
+    file: str
+    verdict: str  # 'dynamic', 'stub', 'query', 'isr', 'static' or 'no-get'
+    signals: List[str]
+    current: Optional[str]  # current `dynamic` export, if any
+    revalidate: Optional[int]  # proposed revalidate window in seconds
+    rps: float
+    hit_ratio: float
+    mean_ms: Optional[float]  # mean latency from the traffic report, if known
+
+
+def expected_hit_ratio(rps: float, revalidate: Optional[int]) -> float:
+    """Share of requests served from cache with one regeneration per revalidate window"""
+    if not revalidate or rps <= 0:
+        return 0.0
+    served = rps * revalidate
+    return served / (served + 1)
+
+
+def load_traffic(path: str) -> Dict[str, Tuple[float, Optional[float]]]:
+    """route -> (requests per second, mean latency in ms) from a loadtest JSON report"""
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    duration = report.get('duration_s') or 0
+    traffic = {}
+    for route, stats in report.get('routes', {}).items():
+        rps = stats['requests'] / duration if duration else 0.0
+        traffic[route.split('?')[0]] = (rps, (stats.get('latency') or {}).get('mean_ms'))
+    return traffic
+
+
+def analyze(app_dir: str = APP_DIR, default_rps: float = 1.0,
+            traffic: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+            workers: int = 1) -> List[RouteCacheability]:
+    manifest = build_manifest(app_dir, workers=workers)
+    routes = {route.file: route for route in manifest.api_routes()}
+
+    cache = ResultCache(CACHE_PATH, sources=[__file__])
+    findings = scan([ROUTE_CACHE_RULE], app_dir, files=list(routes), workers=workers,
+                    cache=cache)[ROUTE_CACHE_RULE.name]
+    cache.save()
+    facts = {finding.path: finding.message for finding in findings}
+
+    # Models written by some other route and never revalidated on write: caching their reads serves stale data
+    writers: Dict[str, List[str]] = {}
+    for path, info in facts.items():
+        if not info['revalidates']:
+            for model in info['writes']:
+                writers.setdefault(model, []).append(path)
+
+    results = []
+    for path, route in sorted(routes.items(), key=lambda item: item[1].route):
+        info = facts.get(path, {'class': 'no-get', 'signals': [], 'revalidate': None, 'reads': []})
+        verdict, signals, revalidate = info['class'], list(info['signals']), info['revalidate']
+        if verdict in ('isr', 'static') and any(
+                other != path for model in info['reads'] for other in writers.get(model, [])):
+            verdict, revalidate = 'dynamic', None
+            signals.append('mutated-elsewhere')
+
+        rps, mean_ms = (traffic or {}).get(route.route, (default_rps if traffic is None else 0.0, None))
+        results.append(RouteCacheability(route.route, path, verdict, signals, route.config.get('dynamic'),
+                                         revalidate, rps, expected_hit_ratio(rps, revalidate), mean_ms))
+    return results
+
+
+class RevalidateExport:
+    """Codemod transform swapping force-dynamic for `revalidate`; a class so pool workers can pickle it"""
+
+    def __init__(self, windows: Dict[str, int]):
+        self.windows = windows  # file -> revalidate seconds
+
+    def __call__(self, path: str, content: str) -> Tuple[str, str, Optional[str]]:
+        window = self.windows.get(path)
+        if window is None:
+            return 'skipped', 'must stay dynamic', None
+        if _REVALIDATE_EXPORT_RE.search(content):
+            return 'skipped', 'already exports revalidate', None
+        match = _FORCE_DYNAMIC_RE.search(content)
+        if not match:
+            return 'skipped', 'no force-dynamic export', None
+
+        start = match.start()
+        previous = content.rfind('\n', 0, max(start - 1, 0)) + 1 if start else 0
+        if start and _DYNAMIC_COMMENT_RE.match(content[previous:start]):
+            start = previous
+        replacement = f'export const revalidate = {window}\n'
+        return 'updated', f'force-dynamic -> revalidate {window}', content[:start] + replacement + content[match.end():]
+
+
+def print_report(results: List[RouteCacheability]) -> None:
+    for result in results:
+        if result.verdict == 'no-get':
+            continue
+        proposal = {'dynamic': 'keep force-dynamic',
+                    'stub': 'skip: placeholder handler',
+                    'query': 'keep force-dynamic, add Cache-Control s-maxage'}.get(
+            result.verdict, f'revalidate = {result.revalidate}')
+        gain = f"hit {result.hit_ratio:.0%} at {result.rps:g} req/s" if result.revalidate else ''
+        if result.revalidate and result.mean_ms is not None:
+            gain += f", ~{result.hit_ratio * result.mean_ms:.1f}ms saved per request"
+        print(f"{result.verdict:8} {result.route:55} {proposal:48} {gain}".rstrip())
+        print(f"{'':9}signals: {', '.join(result.signals) or 'none (module-level data only)'}")
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.verdict] = counts.get(result.verdict, 0) + 1
+    cacheable = [result for result in results if result.revalidate]
+    total_rps = sum(result.rps for result in results if result.verdict != 'no-get')
+    offloaded = sum(result.rps * result.hit_ratio for result in cacheable)
+    print('\n' + ', '.join(f'{count} {verdict}' for verdict, count in sorted(counts.items())))
+    if total_rps:
+        print(f"Expected: {offloaded:.2f} of {total_rps:.2f} GET req/s served from cache ({offloaded / total_rps:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify API routes by cacheability and replace force-dynamic where safe')
+    parser.add_argument('app_dir', nargs='?', default=APP_DIR)
+    parser.add_argument('--rps', type=float, default=1.0, help='assumed requests per second per route (default: 1)')
+    parser.add_argument('--traffic', help='loadtest JSON report with per-route request counts')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--apply', action='store_true', help='rewrite force-dynamic to revalidate on isr/static routes')
+    parser.add_argument('--dry-run', action='store_true', help='with --apply, only show the planned edits')
+    parser.add_argument('--workers', type=int, default=0, help='scan and write in N workers (0 = one per CPU)')
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    traffic = load_traffic(args.traffic) if args.traffic else None
+    results = analyze(args.app_dir, args.rps, traffic, workers)
+
+    if not args.apply:
+        if args.json:
+            print(json.dumps([result._asdict() for result in results], ensure_ascii=False, indent=2))
+        else:
+            print_report(results)
+        return 0
+
+    transform = RevalidateExport({result.file: result.revalidate for result in results if result.revalidate})
+    codemod = Codemod('revalidate-export', transform, suffixes=('.ts', '.js'))
+    edits = plan(codemod, args.app_dir, files=[result.file for result in results], workers=workers)
+    result = None if args.dry_run else apply(codemod.name, edits, workers=workers)
+    failed = dict(result.failed) if result else {}
+
+    for edit in edits:
+        if edit.status == 'updated' or edit.path in failed:
+            prefix = '[ERR]' if edit.path in failed else '[OK]'
+            print(f"{prefix} {os.path.relpath(edit.path)}: {failed.get(edit.path, edit.detail)}")
+    updated = sum(1 for edit in edits if edit.status == 'updated')
+    print(f"\n{'Would update' if args.dry_run else 'Updated'} {updated} of {len(edits)} route handlers")
+
+    if result and result.rolled_back:
+        print(f"Write failed; all {len(result.written)} written files were restored from {result.journal}")
+        return 1
+    if result and result.journal:
+        print(f"Undo with: python3 scripts/codemod.py rollback {result.journal}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
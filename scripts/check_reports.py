@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+JSON and JUnit XML reports of the test-deployment.py check results, for CI to
+archive and display. A result is anything with test, check, success, error,
+data and duration attributes and a to_dict() method (DeploymentTestResult).
+
+Usage: python3 src/lib/test-deployment.py --json REPORT.json --junit REPORT.xml
+"""
+
+import json
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List
+
+
+def write_json_report(path: str, results: List[Any], wall_time: float):
+    """Pass count, wall time, per-check durations and every result"""
+    report = {
+        'wall_time_s': round(wall_time, 4),
+        'passed': sum(1 for result in results if result.success),
+        'total': len(results),
+        'checks': {},
+        'results': [result.to_dict() for result in results],
+    }
+    for result in results:
+        report['checks'][result.check] = round(result.duration, 4)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def write_junit_report(path: str, results: List[Any], wall_time: float):
+    """One testsuite per check function, timed by its duration, and one testcase per result"""
+    suites = ET.Element('testsuites', name='deployment', tests=str(len(results)),
+                        failures=str(sum(1 for result in results if not result.success)), time=f'{wall_time:.4f}')
+    by_check: Dict[str, List[Any]] = {}
+    for result in results:
+        by_check.setdefault(result.check, []).append(result)
+
+    for check, check_results in by_check.items():
+        suite = ET.SubElement(suites, 'testsuite', name=check, tests=str(len(check_results)),
+                              failures=str(sum(1 for result in check_results if not result.success)),
+                              time=f'{check_results[0].duration:.4f}')
+        for result in check_results:
+            case = ET.SubElement(suite, 'testcase', classname=check, name=result.test, time='0')
+            if not result.success:
+                ET.SubElement(case, 'failure', message=result.error or '失败').text = result.error or ''
+            if result.data:
+                ET.SubElement(case, 'system-out').text = json.dumps(result.data, ensure_ascii=False)
+
+    ET.ElementTree(suites).write(path, encoding='utf-8', xml_declaration=True)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Batch codemod runner built on the source scanner.
+Plans every edit first, then writes all changed files in parallel with atomic
+renames, recording a rollback journal so a run can be reverted without git.
+
+Usage:
+  python3 scripts/codemod.py list                  # show recorded journals
+  python3 scripts/codemod.py rollback [JOURNAL]    # revert the latest (or given) run
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from source_scanner import ScanRule, scan
+
+JOURNAL_ROOT = '.codemod-journal'
+
+# Read once at import: os.umask() can only be queried by setting it, which is unsafe once threads run
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class Codemod(NamedTuple):
+    name: str
+    # (path, content) -> (status, detail, new content or None when the file is left alone)
+    transform: Callable[[str, str], Tuple[str, str, Optional[str]]]
+    suffixes: Tuple[str, ...] = ('.ts', '.tsx')
+    path_filter: Optional[Callable[[str], bool]] = None
+
+
+class PlannedEdit(NamedTuple):
+    path: str
+    status: str  # 'updated', 'created', 'skipped' or 'error'
+    detail: str
+    before: Optional[str]  # sha256 of the content the edit was planned against, None for a new file
+    content: Optional[str]  # new content, None when nothing changes
+
+
+class ApplyResult(NamedTuple):
+    journal: Optional[str]
+    written: List[str]
+    failed: List[Tuple[str, str]]  # (path, reason)
+    rolled_back: bool
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class _PlanCheck:
+    """Scanner check that runs a transform; a class rather than a closure so pool workers can pickle it"""
+
+    def __init__(self, transform):
+        self.transform = transform
+
+    def __call__(self, path: str, content: str) -> Iterable[PlannedEdit]:
+        try:
+            status, detail, new_content = self.transform(path, content)
+        except Exception as e:
+            status, detail, new_content = 'error', str(e), None
+        if new_content == content:
+            new_content = None
+        yield PlannedEdit(path, status, detail, _digest(content.encode('utf-8')), new_content)
+
+
+def plan(codemod: Codemod, root: str = 'src', files: Optional[Iterable[str]] = None,
+         workers: int = 1) -> List[PlannedEdit]:
+    """Run the transform over every matching file without touching the tree"""
+    rule = ScanRule(codemod.name, _PlanCheck(codemod.transform), suffixes=codemod.suffixes,
+                    path_filter=codemod.path_filter)
+    return [finding.message for finding in scan([rule], root, files=files, workers=workers)[rule.name]]
+
+
+def _write_atomically(path: str, data: bytes, mode: int) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix='.codemod-', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _write_journal(journal_dir: str, manifest: dict) -> None:
+    tmp_path = os.path.join(journal_dir, 'journal.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(journal_dir, 'journal.json'))
+
+
+def create_file(path: str, content: str, detail: str = 'created') -> PlannedEdit:
+    """Plan a new file; applying it fails if the path exists by then"""
+    return PlannedEdit(path, 'created', detail, None, content)
+
+
+def _apply_one(journal_dir: str, index: int, edit: PlannedEdit) -> None:
+    """Back up the original into the journal, then swap in the new content"""
+    if edit.before is None:
+        if os.path.exists(edit.path):
+            raise RuntimeError('file already exists')
+        os.makedirs(os.path.dirname(edit.path) or '.', exist_ok=True)
+        _write_atomically(edit.path, edit.content.encode('utf-8'), 0o666 & ~_UMASK)
+        return
+
+    with open(edit.path, 'rb') as f:
+        original = f.read()
+    if _digest(original) != edit.before:
+        raise RuntimeError('file changed since the edit was planned')
+    shutil.copyfile(edit.path, os.path.join(journal_dir, 'files', str(index)))
+    _write_atomically(edit.path, edit.content.encode('utf-8'), os.stat(edit.path).st_mode & 0o7777)
+
+
+def apply(codemod_name: str, edits: List[PlannedEdit], workers: int = 8,
+          journal_root: str = JOURNAL_ROOT) -> ApplyResult:
+    """Write every planned change in parallel, journaling originals first.
+
+    If any file fails, every file already written by this run is restored from the journal.
+    """
+    changes = [edit for edit in edits if edit.status in ('updated', 'created') and edit.content is not None]
+    if not changes:
+        return ApplyResult(None, [], [], False)
+
+    # The pid and counter only keep same-second runs out of each other's directory; the name says
+    # nothing about which run came last, so list_journals orders by the manifest's `created` instead
+    stamp = time.strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}'
+    for attempt in itertools.count():
+        journal_dir = os.path.join(journal_root, f"{stamp}{f'.{attempt}' if attempt else ''}-{codemod_name}")
+        try:
+            os.makedirs(os.path.join(journal_dir, 'files'))
+            break
+        except FileExistsError:
+            continue
+    manifest = {
+        'codemod': codemod_name,
+        'created': datetime.now().isoformat(timespec='microseconds'),
+        'cwd': os.getcwd(),
+        'state': 'applying',
+        'entries': [{'path': os.path.abspath(edit.path), 'backup': str(i) if edit.before else None,
+                     'before': edit.before,
+                     'after': _digest(edit.content.encode('utf-8'))} for i, edit in enumerate(changes)],
+    }
+    # The manifest is durable before the first file is replaced, so a crash mid-run is recoverable
+    _write_journal(journal_dir, manifest)
+
+    written, failed = [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(changes)))) as pool:
+        futures = [(edit, pool.submit(_apply_one, journal_dir, i, edit)) for i, edit in enumerate(changes)]
+        for edit, future in futures:
+            try:
+                future.result()
+                written.append(edit.path)
+            except Exception as e:
+                failed.append((edit.path, str(e)))
+
+    if failed:
+        rollback(journal_dir)
+        return ApplyResult(journal_dir, written, failed, True)
+
+    manifest['state'] = 'applied'
+    _write_journal(journal_dir, manifest)
+    return ApplyResult(journal_dir, written, failed, False)
+
+
+def list_journals(journal_root: str = JOURNAL_ROOT) -> List[str]:
+    """Recorded journals, oldest first by the time each run started"""
+    if not os.path.isdir(journal_root):
+        return []
+    journals = []
+    for name in os.listdir(journal_root):
+        manifest_path = os.path.join(journal_root, name, 'journal.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                journals.append((json.load(f)['created'], os.path.join(journal_root, name)))
+    return [journal_dir for _, journal_dir in sorted(journals)]
+
+
+def rollback(journal_dir: str) -> Dict[str, List[str]]:
+    """Restore every file recorded in a journal.
+
+    Files whose content no longer matches what the codemod wrote are left alone and
+    reported as conflicts; files that were never written are reported as untouched.
+    Files the run created are removed again.
+    """
+    with open(os.path.join(journal_dir, 'journal.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    report: Dict[str, List[str]] = {'restored': [], 'untouched': [], 'conflict': []}
+    for entry in manifest['entries']:
+        path = entry['path']
+        try:
+            with open(path, 'rb') as f:
+                current = _digest(f.read())
+        except OSError:
+            current = None
+
+        if current == entry['before']:
+            report['untouched'].append(path)
+        elif current == entry['after'] and entry['backup'] is None:
+            os.unlink(path)
+            report['restored'].append(path)
+        elif current == entry['after'] and os.path.exists(os.path.join(journal_dir, 'files', entry['backup'])):
+            with open(os.path.join(journal_dir, 'files', entry['backup']), 'rb') as f:
+                _write_atomically(path, f.read(), os.stat(path).st_mode & 0o7777)
+            report['restored'].append(path)
+        else:
+            report['conflict'].append(path)
+
+    manifest['state'] = 'rolled-back' if not report['conflict'] else 'partially-rolled-back'
+    _write_journal(journal_dir, manifest)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or roll back codemod runs')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='show recorded journals')
+    undo = sub.add_parser('rollback', help='restore the files changed by a run')
+    undo.add_argument('journal', nargs='?', help='journal directory (default: the latest one)')
+    args = parser.parse_args()
+
+    journals = list_journals()
+    if args.command == 'list':
+        for journal_dir in journals:
+            with open(os.path.join(journal_dir, 'journal.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            print(f"{journal_dir}  {manifest['codemod']}  {manifest['state']}  {len(manifest['entries'])} files")
+        return
+
+    journal_dir = args.journal or (journals[-1] if journals else None)
+    if not journal_dir:
+        print(f"No journals found in {JOURNAL_ROOT}")
+        sys.exit(1)
+
+    report = rollback(journal_dir)
+    for path in report['conflict']:
+        print(f"[CONFLICT] {os.path.relpath(path)}: changed after the codemod ran, not restored")
+    print(f"Restored {len(report['restored'])} files from {journal_dir}")
+    if report['conflict']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Shared loader for the docker-compose files, used by test-deployment.py and pg_config_check.py.
+PyYAML is imported on first use, so tools that only sometimes read YAML still run without it.
+
+Usage: python3 scripts/compose_config.py [pattern]   (lists every service per compose file)
+"""
+
+import glob
+import sys
+from typing import Any, Iterator, NamedTuple
+
+COMPOSE_PATTERN = 'docker-compose*.yml'
+
+
+class ComposeService(NamedTuple):
+    compose_file: str
+    name: str
+    config: dict  # the service mapping as written, {} for an empty service
+
+
+def load_yaml(path: str) -> Any:
+    """Parse one YAML file; raises RuntimeError naming the missing package when PyYAML is absent"""
+    try:
+        import yaml
+    except ImportError:
+        raise RuntimeError('PyYAML is required to parse YAML configuration (pip install pyyaml)') from None
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def compose_services(pattern: str = COMPOSE_PATTERN) -> Iterator[ComposeService]:
+    """Every service of every matching compose file, in file name then declaration order"""
+    for compose_file in sorted(glob.glob(pattern)):
+        data = load_yaml(compose_file) or {}
+        for name, service in (data.get('services') or {}).items():
+            yield ComposeService(compose_file, name, service or {})
+
+
+def container_ports(service: dict) -> Iterator[str]:
+    """Container-side ports a service publishes or exposes: '3000:3000/tcp' -> '3000'"""
+    for port in list(service.get('ports') or []) + list(service.get('expose') or []):
+        container_port = str(port.get('target') if isinstance(port, dict) else port).split(':')[-1]
+        yield container_port.split('/')[0]
+
+
+def main():
+    for service in compose_services(sys.argv[1] if len(sys.argv) > 1 else COMPOSE_PATTERN):
+        ports = ','.join(container_ports(service.config))
+        print(f"{service.compose_file}:{service.name} {service.config.get('image') or '(build)'} {ports}".rstrip())
+
+
+if __name__ == '__main__':
+    main()
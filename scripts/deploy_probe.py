@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+HTTP probing for test-deployment.py: a pooled, retrying client, concurrent
+per-endpoint latency and error statistics, and a local stand-in server so the
+probe, loadtest and scrape checks can run without a deployment.
+requests is imported on first use, so the latency helpers work without it.
+
+Usage: python3 src/lib/test-deployment.py probe [--endpoint PATH ...] [--stand-in]
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))  # ceil(pct/100 * n)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(latencies_ms)
+    summary = {f'p{pct}_ms': percentile(ordered, pct) for pct in (50, 95, 99)}
+    summary['max_ms'] = ordered[-1] if ordered else None
+    return {key: round(value, 2) if value is not None else None for key, value in summary.items()}
+
+
+class ProbeClient:
+    """One requests.Session per thread: the pool reuses keep-alive connections and retries with backoff"""
+
+    def __init__(self, pool_size: int = 10, retries: int = 2, timeout: float = 5.0):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def session(self) -> 'requests.Session':
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(total=self.retries, connect=self.retries, read=self.retries, backoff_factor=0.1,
+                          status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET', 'HEAD']),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url: str):
+        """(status code or None, elapsed ms, error name)"""
+        import requests
+        start = time.perf_counter()
+        try:
+            response = self.session().get(url, timeout=self.timeout)
+            response.content  # the connection only returns to the pool once the body is read
+            return response.status_code, (time.perf_counter() - start) * 1000, None
+        except requests.RequestException as e:
+            return None, (time.perf_counter() - start) * 1000, type(e).__name__
+
+
+def probe_stats(base_url: str, endpoints: List[str], requests_per_endpoint: int = 20, concurrency: int = 10,
+                timeout: float = 5.0, retries: int = 2) -> Dict[str, Dict[str, Any]]:
+    """Request every endpoint concurrently; endpoint -> request and error counts, statuses and p50/p95/p99"""
+    client = ProbeClient(pool_size=concurrency, retries=retries, timeout=timeout)
+    jobs = [endpoint for endpoint in endpoints for _ in range(requests_per_endpoint)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda endpoint: client.get(base_url.rstrip('/') + endpoint), jobs))
+
+    per_endpoint: Dict[str, List] = {endpoint: [] for endpoint in endpoints}
+    for endpoint, outcome in zip(jobs, outcomes):
+        per_endpoint[endpoint].append(outcome)
+
+    stats = {}
+    for endpoint, samples in per_endpoint.items():
+        latencies = [latency for status, latency, error in samples if status is not None]
+        statuses: Dict[str, int] = {}
+        errors = 0
+        for status, _, error in samples:
+            key = str(status) if status is not None else error
+            statuses[key] = statuses.get(key, 0) + 1
+            if status is None or status >= 400:
+                errors += 1
+        stats[endpoint] = {'requests': len(samples), 'errors': errors,
+                           'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+                           'statuses': statuses, **latency_summary(latencies)}
+    return stats
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in service: every GET returns a healthy JSON body, optionally after a delay"""
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are written separately; Nagle plus delayed ACKs stalls keep-alive
+    delay = 0.0
+    metrics = None  # when set, /metrics serves this Prometheus text
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.metrics is not None and self.path.split('?')[0] == '/metrics':
+            body, content_type = self.metrics.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps({'status': 'healthy', 'path': self.path}).encode('utf-8'), 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server(delay: float = 0.0, metrics: str = None) -> ThreadingHTTPServer:
+    """Start the stand-in on a free port; server.server_address is where it listens"""
+    handler = type('StandInHandler', (StandInHandler,), {'delay': delay, 'metrics': metrics})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Static analysis of the Dockerfiles and the docker build context, used by
+test-deployment.py (its Docker check and the `dockerfile` subcommand).
+Each Dockerfile is scored 0-100 from findings on layer order, stage reuse,
+final image size and security; findings carry the message shown in the report.
+
+Usage: python3 src/lib/test-deployment.py dockerfile [PATH ...] [--json]
+"""
+
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+DOCKERFILES = ['Dockerfile', 'Dockerfile.simple', 'Dockerfile.zeabur']
+DEPENDENCY_INSTALL_RE = re.compile(r'\b(?:npm\s+(?:ci|install|i)\b|yarn(?:\s+install)?\s*(?:$|--)|pnpm\s+(?:install|i)\b)')
+DOCKER_SCORE_THRESHOLD = 70  # a Dockerfile scoring below this fails the check
+BUILD_CONTEXT_LIMIT = 50 * 1024 * 1024  # warn when the build context is larger
+
+
+class DockerInstruction(NamedTuple):
+    line: int
+    cmd: str
+    args: str
+
+
+class DockerStage(NamedTuple):
+    index: int
+    base: str
+    name: Optional[str]
+    line: int
+    instructions: List[DockerInstruction]
+
+
+class DockerFinding(NamedTuple):
+    category: str  # 'build-time', 'image-size' or 'security'
+    penalty: int
+    line: int
+    message: str
+    suggestion: str
+
+
+def parse_dockerfile(text: str) -> List[DockerStage]:
+    """Stages of a Dockerfile: continuation lines joined, comments dropped, each instruction at its first line"""
+    stages: List[DockerStage] = []
+    pending, start = '', 0
+    for number, raw in enumerate(text.lstrip('\ufeff').splitlines(), 1):
+        line = raw.strip()
+        if not pending and (not line or line.startswith('#')):
+            continue
+        if pending and line.startswith('#'):
+            continue
+        if not pending:
+            start = number
+        if line.endswith('\\'):
+            pending += line[:-1] + ' '
+            continue
+        statement, pending = pending + line, ''
+        cmd, _, args = statement.partition(' ')
+        cmd, args = cmd.upper(), args.strip()
+        if cmd == 'FROM':
+            parts = args.split()
+            name = parts[2] if len(parts) >= 3 and parts[1].upper() == 'AS' else None
+            stages.append(DockerStage(len(stages), parts[0], name, start, []))
+        elif stages:
+            stages[-1].instructions.append(DockerInstruction(start, cmd, args))
+    return stages
+
+
+def analyze_dockerfile(text: str, next_config: str = '') -> List[DockerFinding]:
+    """Findings on layer order, stage reuse, final image size and security settings"""
+    stages = parse_dockerfile(text)
+    findings: List[DockerFinding] = []
+    if not stages:
+        return [DockerFinding('build-time', 100, 0, '没有 FROM 指令', '检查 Dockerfile 内容')]
+
+    final = stages[-1]
+    names = {stage.name: stage for stage in stages if stage.name}
+    referenced = set()
+    for stage in stages:
+        if stage.base in names:
+            referenced.add(stage.base)
+        for instruction in stage.instructions:
+            source = re.search(r'--from=(\S+)', instruction.args)
+            if instruction.cmd == 'COPY' and source:
+                referenced.add(source.group(1))
+
+    # Layer order: copying the whole context before installing dependencies invalidates the
+    # dependency layer on every source change
+    for stage in stages:
+        copied_everything = None
+        for instruction in stage.instructions:
+            if instruction.cmd in ('COPY', 'ADD') and '--from=' not in instruction.args:
+                sources = instruction.args.split()[:-1]
+                if any(source in ('.', './', '*') or source.startswith(('src', 'public')) for source in sources
+                       if not source.startswith('--')):
+                    copied_everything = copied_everything or instruction
+            if instruction.cmd == 'RUN' and DEPENDENCY_INSTALL_RE.search(instruction.args) and copied_everything:
+                findings.append(DockerFinding(
+                    'build-time', 20, copied_everything.line,
+                    f'阶段 {stage.name or stage.index} 在安装依赖 (第 {instruction.line} 行) 之前复制了源码',
+                    '先只 COPY package.json/package-lock.json/prisma 并安装依赖，再 COPY 其余源码'))
+                break
+
+    # Deliberate cache-busting layers: in a base stage they stop every later layer from being reused
+    for stage in stages:
+        for instruction in stage.instructions:
+            if instruction.cmd == 'RUN' and re.search(r'cache[\s_-]*bust', instruction.args, re.IGNORECASE):
+                findings.append(DockerFinding(
+                    'build-time', 15, instruction.line, '手动 cache bust 层使其后的所有层在每次修改时重建',
+                    '删除该层；需要强制刷新时使用 docker build --no-cache 或 --build-arg'))
+
+    # Multi-stage builds
+    if len(stages) == 1:
+        findings.append(DockerFinding(
+            'image-size', 25, final.line, '单阶段构建：编译工具链、devDependencies 和源码都进入最终镜像',
+            '拆分为 deps / builder / runner 多阶段，runner 只复制运行所需产物'))
+
+    for name, stage in names.items():
+        if stage is not final and name not in referenced:
+            findings.append(DockerFinding(
+                'build-time', 10, stage.line, f'阶段 {name} 未被任何阶段引用，其依赖安装被浪费',
+                f'删除阶段 {name}，或让后续阶段 FROM {name} / COPY --from={name} 复用其 node_modules'))
+
+    installs = [(stage, instruction) for stage in stages for instruction in stage.instructions
+                if instruction.cmd == 'RUN' and DEPENDENCY_INSTALL_RE.search(instruction.args)]
+    for stage, instruction in installs:
+        if '--mount=type=cache' not in instruction.args:
+            findings.append(DockerFinding(
+                'build-time', 5, instruction.line, '依赖安装没有使用 BuildKit 缓存挂载',
+                'RUN --mount=type=cache,target=/root/.npm npm ci ...'))
+            break
+
+    npm_config_stages = [stage for stage in stages
+                         if any(i.cmd == 'RUN' and 'npm config set' in i.args for i in stage.instructions)]
+    if len(npm_config_stages) > 1:
+        findings.append(DockerFinding(
+            'build-time', 3, npm_config_stages[1].line, 'npm 镜像源配置在多个阶段重复',
+            '把 npm config 放到共同的 base 阶段，或用 .npmrc 一次复制'))
+
+    # Final image size
+    final_copies = [i for i in final.instructions if i.cmd == 'COPY']
+    if len(stages) > 1:
+        uses_standalone = any('.next/standalone' in i.args for i in final_copies)
+        copies_modules = [i for i in final_copies if re.search(r'\bnode_modules\b', i.args)]
+        if not uses_standalone:
+            note = '（next.config.js 当前关闭了 standalone）' if 'standalone' not in re.sub(r'//.*', '', next_config) else ''
+            findings.append(DockerFinding(
+                'image-size', 15, (copies_modules or final_copies or [final])[0].line,
+                f'未使用 Next.js standalone 输出，运行镜像复制完整 node_modules 与 .next{note}',
+                "设置 output: 'standalone'，运行阶段只复制 .next/standalone、.next/static 和 public"))
+        for instruction in copies_modules:
+            source = re.search(r'--from=(\S+)', instruction.args)
+            source_stage = names.get(source.group(1)) if source else None
+            if source_stage and any(i.cmd == 'RUN' and DEPENDENCY_INSTALL_RE.search(i.args)
+                                    and not re.search(r'--(?:only|omit)=(?:prod|production|dev)', i.args)
+                                    for i in source_stage.instructions):
+                findings.append(DockerFinding(
+                    'image-size', 10, instruction.line, f'运行镜像的 node_modules 来自 {source_stage.name}，包含 devDependencies',
+                    '从只安装生产依赖的阶段复制 node_modules，或在 builder 中 npm prune --omit=dev'))
+        for instruction in final_copies:
+            if re.search(r'/app/src\b', instruction.args):
+                findings.append(DockerFinding(
+                    'image-size', 5, instruction.line, '运行镜像包含 src 源码目录',
+                    '构建产物已包含编译后的代码，运行阶段无需 src'))
+
+    for instruction in final.instructions:
+        if instruction.cmd == 'RUN' and re.search(r'\bchown\s+-R\b', instruction.args):
+            findings.append(DockerFinding(
+                'image-size', 10, instruction.line, 'chown -R 会把已复制的文件整体再写一层',
+                '使用 COPY --chown=... 并去掉递归 chown'))
+        if instruction.cmd == 'RUN' and 'prisma generate' in instruction.args and len(stages) > 1:
+            findings.append(DockerFinding(
+                'build-time', 5, instruction.line, '运行阶段重复执行 prisma generate',
+                '直接复制 builder 中生成的 node_modules/.prisma'))
+
+    # Security
+    if not any(i.cmd == 'USER' for i in final.instructions):
+        findings.append(DockerFinding('security', 10, final.line, '最终镜像以 root 运行', '添加非 root 用户并 USER 切换'))
+    if not any(i.cmd == 'HEALTHCHECK' for stage in stages for i in stage.instructions):
+        findings.append(DockerFinding('security', 5, final.line, '没有 HEALTHCHECK', 'HEALTHCHECK CMD node healthcheck.js'))
+    return findings
+
+
+def dockerignore_matcher(text: str):
+    """A path predicate with .dockerignore semantics: later rules win, `!` re-includes,
+    and a matching directory excludes everything below it"""
+    rules = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        pattern = line[1:].strip() if negate else line
+        pattern = pattern.strip('/')
+        if pattern.startswith('./'):
+            pattern = pattern[2:]
+        regex = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**', i):
+                regex += '.*'
+                i += 2
+                if pattern.startswith('/', i):
+                    regex += '/?'
+                    i += 1
+                continue
+            char = pattern[i]
+            regex += '[^/]*' if char == '*' else '[^/]' if char == '?' else re.escape(char)
+            i += 1
+        rules.append((re.compile('^' + regex + '(?:/.*)?$'), negate))
+
+    def ignored(path: str) -> bool:
+        result = False
+        for regex, negate in rules:
+            if regex.match(path):
+                result = not negate
+        return result
+
+    ignored.has_exceptions = any(negate for _, negate in rules)
+    return ignored
+
+
+def estimate_build_context(root: str = '.', top: int = 5) -> Dict[str, Any]:
+    """Size of the context docker build sends, with the largest top-level entries"""
+    text = ''
+    if os.path.exists(os.path.join(root, '.dockerignore')):
+        with open(os.path.join(root, '.dockerignore'), 'r', encoding='utf-8') as f:
+            text = f.read()
+    ignored = dockerignore_matcher(text)
+
+    included_files = included_bytes = excluded_bytes = 0
+    by_entry: Dict[str, int] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        rel_dir = '' if rel_dir == '.' else rel_dir + '/'
+        if not ignored.has_exceptions:
+            # Without `!` rules an ignored directory can be skipped whole instead of file by file
+            dirnames[:] = [d for d in dirnames if not ignored(rel_dir + d)]
+        for filename in filenames:
+            rel = rel_dir + filename
+            try:
+                size = os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+            if ignored(rel):
+                excluded_bytes += size
+                continue
+            included_files += 1
+            included_bytes += size
+            entry = rel.split('/', 1)[0]
+            by_entry[entry] = by_entry.get(entry, 0) + size
+
+    largest = sorted(by_entry.items(), key=lambda item: -item[1])[:top]
+    return {'files': included_files, 'bytes': included_bytes, 'excluded_bytes_scanned': excluded_bytes,
+            'largest_entries': [{'path': path, 'bytes': size} for path, size in largest]}
+
+
+def docker_report(paths: List[str] = None) -> Dict[str, Any]:
+    """Score every Dockerfile 0-100 and list its findings, worst first, with penalties per category"""
+    next_config = ''
+    if os.path.exists('next.config.js'):
+        with open('next.config.js', 'r', encoding='utf-8') as f:
+            next_config = f.read()
+
+    report = {'dockerfiles': {}, 'context': estimate_build_context()}
+    for path in paths or DOCKERFILES:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            findings = analyze_dockerfile(f.read(), next_config)
+        penalties: Dict[str, int] = {}
+        for finding in findings:
+            penalties[finding.category] = penalties.get(finding.category, 0) + finding.penalty
+        report['dockerfiles'][path] = {
+            'score': max(0, 100 - sum(penalties.values())),
+            'penalties': penalties,
+            'findings': [finding._asdict() for finding in sorted(findings, key=lambda f: (-f.penalty, f.line))],
+        }
+    return report
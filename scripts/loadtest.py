@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Load generator behind `test-deployment.py loadtest`: fixed-concurrency (closed loop)
+or fixed-RPS (open loop) runs over a weighted route mix, HDR-style latency
+histograms per route, and the regression check against a saved baseline report.
+
+Usage: python3 src/lib/test-deployment.py loadtest [--route PATH=WEIGHT ...] [--rps N | --concurrency N]
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from deploy_probe import ProbeClient
+
+
+class LatencyHistogram:
+    """HDR-style histogram: microsecond values bucketed to two significant digits (about 1% error),
+    so memory grows with the number of magnitudes, not samples"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = None
+
+    @staticmethod
+    def bucket(value_us: int) -> int:
+        width = 10 ** max(0, len(str(value_us)) - 2)
+        return value_us // width * width
+
+    def record(self, value_ms: float):
+        value_us = max(1, int(value_ms * 1000))
+        key = self.bucket(value_us)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        self.sum_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = value_us if self.max_us is None else max(self.max_us, value_us)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        for value in (other.min_us, other.max_us):
+            if value is not None:
+                self.min_us = value if self.min_us is None else min(self.min_us, value)
+                self.max_us = value if self.max_us is None else max(self.max_us, value)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentile in ms: the upper bound of its bucket, capped at the maximum"""
+        if not self.total:
+            return None
+        rank = max(1, -(-pct * self.total // 100))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                width = 10 ** max(0, len(str(key)) - 2)
+                return min(key + width, self.max_us) / 1000
+        return self.max_us / 1000
+
+    def to_json(self) -> Dict[str, Any]:
+        summary = {'count': self.total,
+                   'min_ms': self.min_us / 1000 if self.total else None,
+                   'mean_ms': round(self.sum_us / self.total / 1000, 3) if self.total else None,
+                   'max_ms': self.max_us / 1000 if self.total else None}
+        for pct in (50, 90, 95, 99, 99.9):
+            summary[f'p{pct:g}_ms'] = self.percentile(pct)
+        summary['buckets'] = [[key / 1000, self.counts[key]] for key in sorted(self.counts)]
+        return summary
+
+
+class LoadStats:
+    """Thread-safe load statistics: one histogram and status counts per route"""
+
+    def __init__(self, routes: List[str]):
+        self.lock = threading.Lock()
+        self.histograms = {route: LatencyHistogram() for route in routes}
+        self.statuses: Dict[str, Dict[str, int]] = {route: {} for route in routes}
+        self.errors = {route: 0 for route in routes}
+
+    def record(self, route: str, status: Optional[int], latency_ms: float, error: Optional[str]):
+        key = str(status) if status is not None else error
+        with self.lock:
+            self.histograms[route].record(latency_ms)
+            self.statuses[route][key] = self.statuses[route].get(key, 0) + 1
+            if status is None or status >= 400:
+                self.errors[route] += 1
+
+    def report(self, mode: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        overall = LatencyHistogram()
+        routes = {}
+        for route, histogram in self.histograms.items():
+            overall.merge(histogram)
+            routes[route] = {'requests': histogram.total, 'errors': self.errors[route],
+                             'error_rate': round(self.errors[route] / histogram.total, 4) if histogram.total else 0.0,
+                             'statuses': self.statuses[route], 'latency': histogram.to_json()}
+        errors = sum(self.errors.values())
+        return {'mode': mode, 'duration_s': round(elapsed, 3), 'requests': overall.total,
+                'throughput_rps': round(overall.total / elapsed, 2) if elapsed else 0.0,
+                'errors': errors, 'error_rate': round(errors / overall.total, 4) if overall.total else 0.0,
+                'latency': overall.to_json(), 'routes': routes}
+
+
+def parse_route_mix(specs: List[str]) -> Dict[str, float]:
+    """Route weights from '/api/health=3' specs; a route without a weight gets 1"""
+    mix = {}
+    for spec in specs:
+        route, _, weight = spec.partition('=')
+        mix[route] = float(weight) if weight else 1.0
+    return mix
+
+
+def run_load(base_url: str, mix: Dict[str, float], duration: float, concurrency: int = 0, rps: float = 0,
+             timeout: float = 5.0, seed: int = 0) -> Dict[str, Any]:
+    """Fixed-concurrency (closed loop) or fixed-RPS (open loop) run; returns the JSON report
+
+    Under fixed RPS latency is measured from the scheduled send time, so queueing counts too and
+    coordinated omission does not hide the tail.
+
+    The client is requests on a thread pool rather than an asyncio client (aiohttp/httpx are not
+    project dependencies), which limits the measurement in two ways:
+    - In-flight requests are capped by the pool size (rps * timeout + 1 under fixed RPS, at most 256).
+      When the target slows down the extra requests queue in the pool and show up as latency, not
+      as more requests in flight.
+    - Thread scheduling and GIL overhead are included in every request's latency.
+    The wait between the scheduled time and the thread actually sending is reported separately as
+    dispatch_lag. When it is large the load generator itself is the bottleneck, and the tail latency
+    is not all the server's.
+    """
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    rng = random.Random(seed)
+    stats = LoadStats(routes)
+    pool_size = concurrency or max(1, min(256, int(rps * timeout) + 1))
+    client = ProbeClient(pool_size=pool_size, retries=0, timeout=timeout)
+    base = base_url.rstrip('/')
+
+    dispatch = LatencyHistogram()  # scheduled time to the moment a thread sends; fixed RPS only
+    dispatch_lock = threading.Lock()
+
+    start = time.perf_counter()
+    deadline = start + duration
+
+    if rps:
+        mode = {'type': 'fixed-rps', 'rps': rps, 'max_inflight': pool_size}
+        schedule = []
+
+        def fire(route, scheduled):
+            lag_ms = (time.perf_counter() - scheduled) * 1000
+            with dispatch_lock:
+                dispatch.record(max(lag_ms, 0.0))
+            status, _, error = client.get(base + route)
+            stats.record(route, status, (time.perf_counter() - scheduled) * 1000, error)
+
+        with ThreadPoolExecutor(max_workers=pool_size) as pool:
+            sent = 0
+            while True:
+                scheduled = start + sent / rps
+                if scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                schedule.append(pool.submit(fire, rng.choices(routes, weights)[0], scheduled))
+                sent += 1
+            for future in schedule:
+                future.result()
+    else:
+        mode = {'type': 'fixed-concurrency', 'concurrency': concurrency}
+        picks_lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() < deadline:
+                with picks_lock:
+                    route = rng.choices(routes, weights)[0]
+                status, latency, error = client.get(base + route)
+                stats.record(route, status, latency, error)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+
+    report = stats.report(mode, time.perf_counter() - start)
+    report['target'] = base_url
+    report['mix'] = mix
+    if dispatch.total:
+        report['dispatch_lag'] = dispatch.to_json()
+    return report
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                        max_error_rate: float) -> List[str]:
+    """Regressions against the baseline report; an empty list passes"""
+    regressions = []
+    if report['error_rate'] > max_error_rate:
+        regressions.append(f"错误率 {report['error_rate']:.2%} 超过上限 {max_error_rate:.2%}")
+    if not baseline:
+        return regressions
+
+    old_p99, new_p99 = baseline['latency'].get('p99_ms'), report['latency'].get('p99_ms')
+    if old_p99 and new_p99 and new_p99 > old_p99 * (1 + tolerance):
+        regressions.append(f"p99 延迟 {old_p99}ms -> {new_p99}ms (允许 +{tolerance:.0%})")
+    old_rps, new_rps = baseline.get('throughput_rps'), report['throughput_rps']
+    # Under fixed RPS the schedule sets the throughput, so only closed-loop runs are compared
+    if report['mode']['type'] == 'fixed-concurrency' and old_rps and new_rps < old_rps * (1 - tolerance):
+        regressions.append(f"吞吐量 {old_rps} -> {new_rps} req/s (允许 -{tolerance:.0%})")
+    return regressions
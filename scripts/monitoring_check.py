@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Monitoring configuration checks for test-deployment.py: prometheus.yml against
+the compose services, the alert rules, and the scrape cost of a /metrics
+endpoint (series per metric, label cardinality, payload size).
+
+Usage: python3 src/lib/test-deployment.py   (the monitoring checks run with the rest)
+"""
+
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from compose_config import compose_services, container_ports, load_yaml
+from deploy_probe import ProbeClient, latency_summary
+
+PROMETHEUS_CONFIG = 'docker/prometheus/prometheus.yml'
+SCRAPE_CONFIG_KEYS = {
+    'job_name', 'honor_labels', 'honor_timestamps', 'params', 'scrape_interval', 'scrape_timeout',
+    'metrics_path', 'scheme', 'body_size_limit', 'sample_limit', 'target_limit', 'label_limit',
+    'label_name_length_limit', 'label_value_length_limit', 'basic_auth', 'authorization', 'oauth2',
+    'tls_config', 'proxy_url', 'follow_redirects', 'enable_http2', 'static_configs', 'file_sd_configs',
+    'dns_sd_configs', 'docker_sd_configs', 'kubernetes_sd_configs', 'relabel_configs',
+    'metric_relabel_configs', 'scrape_protocols', 'scrape_classic_histograms', 'native_histogram_bucket_limit',
+}
+SERIES_PER_METRIC_LIMIT = 1000  # series per metric
+LABEL_VALUES_LIMIT = 100  # distinct values per label
+SCRAPE_PAYLOAD_LIMIT = 1024 * 1024  # warn above this many bytes per scrape
+
+
+def parse_duration(value) -> Optional[float]:
+    """Prometheus duration (15s, 1m30s, 500ms) in seconds, or None when it does not parse"""
+    text = str(value).strip()
+    units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'y': 31536000}
+    parts = re.findall(r'(\d+)(ms|[smhdwy])', text)
+    if not parts or ''.join(number + unit for number, unit in parts) != text:
+        return None
+    return sum(int(number) * units[unit] for number, unit in parts)
+
+
+def load_compose_services() -> Dict[str, Dict[str, Any]]:
+    """Every service in the compose files -> {'files': [...], 'ports': set of container ports}"""
+    services: Dict[str, Dict[str, Any]] = {}
+    for service in compose_services():
+        entry = services.setdefault(service.name, {'files': [], 'ports': set()})
+        entry['files'].append(service.compose_file)
+        entry['ports'].update(container_ports(service.config))
+    return services
+
+
+def validate_prometheus_config(config: Dict[str, Any], services: Dict[str, Dict[str, Any]]):
+    """(configuration errors, scrape targets no compose service answers, scrape jobs)"""
+    errors, unresolved = [], []
+    global_config = config.get('global') or {}
+    default_interval = parse_duration(global_config.get('scrape_interval', '1m'))
+    default_timeout = parse_duration(global_config.get('scrape_timeout', '10s'))
+
+    for rule_file in config.get('rule_files') or []:
+        if not os.path.exists(os.path.join(os.path.dirname(PROMETHEUS_CONFIG), rule_file)):
+            errors.append(f'规则文件不存在: {rule_file}')
+
+    jobs = config.get('scrape_configs') or []
+    seen = set()
+    for job in jobs:
+        name = job.get('job_name')
+        if not name:
+            errors.append('存在缺少 job_name 的抓取任务')
+            continue
+        if name in seen:
+            errors.append(f'{name}: job_name 重复')
+        seen.add(name)
+
+        unknown = sorted(set(job) - SCRAPE_CONFIG_KEYS)
+        if unknown:
+            errors.append(f'{name}: 未知配置项 {unknown}（Prometheus 会拒绝加载）')
+
+        interval = parse_duration(job.get('scrape_interval', global_config.get('scrape_interval', '1m')))
+        timeout = parse_duration(job.get('scrape_timeout', global_config.get('scrape_timeout', '10s')))
+        if interval is None or timeout is None:
+            errors.append(f'{name}: 无法解析的 scrape_interval/scrape_timeout')
+        elif timeout > interval:
+            errors.append(f'{name}: scrape_timeout {timeout}s 大于 scrape_interval {interval}s')
+        elif 'scrape_timeout' not in job and default_timeout and interval < default_timeout:
+            errors.append(f'{name}: scrape_interval {interval}s 小于默认 scrape_timeout {default_timeout}s')
+
+        # A job that relabels __address__ (blackbox) connects to the replacement, not its static targets
+        rewritten = [relabel.get('replacement') for relabel in job.get('relabel_configs') or []
+                     if relabel.get('target_label') == '__address__' and relabel.get('replacement')]
+        targets = rewritten or [target for static in job.get('static_configs') or []
+                                for target in static.get('targets') or []]
+        for target in targets:
+            host, _, port = str(target).rpartition(':')
+            if host in ('localhost', '127.0.0.1') and name == 'prometheus':
+                continue
+            if host not in services:
+                unresolved.append(f'{name}: {target}（没有名为 {host} 的 compose 服务）')
+            elif services[host]['ports'] and port not in services[host]['ports']:
+                unresolved.append(f'{name}: {target}（{host} 未暴露端口 {port}）')
+    return errors, unresolved, jobs
+
+
+def validate_alert_rules(path: str) -> List[str]:
+    """Alert rule structure: required fields, `for` durations, duplicate names, balanced brackets"""
+    data = load_yaml(path) or {}
+    errors = []
+    names = set()
+    for group in data.get('groups') or []:
+        for rule in group.get('rules') or []:
+            name = rule.get('alert') or rule.get('record')
+            if not name or 'expr' not in rule:
+                errors.append(f"{group.get('name')}: 规则缺少 alert/record 或 expr")
+                continue
+            if rule.get('alert'):
+                if name in names:
+                    errors.append(f'{name}: 告警名重复')
+                names.add(name)
+                if 'for' in rule and parse_duration(rule['for']) is None:
+                    errors.append(f"{name}: 无法解析的 for: {rule['for']}")
+                if not (rule.get('labels') or {}).get('severity'):
+                    errors.append(f'{name}: 缺少 severity 标签')
+            expr = str(rule['expr'])
+            if any(expr.count(open_) != expr.count(close) for open_, close in ('()', '[]', '{}')):
+                errors.append(f'{name}: 表达式括号不配对')
+    return errors
+
+
+def simulated_app_metrics(routes) -> str:
+    """The /metrics output the app would serve if it were instrumented per route, to estimate scrape cost"""
+    buckets = ['0.005', '0.01', '0.025', '0.05', '0.1', '0.25', '0.5', '1', '2.5', '5', '10', '+Inf']
+    lines = ['# HELP http_request_duration_seconds Request duration',
+             '# TYPE http_request_duration_seconds histogram']
+    for route in routes:
+        for method in route.methods or ['GET']:
+            for status in ('200', '400', '500'):
+                labels = f'route="{route.route}",method="{method}",status="{status}"'
+                for le in buckets:
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} 0')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} 0')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} 0')
+    lines += ['# TYPE process_resident_memory_bytes gauge', 'process_resident_memory_bytes 1.5e+08']
+    return '\n'.join(lines) + '\n'
+
+
+def parse_exposition(text: str) -> Dict[str, List[Dict[str, str]]]:
+    """Prometheus text format: metric name -> the labels of each series"""
+    label_re = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+    series: Dict[str, List[Dict[str, str]]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name_end = min([i for i in (line.find('{'), line.find(' ')) if i != -1] or [len(line)])
+        name = line[:name_end]
+        labels = dict(label_re.findall(line[name_end:line.rfind('}') + 1])) if line[name_end:name_end + 1] == '{' else {}
+        series.setdefault(name, []).append(labels)
+    return series
+
+
+def find_high_cardinality(series: Dict[str, List[Dict[str, str]]]) -> List[str]:
+    """Metrics with too many series and labels with too many distinct values"""
+    findings = []
+    for name, label_sets in sorted(series.items()):
+        if len(label_sets) > SERIES_PER_METRIC_LIMIT:
+            findings.append(f'{name}: {len(label_sets)} 条序列')
+        values: Dict[str, set] = {}
+        for labels in label_sets:
+            for label, value in labels.items():
+                values.setdefault(label, set()).add(value)
+        for label, distinct in sorted(values.items()):
+            if len(distinct) > LABEL_VALUES_LIMIT:
+                findings.append(f'{name}{{{label}}}: {len(distinct)} 个取值')
+    return findings
+
+
+def simulate_scrape(url: str, scrapes: int = 5, timeout: float = 10.0) -> Dict[str, Any]:
+    """Scrape url a few times the way Prometheus does: latency, payload size and series cardinality"""
+    client = ProbeClient(pool_size=1, retries=0, timeout=timeout)
+    latencies, size, body = [], 0, ''
+    for _ in range(scrapes):
+        start = time.perf_counter()
+        response = client.session().get(url, timeout=timeout, headers={'Accept': 'text/plain;version=0.0.4'})
+        body = response.text
+        latencies.append((time.perf_counter() - start) * 1000)
+        size = len(response.content)
+        response.raise_for_status()
+    series = parse_exposition(body)
+    return {'url': url, 'scrapes': scrapes, **latency_summary(latencies), 'payload_bytes': size,
+            'metrics': len(series), 'series': sum(len(label_sets) for label_sets in series.values()),
+            'high_cardinality': find_high_cardinality(series)}
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Sanity and capacity check for docker/postgres/postgresql.conf and pg_hba.conf.
+Compares memory, connection and WAL settings against the container limits declared
+in the compose files and against the connections the Prisma pools can actually open.
+
+Usage: python3 scripts/pg_config_check.py [--json]
+"""
+
+import argparse
+import ipaddress
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from compose_config import COMPOSE_PATTERN, compose_services
+
+POSTGRES_CONF = 'docker/postgres/postgresql.conf'
+PG_HBA_CONF = 'docker/postgres/pg_hba.conf'
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+# Unit a bare number is read in, per parameter (postgres docs: "Default unit")
+DEFAULT_UNITS = {
+    'shared_buffers': 8 * KB, 'effective_cache_size': 8 * KB, 'wal_buffers': 8 * KB,
+    'work_mem': KB, 'maintenance_work_mem': KB, 'max_wal_size': MB, 'min_wal_size': MB, 'wal_keep_size': MB,
+}
+# Parameters removed from the server; an unknown parameter stops postgres from starting
+REMOVED_PARAMETERS = {
+    'wal_keep_segments': (13, 'wal_keep_size'),
+    'checkpoint_segments': (9.5, 'max_wal_size'),
+    'vacuum_defer_cleanup_age': (16, None),
+    'operator_precedence_warning': (14, None),
+}
+SUPERUSER_RESERVED = 3
+AUTOVACUUM_WORKERS = 3
+
+
+class Finding(NamedTuple):
+    level: str  # 'error', 'warning' or 'info'
+    message: str
+
+
+class PostgresService(NamedTuple):
+    compose_file: str
+    name: str
+    image: str
+    memory: Optional[int]
+    cpus: Optional[float]
+    mounts_conf: bool
+    loads_conf: bool
+    unparsed: Tuple[str, ...] = ()  # 'setting = value' pairs that could not be read as numbers
+
+
+class AppService(NamedTuple):
+    compose_file: str
+    name: str
+    replicas: int
+    cpus: Optional[float]
+    pool_size: Optional[int]  # connection_limit from DATABASE_URL, when set literally
+    unparsed: Tuple[str, ...] = ()
+
+
+def parse_size(value: str, default_unit: int = 1) -> Optional[int]:
+    """'256MB' / '4GB' / '64' (in the parameter's default unit) -> bytes"""
+    match = re.fullmatch(r'\s*(\d+)\s*(kB|MB|GB|TB|B)?\s*', str(value), re.IGNORECASE)
+    if not match:
+        return None
+    units = {'b': 1, 'kb': KB, 'mb': MB, 'gb': GB, 'tb': 1024 * GB}
+    unit = units[match.group(2).lower()] if match.group(2) else default_unit
+    return int(match.group(1)) * unit
+
+
+def format_size(size: int) -> str:
+    for unit, scale in (('GB', GB), ('MB', MB), ('kB', KB)):
+        if size >= scale and size % scale == 0:
+            return f'{size // scale}{unit}'
+    return f'{size // KB}kB' if size >= KB else f'{size}B'
+
+
+def parse_compose_memory(value) -> Optional[int]:
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kmgt]?)i?b?\s*', str(value), re.IGNORECASE)
+    if not match:
+        return None
+    scale = {'': 1, 'k': KB, 'm': MB, 'g': GB, 't': 1024 * GB}[match.group(2).lower()]
+    return int(float(match.group(1)) * scale)
+
+
+def parse_postgresql_conf(text: str) -> Dict[str, Tuple[str, int]]:
+    """name -> (value, line number); later assignments win, as in postgres"""
+    settings = {}
+    for number, raw in enumerate(text.splitlines(), 1):
+        match = re.match(r"\s*([A-Za-z_][\w.]*)\s*=?\s*('(?:[^'\\]|\\.|'')*'|[^#\s]+)", raw)
+        if not match or raw.lstrip().startswith('#'):
+            continue
+        value = match.group(2)
+        if value.startswith("'"):
+            value = value[1:-1].replace("''", "'")
+        settings[match.group(1).lower()] = (value, number)
+    return settings
+
+
+def parse_pg_hba(text: str) -> List[Tuple[int, List[str]]]:
+    return [(number, line.split('#', 1)[0].split()) for number, line in enumerate(text.splitlines(), 1)
+            if line.split('#', 1)[0].strip()]
+
+
+class HbaRule(NamedTuple):
+    line: int
+    kind: str  # 'local', 'host', 'hostssl', 'hostnossl', ...
+    databases: Tuple[str, ...]
+    users: Tuple[str, ...]
+    address: Optional[str]  # None for local
+    method: str
+
+
+def hba_rules(text: str) -> List[HbaRule]:
+    rules = []
+    for number, fields in parse_pg_hba(text):
+        if fields[0] == 'local' and len(fields) >= 4:
+            rules.append(HbaRule(number, 'local', tuple(fields[1].split(',')), tuple(fields[2].split(',')),
+                                 None, fields[3]))
+        elif len(fields) >= 5:
+            address, method = fields[3], fields[4]
+            if '/' not in address and len(fields) >= 6 and re.fullmatch(r'[\d.]+|[\da-fA-F:]+', fields[4]):
+                # address and netmask in separate columns
+                try:
+                    address = str(ipaddress.ip_network(f'{address}/{fields[4]}', strict=False))
+                except ValueError:
+                    pass
+                method = fields[5]
+            rules.append(HbaRule(number, fields[0], tuple(fields[1].split(',')), tuple(fields[2].split(',')),
+                                 address, method))
+    return rules
+
+
+def _covers_names(earlier: Tuple[str, ...], later: Tuple[str, ...], database: bool) -> bool:
+    # `all` matches every database except replication connections
+    if 'all' in earlier and not (database and 'replication' in later):
+        return True
+    return set(later) <= set(earlier)
+
+
+def _covers_address(earlier: Optional[str], later: Optional[str]) -> bool:
+    if earlier == later or earlier == 'all':
+        return True
+    try:
+        outer, inner = ipaddress.ip_network(earlier, strict=False), ipaddress.ip_network(later, strict=False)
+    except (TypeError, ValueError):
+        return False  # host names, samenet, ...: only an identical entry is known to cover
+    return outer.version == inner.version and inner.subnet_of(outer)
+
+
+def shadowing_rule(rules: List[HbaRule], rule: HbaRule) -> Optional[HbaRule]:
+    """The earlier line that matches every connection `rule` would match, so `rule` is never reached"""
+    for earlier in rules:
+        if earlier.line >= rule.line:
+            break
+        if earlier.kind != rule.kind and not (earlier.kind == 'host' and rule.kind.startswith('host')):
+            continue  # host covers hostssl/hostnossl; the other kinds only cover themselves
+        if _covers_names(earlier.databases, rule.databases, True) and \
+                _covers_names(earlier.users, rule.users, False) and _covers_address(earlier.address, rule.address):
+            return earlier
+    return None
+
+
+def compose_value(value) -> str:
+    """Resolve `${VAR}`, `${VAR:-default}` and `${VAR-default}` the way compose does"""
+    variable = re.fullmatch(r'\s*\$\{(\w+)(?:(:?-)([^}]*))?\}\s*|\s*\$(\w+)\s*', str(value))
+    if not variable:
+        return str(value).strip()
+    current = os.environ.get(variable.group(1) or variable.group(4))
+    if variable.group(2) and (current is None or (variable.group(2) == ':-' and not current)):
+        current = variable.group(3)
+    return (current or '').strip()
+
+
+def parse_number(value, kind: type = int):
+    """A compose number after interpolation, or None when it is not one"""
+    try:
+        return kind(compose_value(value))
+    except ValueError:
+        return None
+
+
+def _limits(service: dict, unparsed: List[str]) -> Tuple[Optional[int], Optional[float]]:
+    limits = (((service.get('deploy') or {}).get('resources') or {}).get('limits') or {})
+    memory = limits.get('memory') or service.get('mem_limit')
+    cpus = limits.get('cpus') or service.get('cpus')
+    memory_bytes = parse_compose_memory(compose_value(memory)) if memory else None
+    cpu_count = parse_number(cpus, float) if cpus else None
+    if memory and memory_bytes is None:
+        unparsed.append(f'memory = {memory}')
+    if cpus and cpu_count is None:
+        unparsed.append(f'cpus = {cpus}')
+    return memory_bytes, cpu_count
+
+
+def database_services(pattern: str = COMPOSE_PATTERN) -> Tuple[List[PostgresService], List[AppService]]:
+    """Postgres services and the app services that connect to them through DATABASE_URL"""
+    postgres, apps = [], []
+    for compose_file, name, service in compose_services(pattern):
+        unparsed: List[str] = []
+        memory, cpus = _limits(service, unparsed)
+        image = str(service.get('image') or '')
+        if image.startswith('postgres'):
+            volumes = [str(volume) for volume in service.get('volumes') or []]
+            command = service.get('command') or ''
+            command = ' '.join(command) if isinstance(command, list) else str(command)
+            postgres.append(PostgresService(
+                compose_file, name, image, memory, cpus,
+                any(POSTGRES_CONF in volume for volume in volumes), 'config_file' in command, tuple(unparsed)))
+            continue
+
+        environment = service.get('environment') or {}
+        if isinstance(environment, dict):
+            environment = [f'{key}={value}' for key, value in environment.items()]
+        urls = [entry.split('=', 1)[1] for entry in environment
+                if str(entry).startswith('DATABASE_URL=') and '=' in str(entry)]
+        if urls:
+            pool = re.search(r'[?&]connection_limit=(\d+)', urls[0])
+            setting = (service.get('deploy') or {}).get('replicas')
+            replicas = parse_number(setting) if setting is not None else 1
+            if replicas is None:
+                unparsed.append(f'replicas = {setting}')
+            apps.append(AppService(compose_file, name, replicas if replicas is not None else 1, cpus,
+                                   int(pool.group(1)) if pool else None, tuple(unparsed)))
+    return postgres, apps
+
+
+def postgres_major(image: str) -> Optional[float]:
+    match = re.search(r':(\d+(?:\.\d+)?)', image)
+    return float(match.group(1)) if match else None
+
+
+def prisma_pool_size(app: AppService) -> int:
+    """Prisma's default pool is num_cpus * 2 + 1; the CPU limit stands in for num_cpus"""
+    if app.pool_size:
+        return app.pool_size
+    return int((app.cpus or 1) * 2 + 1)
+
+
+def recommend(memory: int, cpus: float, connections: int) -> Dict[str, str]:
+    """pgtune-style values for a mixed web workload on `memory` bytes and `cpus` cores"""
+    shared_buffers = memory // 4
+    work_mem = max(4 * MB, (memory - shared_buffers) // (connections * 3))
+    return {
+        'max_connections': str(connections),
+        'shared_buffers': format_size(shared_buffers // MB * MB),
+        'effective_cache_size': format_size(memory * 3 // 4 // MB * MB),
+        'maintenance_work_mem': format_size(min(2 * GB, memory // 16) // MB * MB),
+        'work_mem': format_size(work_mem // MB * MB),
+        'wal_buffers': format_size(min(16 * MB, max(64 * KB, shared_buffers * 3 // 100)) // KB * KB),
+        'min_wal_size': '1GB',
+        'max_wal_size': '4GB',
+        'max_worker_processes': str(max(8, int(cpus))),
+        'max_parallel_workers': str(max(1, int(cpus))),
+        'max_parallel_workers_per_gather': str(max(1, int(cpus) // 2)),
+    }
+
+
+def check(conf_text: str, hba_text: str, postgres: List[PostgresService],
+          apps: List[AppService]) -> Tuple[List[Finding], Dict[str, Dict[str, Any]]]:
+    """Returns findings and {parameter: {'current': ..., 'recommended': ...}}"""
+    findings: List[Finding] = []
+    settings = parse_postgresql_conf(conf_text)
+
+    def size_of(name: str, default: str) -> int:
+        value = settings.get(name, (default, 0))[0]
+        size = parse_size(value, DEFAULT_UNITS.get(name, 1))
+        if size is None:
+            findings.append(Finding('error', f'{name} = {value}: cannot parse size'))
+            return parse_size(default, DEFAULT_UNITS.get(name, 1))
+        return size
+
+    def count_of(name: str, default: int) -> int:
+        value = settings.get(name, (str(default), 0))[0]
+        try:
+            return int(value)
+        except ValueError:
+            findings.append(Finding('error', f'{name} = {value}: cannot parse number'))
+            return default
+
+    # The tier the file is mounted into; the smallest declared limits bound what it can use
+    targets = [service for service in postgres if service.mounts_conf] or postgres
+    # Each compose file is its own deployment: only its app services share this database
+    apps = [app for app in apps if app.compose_file in {service.compose_file for service in targets}]
+    for service in [*targets, *apps]:
+        for setting in service.unparsed:
+            findings.append(Finding('warning', f'{service.compose_file}:{service.name} {setting}: cannot parse, '
+                                               'the capacity check uses the default'))
+    for service in targets:
+        if service.mounts_conf and not service.loads_conf:
+            findings.append(Finding('error', f'{service.compose_file}:{service.name} mounts {POSTGRES_CONF} but never '
+                                             'passes -c config_file=..., so postgres runs on its defaults'))
+    memory = min((service.memory for service in targets if service.memory), default=None)
+    cpus = min((service.cpus for service in targets if service.cpus), default=None)
+    major = min((postgres_major(service.image) for service in targets if postgres_major(service.image)), default=None)
+
+    for name, (removed_in, replacement) in REMOVED_PARAMETERS.items():
+        if name in settings and major and major >= removed_in:
+            hint = f', use {replacement}' if replacement else ''
+            findings.append(Finding('error', f'{name} (line {settings[name][1]}) was removed in postgres '
+                                             f'{removed_in:g}; the server refuses to start{hint}'))
+
+    max_connections = count_of('max_connections', 100)
+    shared_buffers = size_of('shared_buffers', '128MB')
+    work_mem = size_of('work_mem', '4MB')
+    maintenance_work_mem = size_of('maintenance_work_mem', '64MB')
+    wal_buffers = size_of('wal_buffers', '-1') if settings.get('wal_buffers', ('-1',))[0] != '-1' else None
+
+    # Connections: what the Prisma pools can open, plus reserved and replication slots
+    pool_total = sum(prisma_pool_size(app) * app.replicas for app in apps)
+    wal_senders = count_of('max_wal_senders', 10)
+    needed = pool_total + SUPERUSER_RESERVED + wal_senders + 5  # exporters, migrations, psql sessions
+    if apps:
+        detail = ', '.join(f'{app.name}({app.compose_file}) {app.replicas}x{prisma_pool_size(app)}' for app in apps)
+        if max_connections < needed:
+            findings.append(Finding('error', f'max_connections = {max_connections} is below the {needed} connections '
+                                             f'the Prisma pools and reserved slots can open ({detail})'))
+        elif max_connections > needed * 2:
+            findings.append(Finding('warning', f'max_connections = {max_connections} but the Prisma pools can open at '
+                                               f'most {pool_total} ({detail}); the other '
+                                               f'{max_connections - needed} slots only raise worst-case memory'))
+
+    if memory:
+        ratio = shared_buffers / memory
+        if ratio > 0.4:
+            findings.append(Finding('error', f'shared_buffers = {format_size(shared_buffers)} is {ratio:.0%} of the '
+                                             f'{format_size(memory)} container limit (keep it near 25%)'))
+        elif ratio < 0.15:
+            findings.append(Finding('warning', f'shared_buffers = {format_size(shared_buffers)} is only {ratio:.0%} of '
+                                               f'the {format_size(memory)} container limit (25% is typical)'))
+
+        effective_cache = size_of('effective_cache_size', '4GB')
+        if effective_cache > memory:
+            findings.append(Finding('warning', f'effective_cache_size = {format_size(effective_cache)} exceeds the '
+                                               f'{format_size(memory)} container limit; the planner will over-trust cache'))
+
+        # Every connection may use work_mem per sort/hash node; two per query is a conservative middle
+        worst_case = shared_buffers + max_connections * work_mem * 2 + maintenance_work_mem * AUTOVACUUM_WORKERS
+        if worst_case > memory:
+            findings.append(Finding('warning', f'worst case {format_size(worst_case // MB * MB)} '
+                                               f'(shared_buffers + {max_connections} x 2 x work_mem + autovacuum) '
+                                               f'exceeds the {format_size(memory)} limit; the container can be OOM-killed'))
+
+    if wal_buffers is not None and wal_buffers > 16 * MB:
+        findings.append(Finding('info', 'wal_buffers above 16MB rarely helps'))
+    if settings.get('archive_mode', ('off',))[0] == 'on' and settings.get('archive_command', ('',))[0].startswith('cp '):
+        findings.append(Finding('warning', 'archive_command copies WAL with cp onto the same volume; archives are lost '
+                                           'with the volume and cp does not fsync'))
+    if 'max_wal_size' not in settings:
+        findings.append(Finding('info', 'max_wal_size is not set (default 1GB); write bursts will force frequent '
+                                        'checkpoints'))
+
+    # pg_hba: first matching line wins
+    rules = hba_rules(hba_text)
+    md5_lines = []
+    for rule in rules:
+        number = rule.line
+        if rule.kind == 'local' and rule.method == 'trust':
+            findings.append(Finding('warning', f'pg_hba.conf line {number}: local connections are trusted without a password'))
+        if rule.kind == 'host' and rule.address == '0.0.0.0/0':
+            findings.append(Finding('warning', f"pg_hba.conf line {number}: {','.join(rule.databases)}/"
+                                               f"{','.join(rule.users)} accepted from any address without requiring SSL"))
+        earlier = shadowing_rule(rules, rule)
+        if earlier:
+            without_ssl = ' without SSL' if earlier.kind == 'host' and rule.kind == 'hostssl' else ''
+            findings.append(Finding('warning', f'pg_hba.conf line {number}: never reached, line {earlier.line} already '
+                                               f'matches the same databases, users and addresses{without_ssl}'))
+        if rule.method == 'md5':
+            md5_lines.append(str(number))
+    if md5_lines and major and major >= 14:
+        findings.append(Finding('info', f"pg_hba.conf lines {', '.join(md5_lines)}: md5; postgres {major:g} defaults "
+                                        'to scram-sha-256 password hashing'))
+
+    recommendations = {}
+    if memory:
+        connections = max(needed, 20) if apps else max_connections
+        for name, value in recommend(memory, cpus or 1, connections).items():
+            current = settings.get(name, (None,))[0]
+            recommendations[name] = {'current': current, 'recommended': value}
+    return findings, recommendations
+
+
+def run_check(conf_path: str = POSTGRES_CONF, hba_path: str = PG_HBA_CONF):
+    with open(conf_path, 'r', encoding='utf-8') as f:
+        conf_text = f.read()
+    with open(hba_path, 'r', encoding='utf-8') as f:
+        hba_text = f.read()
+    postgres, apps = database_services()
+    findings, recommendations = check(conf_text, hba_text, postgres, apps)
+    return findings, recommendations, postgres, apps
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check postgresql.conf / pg_hba.conf against the compose limits')
+    parser.add_argument('--json', action='store_true', help='print findings and recommendations as JSON')
+    args = parser.parse_args()
+
+    findings, recommendations, postgres, apps = run_check()
+    if args.json:
+        print(json.dumps({'findings': [finding._asdict() for finding in findings],
+                          'recommendations': recommendations}, indent=2))
+    else:
+        for service in postgres:
+            memory = format_size(service.memory) if service.memory else '?'
+            print(f"postgres: {service.compose_file}:{service.name} {service.image} memory={memory} cpus={service.cpus}")
+        for finding in findings:
+            print(f"[{finding.level.upper()}] {finding.message}")
+        if recommendations:
+            print("\nRecommended values:")
+            for name, values in recommendations.items():
+                marker = '' if values['current'] == values['recommended'] else '  <-'
+                print(f"  {name:32} {str(values['current']):>10} -> {values['recommended']}{marker}")
+    sys.exit(1 if any(finding.level == 'error' for finding in findings) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Index advisor for prisma/schema.prisma, cross-referenced with the Prisma calls in src/.
+Every prisma.<model>.<operation>() call site is reduced to the fields its `where` and
+`orderBy` use; a query shape is supported when some index (@id, @unique, @@unique,
+@@index) leads with one of its equality/range fields, or with its sort field when it
+has no filter. Filters only set under a condition (`if (x) where.x = x`,
+`...(x && { x })`) are optional: they stay out of the shape and the suggested key, but an
+index leading with one still counts as used. Reports unsupported shapes (prioritised by
+call-site count and operation) and @@index declarations no query leads with.
+
+Usage: python3 scripts/prisma_index_advisor.py [--schema FILE] [--src DIR] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from source_scanner import SKIP_RE, ResultCache, ScanRule, matching_bracket, scan
+
+SCHEMA_PATH = os.path.join('prisma', 'schema.prisma')
+SOURCE_DIR = 'src'
+CACHE_PATH = os.path.join('.scanner-cache', 'prisma-queries.json')
+
+PRISMA_SCALARS = {'String', 'Int', 'BigInt', 'Float', 'Decimal', 'Boolean', 'DateTime', 'Json', 'Bytes'}
+# How much an unindexed call of each kind costs: list queries scan and sort, writes scan under lock
+OPERATION_WEIGHTS = {'findMany': 3, 'groupBy': 3, 'aggregate': 2, 'count': 2, 'findFirst': 2, 'findFirstOrThrow': 2,
+                     'updateMany': 2, 'deleteMany': 2, 'update': 1, 'delete': 1}
+HIGH_PRIORITY = 6
+MEDIUM_PRIORITY = 3
+
+_BLOCK_RE = re.compile(r'^(model|enum)\s+(\w+)\s*\{(.*?)^\}', re.MULTILINE | re.DOTALL)
+_FIELD_RE = re.compile(r'^\s*(\w+)\s+(\w+)(\[\])?(\?)?(.*)$')
+_BLOCK_INDEX_RE = re.compile(r'^\s*@@(index|unique|id)\s*\(\s*(?:fields\s*:\s*)?\[([^\]]*)\]')
+_RELATION_FIELDS_RE = re.compile(r'@relation\([^)]*fields\s*:\s*\[([^\]]*)\]')
+
+
+# --- query shapes at the call sites (the scan rule) ---
+
+PRISMA_OPERATIONS = ('findMany', 'findFirst', 'findFirstOrThrow', 'findUnique', 'findUniqueOrThrow', 'update',
+                     'updateMany', 'upsert', 'delete', 'deleteMany', 'count', 'aggregate', 'groupBy')
+# Filter operators that still let a B-tree index on the field narrow the scan, apart from plain equality
+RANGE_OPERATORS = {'gt', 'gte', 'lt', 'lte', 'startsWith'}
+EQUALITY_OPERATORS = {'equals', 'in'}
+
+_PRISMA_CALL_RE = re.compile(r'\b(?:prisma|tx|db|this\.prisma)\.(\w+)\.(%s)\s*\(' % '|'.join(PRISMA_OPERATIONS))
+_ENTRY_RE = re.compile(r'''^(?:(\.\.\.)\s*)?["']?([\w$]+)["']?\s*(?::\s*(.*))?$''', re.DOTALL)
+# Filters spread in only when set: `...(status && { status })` or `...(status ? { status } : {})`
+_CONDITIONAL_SPREAD_RES = (re.compile(r'^\.\.\.\s*\([^{}]*&&\s*(\{.*\})\s*\)$', re.DOTALL),
+                           re.compile(r'^\.\.\.\s*\([^{}]*\?\s*(\{.*\})\s*:\s*\{\s*\}\s*\)$', re.DOTALL))
+_GUARD_RE = re.compile(r'\b(?:if|else)\b|&&|\|\||\?')
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split the inside of a {...} or [...] literal at its top-level commas"""
+    parts, depth, start, i = [], 0, 1, 1
+    while i < len(text) - 1:
+        skipped = SKIP_RE.match(text, i)
+        if skipped:
+            i = skipped.end()
+            continue
+        char = text[i]
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:len(text) - 1])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _object_entries(text: str) -> List[Tuple[str, str]]:
+    """(key, value source) for each top-level property of an object literal; shorthand `a` is ('a', 'a')"""
+    entries = []
+    for part in _split_top_level(text):
+        part = SKIP_RE.sub(lambda m: m.group(0) if m.group(0)[0] in '\'"`' else '', part).strip()
+        match = _ENTRY_RE.match(part)
+        if match and not match.group(1):
+            entries.append((match.group(2), (match.group(3) or match.group(2)).strip()))
+    return entries
+
+
+def _declaration(content: str, name: str, before: int) -> Optional[int]:
+    """Offset of the `{` that the declaration of `name` nearest before `before` assigns, or None when
+    that declaration is not an object literal; handlers in one file each declare their own `where`"""
+    declarations = list(re.finditer(r'\b(?:const|let|var)\s+%s\b[^=;]*=\s*' % re.escape(name), content[:before]))
+    if not declarations:
+        return None
+    literal = re.compile(r'\(?\s*\{').match(content, declarations[-1].end())
+    return literal.end() - 1 if literal else None
+
+
+def _literal(content: str, value: str, before: int) -> Optional[str]:
+    """The object literal a value refers to: inline, or the `const name = {...}` it names before the call"""
+    if value.startswith(('{', '[')):
+        return value
+    if re.fullmatch(r'[\w$]+', value):
+        start = _declaration(content, value, before)
+        if start is not None:
+            return content[start:matching_bracket(content, start, '{', '}')]
+    return None
+
+
+def _filter_kind(value: str) -> str:
+    """'eq' or 'range' when an index on the field can serve the filter, else 'other'"""
+    if not value.startswith('{'):
+        return 'eq'
+    operators = {name for name, _ in _object_entries(value)}
+    if operators & EQUALITY_OPERATORS:
+        return 'eq'
+    if operators & RANGE_OPERATORS:
+        return 'range'
+    return 'other'  # relation filter, contains, not, ...
+
+
+def _is_guarded(content: str, start: int, position: int) -> bool:
+    """Whether the statement at `position` only runs conditionally: a guard earlier on its line,
+    or a block opened between the declaration at `start` and it"""
+    line = content[content.rfind('\n', 0, position) + 1:position]
+    if _GUARD_RE.search(SKIP_RE.sub('', line)):
+        return True
+    depth, i = 0, start
+    while i < position:
+        skipped = SKIP_RE.match(content, i)
+        if skipped:
+            i = skipped.end()
+            continue
+        if content[i] == '{':
+            depth += 1
+        elif content[i] == '}':
+            depth -= 1
+        i += 1
+    return depth > 0
+
+
+def _where_fields(content: str, value: str, before: int, fields: Dict[str, str], either: List[str],
+                  optional: Optional[List[str]] = None) -> bool:
+    """Collect field -> 'eq'/'range'/'other' from the where value of the call at `before`;
+    returns False if it could not be resolved.
+
+    Fields that are only set under a condition also go to `optional`, unless the filter always has them.
+    """
+    optional = [] if optional is None else optional
+    literal = _literal(content, value, before)
+    if literal is None:
+        return False
+    if literal.startswith('['):
+        return all(_where_fields(content, item, before, fields, either, optional)
+                   for item in _split_top_level(literal))
+    for key, inner in _object_entries(literal):
+        if key == 'AND':
+            _where_fields(content, inner, before, fields, either, optional)
+        elif key in ('OR', 'NOT'):
+            branches: Dict[str, str] = {}
+            _where_fields(content, inner, before, branches, [])
+            either.extend(name for name in branches if name not in either)
+        else:
+            fields.setdefault(key, _filter_kind(inner))
+            if key in optional:
+                optional.remove(key)
+    conditional: Dict[str, str] = {}
+    for part in _split_top_level(literal):
+        spread = next((match for match in (regex.match(part) for regex in _CONDITIONAL_SPREAD_RES) if match), None)
+        if spread:
+            _where_fields(content, spread.group(1), before, conditional, either)
+    # Filters added between the declaration and the call, e.g. `if (status) { where.status = status }`
+    declaration = _declaration(content, value, before) if re.fullmatch(r'[\w$]+', value) else None
+    if declaration is not None:
+        assignments = re.compile(r'\b%s\.(\w+)\s*=(?!=)\s*' % re.escape(value))
+        for assignment in assignments.finditer(content, declaration, before):
+            name, rest = assignment.group(1), content[assignment.end():before]
+            if name in ('AND', 'OR', 'NOT'):
+                continue
+            inner = rest[:matching_bracket(rest, 0, '{', '}')] if rest.startswith('{') else 'value'
+            if not _is_guarded(content, declaration, assignment.start()):
+                fields.setdefault(name, _filter_kind(inner))
+                if name in optional:
+                    optional.remove(name)
+            else:
+                conditional.setdefault(name, _filter_kind(inner))
+    for name, kind in conditional.items():
+        if name not in fields:
+            fields[name] = kind
+            optional.append(name)
+    return True
+
+
+def _order_fields(content: str, value: str, before: int) -> List[str]:
+    literal = _literal(content, value, before)
+    if literal is None:
+        return []
+    items = _split_top_level(literal) if literal.startswith('[') else [literal]
+    return [key for item in items if item.startswith('{') for key, _ in _object_entries(item)]
+
+
+def check_prisma_queries(path: str, content: str) -> Iterable[dict]:
+    """One record per Prisma call site: model, operation and the fields its where/orderBy use"""
+    for match in _PRISMA_CALL_RE.finditer(content):
+        args_end = matching_bracket(content, match.end() - 1, '(', ')')
+        args = content[match.end():args_end - 1].strip()
+        fields: Dict[str, str] = {}
+        either: List[str] = []
+        optional: List[str] = []
+        order: List[str] = []
+        resolved = True
+        if args.startswith('{'):
+            args = args[:matching_bracket(args, 0, '{', '}')]
+            for key, value in _object_entries(args):
+                if key == 'where':
+                    resolved = _where_fields(content, value, match.start(), fields, either, optional)
+                elif key == 'orderBy':
+                    order = _order_fields(content, value, match.start())
+        elif args:
+            resolved = False
+        yield {'model': match.group(1), 'op': match.group(2), 'line': content.count('\n', 0, match.start()) + 1,
+               'where': [[name, kind] for name, kind in fields.items()], 'either': either, 'optional': optional,
+               'order': order, 'resolved': resolved}
+
+
+PRISMA_QUERY_RULE = ScanRule('prisma-queries', check_prisma_queries, suffixes=('.ts', '.tsx', '.js'),
+                             needle='prisma')
+
+
+class Index(NamedTuple):
+    model: str
+    fields: Tuple[str, ...]
+    kind: str  # 'id', 'unique' or 'index'
+    line: int
+
+
+class Model(NamedTuple):
+    name: str
+    scalars: Set[str]
+    foreign_keys: Set[str]  # scalar columns behind a @relation(fields: [...])
+    indexes: List[Index]
+
+
+class CallSite(NamedTuple):
+    path: str
+    line: int
+    model: str
+    op: str
+    equality: Tuple[str, ...]
+    ranges: Tuple[str, ...]
+    order: Tuple[str, ...]
+    optional: Tuple[str, ...]  # filters only present when the caller sets them
+
+
+class MissingIndex(NamedTuple):
+    model: str
+    shape: str  # e.g. "where userId, status order createdAt (optional: category)"
+    suggestion: str  # @@index([...]) line to add to the model
+    score: int
+    priority: str  # 'high', 'medium' or 'low'
+    sites: List[str]  # path:line
+
+
+class UnusedIndex(NamedTuple):
+    model: str
+    fields: Tuple[str, ...]
+    line: int
+    reason: str
+
+
+def client_name(model: str) -> str:
+    """Property name Prisma Client exposes a model under: MVPVisualizationSession -> mVPVisualizationSession"""
+    return model[:1].lower() + model[1:]
+
+
+def parse_schema(text: str) -> Dict[str, Model]:
+    """client name -> Model for every model block"""
+    blocks = list(_BLOCK_RE.finditer(text))
+    enums = {match.group(2) for match in blocks if match.group(1) == 'enum'}
+    models = {}
+    for match in blocks:
+        if match.group(1) != 'model':
+            continue
+        name = match.group(2)
+        first_line = text.count('\n', 0, match.start(3)) + 1
+        scalars: Set[str] = set()
+        foreign_keys: Set[str] = set()
+        indexes: List[Index] = []
+        for offset, line in enumerate(match.group(3).split('\n')):
+            line = line.split('//')[0]
+            index = _BLOCK_INDEX_RE.match(line)
+            if index:
+                fields = tuple(field.split('(')[0].strip() for field in index.group(2).split(',') if field.strip())
+                indexes.append(Index(name, fields, index.group(1), first_line + offset))
+                continue
+            field = _FIELD_RE.match(line)
+            if not field or field.group(1).startswith('@'):
+                continue
+            field_name, field_type, is_list, _, attributes = field.groups()
+            if (field_type in PRISMA_SCALARS or field_type in enums) and not is_list:
+                scalars.add(field_name)
+            for attribute, kind in (('@id', 'id'), ('@unique', 'unique')):
+                if re.search(r'%s\b' % attribute, attributes):
+                    indexes.append(Index(name, (field_name,), kind, first_line + offset))
+            relation = _RELATION_FIELDS_RE.search(attributes)
+            if relation:
+                foreign_keys.update(fk.strip() for fk in relation.group(1).split(','))
+        models[client_name(name)] = Model(name, scalars, foreign_keys, indexes)
+    return models
+
+
+def load_call_sites(models: Dict[str, Model], src_dir: str = SOURCE_DIR, workers: int = 1) -> List[CallSite]:
+    cache = ResultCache(CACHE_PATH, sources=[__file__])
+    findings = scan([PRISMA_QUERY_RULE], src_dir, workers=workers, cache=cache)[PRISMA_QUERY_RULE.name]
+    cache.save()
+
+    sites = []
+    for finding in findings:
+        info = finding.message
+        model = models.get(info['model'])
+        if model is None:
+            continue  # not a Prisma model, e.g. a same-named property on another client
+        optional = set(info.get('optional', []))
+        scalar = [(name, kind) for name, kind in info['where'] if name in model.scalars and name not in optional]
+        sites.append(CallSite(finding.path, info['line'], info['model'], info['op'],
+                              tuple(name for name, kind in scalar if kind == 'eq'),
+                              tuple(name for name, kind in scalar if kind == 'range'),
+                              tuple(name for name in info['order'] if name in model.scalars),
+                              tuple(name for name in info.get('optional', []) if name in model.scalars)))
+    return sites
+
+
+def supporting_indexes(model: Model, site: CallSite) -> Optional[List[Index]]:
+    """Indexes the database could use for the call, or None when the call has nothing an index could serve"""
+    usable = set(site.equality) | set(site.ranges)
+    if usable:
+        return [index for index in model.indexes if index.fields[0] in usable]
+    if site.order and site.op in ('findMany', 'findFirst', 'findFirstOrThrow'):
+        return [index for index in model.indexes if index.fields[0] == site.order[0]]
+    return None
+
+
+def suggest(site: CallSite) -> Tuple[str, ...]:
+    """Equality columns first, then one range column, else the sort column"""
+    columns = list(site.equality)
+    if site.ranges:
+        columns.append(site.ranges[0])
+    elif site.order and site.order[0] not in columns:
+        columns.append(site.order[0])
+    return tuple(columns)
+
+
+def advise(models: Dict[str, Model], sites: List[CallSite]) -> Tuple[List[MissingIndex], List[UnusedIndex]]:
+    used: Set[Index] = set()
+    unsupported: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]], List[CallSite]] = {}
+    for site in sites:
+        if site.op in ('findUnique', 'findUniqueOrThrow', 'upsert'):
+            continue  # Prisma only accepts unique fields here
+        model = models[site.model]
+        # An index on an optional filter serves the calls that set it, so it is not unused
+        used.update(index for index in model.indexes if index.fields[0] in site.optional)
+        indexes = supporting_indexes(model, site)
+        if indexes is None:
+            continue
+        used.update(indexes)
+        if not indexes:
+            unsupported.setdefault((site.model, site.equality, site.ranges, site.order), []).append(site)
+
+    missing = []
+    for (model_name, equality, ranges, order), shape_sites in unsupported.items():
+        score = sum(OPERATION_WEIGHTS.get(site.op, 1) for site in shape_sites)
+        priority = 'high' if score >= HIGH_PRIORITY else 'medium' if score >= MEDIUM_PRIORITY else 'low'
+        optional = sorted({name for site in shape_sites for name in site.optional})
+        shape = ' '.join(part for part in (
+            f"where {', '.join(equality + ranges)}" if equality or ranges else '',
+            f"order {', '.join(order)}" if order else '',
+            f"(optional: {', '.join(optional)})" if optional else '') if part)
+        missing.append(MissingIndex(models[model_name].name, shape, f"@@index([{', '.join(suggest(shape_sites[0]))}])",
+                                    score, priority, [f'{site.path}:{site.line}' for site in shape_sites]))
+    missing.sort(key=lambda item: (-item.score, item.model, item.shape))
+
+    unused = []
+    for model in models.values():
+        declared = [index for index in model.indexes if index.kind == 'index']
+        for index in declared:
+            wider = [other for other in model.indexes if other is not index and len(other.fields) > len(index.fields)
+                     and other.fields[:len(index.fields)] == index.fields]
+            if wider:
+                unused.append(UnusedIndex(model.name, index.fields, index.line,
+                                          f"prefix of @@{wider[0].kind}([{', '.join(wider[0].fields)}])"))
+            elif index not in used:
+                reason = ('no query leads with it; still serves relation loads and cascades'
+                          if index.fields[0] in model.foreign_keys else 'no query leads with it')
+                unused.append(UnusedIndex(model.name, index.fields, index.line, reason))
+    unused.sort(key=lambda item: (item.model, item.line))
+    return missing, unused
+
+
+def run_advisor(schema_path: str = SCHEMA_PATH, src_dir: str = SOURCE_DIR,
+                workers: int = 1) -> Tuple[List[MissingIndex], List[UnusedIndex], int]:
+    """(missing, unused, number of call sites analysed)"""
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        models = parse_schema(f.read())
+    sites = load_call_sites(models, src_dir, workers)
+    missing, unused = advise(models, sites)
+    return missing, unused, len(sites)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check Prisma indexes against the queries in the source tree')
+    parser.add_argument('--schema', default=SCHEMA_PATH)
+    parser.add_argument('--src', default=SOURCE_DIR)
+    parser.add_argument('--workers', type=int, default=0, help='scan in N processes (0 = one per CPU)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    missing, unused, site_count = run_advisor(args.schema, args.src, args.workers or os.cpu_count() or 1)
+    if args.json:
+        print(json.dumps({'call_sites': site_count, 'missing': [item._asdict() for item in missing],
+                          'unused': [item._asdict() for item in unused]}, indent=2))
+    else:
+        print(f"{site_count} Prisma call sites analysed\n")
+        for item in missing:
+            print(f"[{item.priority.upper()}] {item.model}: {item.shape} -> add {item.suggestion}  "
+                  f"({len(item.sites)} call sites, score {item.score})")
+            for site in item.sites:
+                print(f"    {site}")
+        if unused:
+            print()
+        for item in unused:
+            print(f"[UNUSED] {item.model} @@index([{', '.join(item.fields)}]) (schema line {item.line}): {item.reason}")
+    sys.exit(1 if any(item.priority == 'high' for item in missing) else 0)
+
+
+if __name__ == '__main__':
+    main()
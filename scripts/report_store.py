@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Local SQLite store for check reports, with regression and trend queries.
+Ingests the loose production-check-*.json, scripts/ai-marketplace-check-*.json and
+bidding-test-*.json reports (plus loadtest reports) and the runs test-deployment.py
+appends. Every report is flattened into one row per leaf value; files already
+ingested are skipped by mtime and size, so queries never re-parse JSON.
+test-deployment.py appends unless run with --no-store; REPORT_STORE_DB moves the
+database (e.g. to a CI workspace) instead of .reports/.
+
+Usage:
+  python3 scripts/report_store.py ingest [FILE ...]          # default: the known report globs
+  python3 scripts/report_store.py runs [--source SOURCE]
+  python3 scripts/report_store.py regressions [--source SOURCE] [--tolerance 0.2]
+  python3 scripts/report_store.py trend 'availability.responseTime' [--source SOURCE]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+REPORT_DB = os.environ.get('REPORT_STORE_DB') or os.path.join('.reports', 'reports.sqlite3')
+REPORT_GLOBS = ['production-check-*.json', os.path.join('scripts', 'ai-marketplace-check-*.json'),
+                'bidding-test-*.json']
+_SOURCE_RE = re.compile(r'^(.*?)-\d{4}-\d{2}-\d{2}T')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    url TEXT,
+    started_at TEXT NOT NULL,
+    path TEXT
+);
+CREATE TABLE IF NOT EXISTS observations (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    num REAL,
+    text TEXT,
+    PRIMARY KEY (run_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    run_id INTEGER REFERENCES runs(id) ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_source ON runs(source, url, started_at);
+CREATE INDEX IF NOT EXISTS observations_by_key ON observations(key, run_id);
+'''
+
+# Subtrees that are identifiers or raw payloads rather than measurements
+SKIPPED_KEYS = {'headers', 'mainFrame', 'data', 'buckets', 'json', 'messages', 'bids', 'testIdea'}
+SKIPPED_TEXT = re.compile(r'(?:timestamp|Time|At|note|message|description|title|url|contentType)$')
+
+GOOD_STATES = {'success', 'ok', 'healthy', 'completed', 'excellent', 'good', 'passed', 'connected'}
+FLAG_KEYS = {'available', 'ok', 'working', 'success', 'secure', 'nextAuthWorking', 'isComplete'}
+LATENCY_KEY = re.compile(r'(?:responseTime|latency|[Dd]uration|_ms|_s)$')
+THROUGHPUT_KEY = re.compile(r'(?:throughput\w*|rps)$')
+FAILURE_KEY = re.compile(r'(?:(?:errors|failures|failedRequests|issues|warnings)\.count|error_rate|errors)$')
+HTTP_STATUS_KEY = re.compile(r'(?:\.status|sessionEndpoint)$')
+MIN_LATENCY_DELTA_MS = 50.0  # smaller swings are noise for these network checks
+
+
+class Change(NamedTuple):
+    key: str
+    kind: str  # 'latency', 'throughput', 'failures', 'status', 'flag', 'http', 'missing'
+    before: Any
+    after: Any
+
+
+def connect(path: str = REPORT_DB) -> sqlite3.Connection:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA foreign_keys = ON')
+    db.execute('PRAGMA journal_mode = WAL')
+    db.executescript(SCHEMA)
+    return db
+
+
+def flatten(value: Any, prefix: str = '') -> Iterator[Tuple[str, Optional[float], Optional[str]]]:
+    """(dotted key, number, text) for every leaf worth tracking; lists become their length"""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key not in SKIPPED_KEYS:
+                yield from flatten(child, f'{prefix}.{key}' if prefix else str(key))
+    elif isinstance(value, list):
+        yield f'{prefix}.count', float(len(value)), None
+    elif isinstance(value, bool):
+        yield prefix, float(value), None
+    elif isinstance(value, (int, float)):
+        yield prefix, float(value), None
+    elif isinstance(value, str) and len(value) <= 120 and not SKIPPED_TEXT.search(prefix):
+        yield prefix, None, value
+
+
+def source_of(path: str) -> str:
+    match = _SOURCE_RE.match(os.path.basename(path))
+    return match.group(1) if match else os.path.splitext(os.path.basename(path))[0]
+
+
+def add_run(db: sqlite3.Connection, source: str, started_at: str,
+            observations: Iterable[Tuple[str, Optional[float], Optional[str]]],
+            url: Optional[str] = None, path: Optional[str] = None) -> int:
+    # https://host and https://host/ are the same series
+    run_id = db.execute('INSERT INTO runs (source, url, started_at, path) VALUES (?, ?, ?, ?)',
+                        (source, url.rstrip('/') if url else url, started_at, path)).lastrowid
+    # A key seen twice (e.g. a list and its sibling count) keeps the last value
+    db.executemany('INSERT OR REPLACE INTO observations (run_id, key, num, text) VALUES (?, ?, ?, ?)',
+                   ((run_id, key, num, text) for key, num, text in observations))
+    return run_id
+
+
+def ingest_report(db: sqlite3.Connection, path: str) -> Optional[int]:
+    """Store one JSON report file; returns None when it is unchanged since the last ingest"""
+    stat = os.stat(path)
+    key = os.path.relpath(path).replace(os.sep, '/')
+    row = db.execute('SELECT mtime_ns, size, run_id FROM files WHERE path = ?', (key,)).fetchone()
+    if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    if row and row[2] is not None:
+        db.execute('DELETE FROM runs WHERE id = ?', (row[2],))
+    started_at = report.get('timestamp') or time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(stat.st_mtime))
+    body = report.get('checks', report) if isinstance(report.get('checks'), dict) else report
+    observations = list(flatten(body))
+    if body is not report:  # top-level extras next to `checks`, e.g. summary and duration
+        observations += flatten({k: v for k, v in report.items() if k not in ('checks', 'url', 'timestamp')})
+    run_id = add_run(db, source_of(path), started_at, observations, report.get('url'), key)
+    db.execute('INSERT OR REPLACE INTO files (path, mtime_ns, size, run_id) VALUES (?, ?, ?, ?)',
+               (key, stat.st_mtime_ns, stat.st_size, run_id))
+    return run_id
+
+
+def ingest(db: sqlite3.Connection, paths: Optional[List[str]] = None) -> Tuple[int, int]:
+    """Ingest report files (default: REPORT_GLOBS); returns (new or changed, unchanged)"""
+    if not paths:
+        paths = sorted(path for pattern in REPORT_GLOBS for path in glob.glob(pattern))
+    added = skipped = 0
+    with db:
+        for path in paths:
+            try:
+                if ingest_report(db, path) is None:
+                    skipped += 1
+                else:
+                    added += 1
+            except (OSError, ValueError) as e:
+                print(f"[SKIP] {path}: {e}", file=sys.stderr)
+    return added, skipped
+
+
+def append_deployment_run(results, wall_time: float, path: str = REPORT_DB) -> int:
+    """Record one test-deployment.py run; `results` are DeploymentTestResult objects"""
+    observations = [('wall_time_s', wall_time, None),
+                    ('passed', float(sum(1 for result in results if result.success)), None),
+                    ('total', float(len(results)), None)]
+    for result in results:
+        observations.append((f'{result.check}.duration_s', result.duration, None))
+        observations.append((f'{result.check}.{result.test}.success', float(result.success), None))
+        if isinstance(result.data, dict):
+            observations += [(key, num, text) for key, num, text in
+                             flatten(result.data, f'{result.check}.{result.test}') if num is not None]
+    db = connect(path)
+    try:
+        with db:
+            return add_run(db, 'deployment-test', time.strftime('%Y-%m-%dT%H:%M:%S'), observations)
+    finally:
+        db.close()
+
+
+def append_report(source: str, report: Dict[str, Any], url: Optional[str] = None, path: str = REPORT_DB) -> int:
+    """Record a report produced in-process, e.g. a loadtest run"""
+    db = connect(path)
+    try:
+        with db:
+            return add_run(db, source, time.strftime('%Y-%m-%dT%H:%M:%S'), flatten(report), url)
+    finally:
+        db.close()
+
+
+def run_values(db: sqlite3.Connection, run_id: int) -> Dict[str, Any]:
+    return {key: num if num is not None else text
+            for key, num, text in db.execute('SELECT key, num, text FROM observations WHERE run_id = ?', (run_id,))}
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], tolerance: float = 0.2) -> List[Change]:
+    """Changes for the worse between two runs of the same source"""
+    changes = []
+    for key, old in before.items():
+        leaf = key.rsplit('.', 1)[-1]
+        if key not in after:
+            if leaf in FLAG_KEYS or HTTP_STATUS_KEY.search(key):
+                changes.append(Change(key, 'missing', old, None))
+            continue
+        new = after[key]
+        if isinstance(old, str) or isinstance(new, str):
+            if leaf in ('status', 'overall') and str(old).lower() in GOOD_STATES and str(new).lower() not in GOOD_STATES:
+                changes.append(Change(key, 'status', old, new))
+        elif leaf in FLAG_KEYS:
+            if old and not new:
+                changes.append(Change(key, 'flag', bool(old), bool(new)))
+        elif HTTP_STATUS_KEY.search(key) and 100 <= old < 600:
+            if old < 400 <= new:
+                changes.append(Change(key, 'http', int(old), int(new)))
+        elif key == 'passed':
+            if new < old:
+                changes.append(Change(key, 'failures', old, new))
+        elif FAILURE_KEY.search(key):
+            if new > old:
+                changes.append(Change(key, 'failures', old, new))
+        elif THROUGHPUT_KEY.search(key):
+            if old > 0 and new < old * (1 - tolerance):
+                changes.append(Change(key, 'throughput', old, new))
+        elif LATENCY_KEY.search(key):
+            floor = MIN_LATENCY_DELTA_MS / 1000 if key.endswith('_s') else MIN_LATENCY_DELTA_MS
+            if new > old * (1 + tolerance) and new - old >= floor:
+                changes.append(Change(key, 'latency', old, new))
+    # Broken checks first, slowdowns after
+    return sorted(changes, key=lambda change: change.kind in ('latency', 'throughput'))
+
+
+def latest_pairs(db: sqlite3.Connection, source: Optional[str] = None) -> List[Tuple[tuple, tuple]]:
+    """(previous run, latest run) for every source/url series with at least two runs"""
+    query = 'SELECT id, source, url, started_at FROM runs'
+    params: Tuple = ()
+    if source:
+        query, params = query + ' WHERE source = ?', (source,)
+    series: Dict[Tuple[str, str], List[tuple]] = {}
+    for run in db.execute(query + ' ORDER BY started_at, id', params):
+        series.setdefault((run[1], run[2] or ''), []).append(run)
+    return [(runs[-2], runs[-1]) for runs in series.values() if len(runs) >= 2]
+
+
+def trend(db: sqlite3.Connection, pattern: str, source: Optional[str] = None,
+          limit: int = 20) -> Dict[Tuple[str, str, str], List[Tuple[str, float]]]:
+    """(source, url, key) -> [(started_at, value)] for numeric keys matching a glob, oldest first"""
+    query = ('SELECT r.source, r.url, o.key, r.started_at, o.num FROM observations o JOIN runs r ON r.id = o.run_id '
+             'WHERE o.key GLOB ? AND o.num IS NOT NULL')
+    params: List[Any] = [pattern if any(c in pattern for c in '*?[') else f'*{pattern}*']
+    if source:
+        query += ' AND r.source = ?'
+        params.append(source)
+    series: Dict[Tuple[str, str, str], List[Tuple[str, float]]] = {}
+    for run_source, url, key, started_at, num in db.execute(query + ' ORDER BY r.started_at, r.id', params):
+        series.setdefault((run_source, url or '', key), []).append((started_at, num))
+    return {key: points[-limit:] for key, points in series.items()}
+
+
+def sparkline(values: List[float]) -> str:
+    bars = '▁▂▃▄▅▆▇█'
+    low, high = min(values), max(values)
+    if high == low:
+        return bars[0] * len(values)
+    return ''.join(bars[int((value - low) / (high - low) * (len(bars) - 1))] for value in values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Store check reports in SQLite and query regressions and trends')
+    parser.add_argument('--db', default=REPORT_DB, help=f'database file (default: {REPORT_DB})')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_cmd = sub.add_parser('ingest', help='ingest new or changed report files')
+    ingest_cmd.add_argument('paths', nargs='*', help='report files (default: the known report globs)')
+    runs_cmd = sub.add_parser('runs', help='list stored runs')
+    runs_cmd.add_argument('--source')
+    regress_cmd = sub.add_parser('regressions', help='what got worse in the latest run of each series')
+    regress_cmd.add_argument('--source')
+    regress_cmd.add_argument('--tolerance', type=float, default=0.2, help='relative latency/throughput change allowed')
+    trend_cmd = sub.add_parser('trend', help='values of matching numeric keys over time')
+    trend_cmd.add_argument('pattern', help='key glob, or a substring of the key')
+    trend_cmd.add_argument('--source')
+    trend_cmd.add_argument('--limit', type=int, default=20, help='latest N runs per key')
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    if args.command == 'ingest':
+        added, skipped = ingest(db, args.paths)
+        print(f"Ingested {added} reports ({skipped} unchanged) into {args.db}")
+        return 0
+
+    if args.command == 'runs':
+        query = 'SELECT r.id, r.source, r.url, r.started_at, COUNT(o.key) FROM runs r ' \
+                'LEFT JOIN observations o ON o.run_id = r.id'
+        params: Tuple = ()
+        if args.source:
+            query, params = query + ' WHERE r.source = ?', (args.source,)
+        for run_id, source, url, started_at, count in db.execute(
+                query + ' GROUP BY r.id ORDER BY r.started_at, r.id', params):
+            print(f"{run_id:5}  {started_at:24}  {source:22}  {url or '':36}  {count} values")
+        return 0
+
+    if args.command == 'regressions':
+        regressed = False
+        for before, after in latest_pairs(db, args.source):
+            changes = compare(run_values(db, before[0]), run_values(db, after[0]), args.tolerance)
+            label = f"{after[1]} {after[2] or ''}".strip()
+            print(f"{label}: {before[3]} -> {after[3]}: {len(changes) or 'no'} regressions")
+            for change in changes:
+                old, new = (f'{value:g}' if isinstance(value, float) else value
+                            for value in (change.before, change.after))
+                print(f"  [{change.kind}] {change.key}: {old} -> {new}")
+            regressed = regressed or bool(changes)
+        return 1 if regressed else 0
+
+    series = trend(db, args.pattern, args.source, args.limit)
+    for (source, url, key), points in sorted(series.items()):
+        values = [value for _, value in points]
+        change = f"{(values[-1] - values[0]) / values[0]:+.0%}" if values[0] else ''
+        print(f"{source} {url} {key}".replace('  ', ' '))
+        print(f"  {sparkline(values)}  first {values[0]:g}  last {values[-1]:g}  "
+              f"min {min(values):g}  max {max(values):g}  {change}".rstrip())
+    if not series:
+        print(f"No numeric values match {args.pattern}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Route manifest for the Next.js app directory, shared by the route tooling.
+Records every page and route handler with its exported HTTP methods, segment
+config (dynamic / revalidate / runtime), useSearchParams() usage and layout chain.
+Per-file facts are cached by mtime and size, so rebuilding only re-reads changed files.
+
+Usage: python3 scripts/route_manifest.py [--api | --pages] [--json] [app_dir]
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from source_scanner import ROUTE_INFO_RULE, ResultCache, scan
+
+APP_DIR = os.path.join('src', 'app')
+MANIFEST_CACHE = os.path.join('.scanner-cache', 'routes.json')
+
+
+class Route(NamedTuple):
+    route: str  # URL pattern, e.g. /api/agents/[id]
+    kind: str  # 'page' or 'route' (route handler)
+    file: str
+    methods: List[str]  # exported HTTP handlers, route handlers only
+    config: Dict[str, str]  # segment config exported by the file itself
+    uses_search_params: bool
+    layouts: List[str]  # layout files from the app root down to this segment
+
+
+def url_for(app_dir: str, directory: str) -> Optional[str]:
+    """URL pattern of a segment directory, or None for private (_folder) segments"""
+    parts = []
+    for part in os.path.relpath(directory, app_dir).replace(os.sep, '/').split('/'):
+        if part in ('', '.') or part.startswith('@') or (part.startswith('(') and part.endswith(')')):
+            continue  # parallel-route slots and route groups do not appear in the URL
+        if part.startswith('_'):
+            return None
+        parts.append(part)
+    return '/' + '/'.join(parts)
+
+
+class RouteManifest:
+    def __init__(self, app_dir: str, routes: List[Route], layouts: Dict[str, dict]):
+        self.app_dir = app_dir
+        self.routes = routes
+        self.layouts = layouts  # layout file -> facts recorded for it
+        self._by_route = {(route.route, route.kind): route for route in routes}
+
+    def api_routes(self) -> List[Route]:
+        return [route for route in self.routes if route.kind == 'route']
+
+    def pages(self) -> List[Route]:
+        return [route for route in self.routes if route.kind == 'page']
+
+    def find(self, route: str, kind: Optional[str] = None) -> Optional[Route]:
+        if kind:
+            return self._by_route.get((route, kind))
+        return self._by_route.get((route, 'route')) or self._by_route.get((route, 'page'))
+
+    def segment_config(self, route: Route, key: str) -> Optional[str]:
+        """Effective segment config value: the file's own, else the nearest layout's"""
+        if key in route.config:
+            return route.config[key]
+        for layout in reversed(route.layouts):
+            value = self.layouts[layout]['config'].get(key)
+            if value is not None:
+                return value
+        return None
+
+    def to_json(self) -> dict:
+        return {'app_dir': self.app_dir.replace(os.sep, '/'),
+                'routes': [route._asdict() for route in self.routes],
+                'layouts': self.layouts}
+
+
+def build_manifest(app_dir: str = APP_DIR, cache_path: Optional[str] = MANIFEST_CACHE,
+                   workers: int = 1) -> RouteManifest:
+    """Build (or incrementally refresh) the manifest for `app_dir`"""
+    cache = ResultCache(cache_path) if cache_path else None
+    findings = scan([ROUTE_INFO_RULE], app_dir, workers=workers, cache=cache)[ROUTE_INFO_RULE.name]
+    if cache:
+        cache.save()
+
+    facts = {finding.path: finding.message for finding in findings}
+    layout_dirs = {os.path.dirname(path): path for path in facts
+                   if os.path.splitext(os.path.basename(path))[0] == 'layout'}
+
+    routes = []
+    for path, info in facts.items():
+        kind = os.path.splitext(os.path.basename(path))[0]
+        directory = os.path.dirname(path)
+        url = url_for(app_dir, directory)
+        if kind == 'layout' or url is None:
+            continue
+
+        chain = []
+        segment = directory
+        while True:
+            if segment in layout_dirs:
+                chain.append(layout_dirs[segment])
+            if os.path.normpath(segment) == os.path.normpath(app_dir) or not segment:
+                break
+            segment = os.path.dirname(segment)
+        chain.reverse()
+
+        routes.append(Route(url, kind, path, info['methods'] if kind == 'route' else [], info['config'],
+                            info['uses_search_params'], chain))
+
+    routes.sort(key=lambda route: (route.route, route.kind))
+    return RouteManifest(app_dir, routes, {path: facts[path] for path in layout_dirs.values()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List the routes of the Next.js app directory')
+    parser.add_argument('app_dir', nargs='?', default=APP_DIR)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--api', action='store_true', help='only route handlers')
+    group.add_argument('--pages', action='store_true', help='only pages')
+    parser.add_argument('--json', action='store_true', help='print the manifest as JSON')
+    args = parser.parse_args()
+
+    manifest = build_manifest(args.app_dir)
+    routes = manifest.api_routes() if args.api else manifest.pages() if args.pages else manifest.routes
+
+    if args.json:
+        data = manifest.to_json()
+        data['routes'] = [route._asdict() for route in routes]
+        print(json.dumps(data, indent=2))
+        return
+
+    for route in routes:
+        details = [','.join(route.methods)] if route.methods else []
+        dynamic = manifest.segment_config(route, 'dynamic')
+        if dynamic:
+            details.append(f'dynamic={dynamic}')
+        if route.uses_search_params:
+            details.append('useSearchParams')
+        print(f"{route.kind:5}  {route.route}  {' '.join(details)}")
+    print(f"\n{len(manifest.pages())} pages, {len(manifest.api_routes())} route handlers, "
+          f"{len(manifest.layouts)} layouts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Single-pass source scanner shared by check_hooks.py and the codemod scripts.
+Walks the tree once, reads every file once and runs all registered rules against it.
+Rules only one tool uses (route cacheability, Prisma query shapes) live in that tool.
+
+Usage: python3 scripts/source_scanner.py [root]   (runs every built-in rule)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Files at least this large are decoded straight from a memory map
+MMAP_THRESHOLD = 256 * 1024
+
+
+class Finding(NamedTuple):
+    rule: str
+    path: str
+    message: Any  # usually a human-readable string; codemods may report (status, detail)
+
+
+class ScanRule(NamedTuple):
+    name: str
+    check: Callable[[str, str], Iterable[Any]]  # (path, content) -> messages
+    suffixes: Tuple[str, ...] = ('.ts', '.tsx')
+    path_filter: Optional[Callable[[str], bool]] = None
+    needle: Optional[str] = None  # substring that must occur before `check` is worth running
+
+
+def read_source(path: str) -> str:
+    """Read a file once, using mmap for large files"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, 'utf-8')
+        return f.read().decode('utf-8')
+
+
+class ResultCache:
+    """Per-file findings persisted between runs, keyed by mtime and size.
+
+    Entries are dropped wholesale when this module or one of `sources` changes; a tool whose
+    rules live in its own file passes that file, so its cache follows its own rule logic.
+    """
+
+    def __init__(self, path: str, sources: Iterable[str] = ()):
+        self.path = path
+        self.dirty = False
+        digest = hashlib.sha256()
+        for source in (__file__, *sources):
+            with open(os.path.abspath(source), 'rb') as f:
+                digest.update(f.read())
+        self.version = digest.hexdigest()
+        self.entries: Dict[str, list] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.version:
+                self.entries = data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, filepath: str, stat: os.stat_result, rule_name: str) -> Optional[list]:
+        entry = self.entries.get(filepath)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2].get(rule_name)
+        return None
+
+    def put(self, filepath: str, stat: os.stat_result, rule_name: str, messages: list) -> None:
+        entry = self.entries.get(filepath)
+        if not entry or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            entry = self.entries[filepath] = [stat.st_mtime_ns, stat.st_size, {}]
+        entry[2][rule_name] = messages
+        self.dirty = True
+
+    def save(self) -> None:
+        """Write the cache atomically; concurrent savers each use their own temp file and the last rename wins"""
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        live = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.version, 'files': live}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.dirty = False
+
+
+def iter_source_files(root: str) -> Iterable[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            yield os.path.join(dirpath, filename)
+
+
+def changed_files(root: str = 'src', ref: Optional[str] = None, staged: bool = False) -> List[str]:
+    """Files under `root` that differ from `ref` (default HEAD) or, with staged=True, from the index"""
+    top = subprocess.run(['git', 'rev-parse', '--show-toplevel'],
+                         capture_output=True, text=True, check=True).stdout.strip()
+    cmd = ['git', 'diff', '--name-only', '--diff-filter=ACMR']
+    cmd += ['--cached'] if staged else [ref or 'HEAD']
+    names = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=top).stdout.split('\n')
+    if not staged:
+        names += subprocess.run(['git', 'ls-files', '--others', '--exclude-standard'],
+                                capture_output=True, text=True, check=True, cwd=top).stdout.split('\n')
+
+    root_abs = os.path.abspath(root)
+    files = set()
+    for name in names:
+        path = os.path.join(top, name)
+        if name and os.path.isfile(path) and os.path.abspath(path).startswith(root_abs + os.sep):
+            files.add(os.path.relpath(path))
+    return sorted(files)
+
+
+def _run_rules(rules: List[ScanRule], filepath: str) -> Dict[str, list]:
+    try:
+        content = read_source(filepath)
+    except (OSError, UnicodeDecodeError):
+        return {}
+
+    results = {}
+    for rule in rules:
+        if rule.needle and rule.needle not in content:
+            results[rule.name] = []
+        else:
+            results[rule.name] = list(rule.check(filepath, content))
+    return results
+
+
+# Rules handed to each pool worker once by _init_scan_worker
+_worker_rules: Dict[str, ScanRule] = {}
+
+
+def _init_scan_worker(rules: List[ScanRule]) -> None:
+    global _worker_rules
+    _worker_rules = {rule.name: rule for rule in rules}
+
+
+def _scan_worker(job: Tuple[str, List[str]]) -> Dict[str, list]:
+    filepath, rule_names = job
+    return _run_rules([_worker_rules[name] for name in rule_names], filepath)
+
+
+def scan(rules: List[ScanRule], root: str = 'src', files: Optional[Iterable[str]] = None,
+         workers: int = 1, cache: Optional[ResultCache] = None) -> Dict[str, List[Finding]]:
+    """Walk `root` once (or check only `files`) and run every applicable rule on each file.
+
+    With workers > 1 files are checked in a process pool; rules must then be picklable
+    (module-level functions, no lambdas). Findings are grouped by rule, in file order.
+    """
+    per_file: Dict[str, Dict[str, list]] = {}
+    jobs: List[Tuple[str, List[str]]] = []
+
+    for filepath in sorted(files) if files is not None else iter_source_files(root):
+        filename = os.path.basename(filepath)
+        active = [rule for rule in rules
+                  if filename.endswith(rule.suffixes) and (rule.path_filter is None or rule.path_filter(filepath))]
+        if not active:
+            continue
+
+        per_file[filepath] = {}
+        pending = []
+        stat = os.stat(filepath) if cache else None
+        for rule in active:
+            cached = cache.get(filepath, stat, rule.name) if cache else None
+            if cached is None:
+                pending.append(rule.name)
+            else:
+                per_file[filepath][rule.name] = cached
+        if pending:
+            jobs.append((filepath, pending))
+
+    by_name = {rule.name: rule for rule in rules}
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_scan_worker,
+                                 initargs=(rules,)) as pool:
+            outcomes = list(pool.map(_scan_worker, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        outcomes = [_run_rules([by_name[name] for name in names], filepath) for filepath, names in jobs]
+
+    for (filepath, _), outcome in zip(jobs, outcomes):
+        per_file[filepath].update(outcome)
+        if cache:
+            stat = os.stat(filepath)
+            for name, messages in outcome.items():
+                cache.put(filepath, stat, name, messages)
+
+    findings: Dict[str, List[Finding]] = {rule.name: [] for rule in rules}
+    for filepath, results in per_file.items():
+        for rule in rules:
+            for message in results.get(rule.name, ()):
+                findings[rule.name].append(Finding(rule.name, filepath, message))
+    return findings
+
+
+def _posix(path: str) -> str:
+    return path.replace(os.sep, '/')
+
+
+# --- JS/TS source helpers shared by the rules here and in the tools ---
+
+# Comments and string literals, which brackets and keywords inside them must not count
+SKIP_RE = re.compile(r"//[^\n]*|/\*.*?\*/|'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\"|`(?:[^`\\]|\\.)*`", re.DOTALL)
+
+
+def matching_bracket(content: str, start: int, opener: str, closer: str) -> int:
+    """Index just past the bracket closing the one at `start`, skipping strings and comments"""
+    depth, i = 0, start
+    while i < len(content):
+        skipped = SKIP_RE.match(content, i)
+        if skipped:
+            i = skipped.end()
+            continue
+        if content[i] == opener:
+            depth += 1
+        elif content[i] == closer:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(content)
+
+
+# --- Import table and hook imports (check_hooks.py) ---
+
+HOOKS = ['useState', 'useEffect', 'useCallback', 'useMemo', 'useRef', 'useContext', 'useReducer', 'useLayoutEffect']
+
+# One alternation scanned by a single C-level finditer pass. Comments and strings are
+# matched (and ignored) first, so nothing inside them is mistaken for an import or a call.
+# The leading lookahead lets the regex engine skip positions that cannot
+# start any alternative instead of trying all seven at every character.
+_IMPORT_SCAN_RE = re.compile(r"""
+    (?=[/'"`iecvlfu])
+  (?:
+    //[^\n]*|/\*.*?(?:\*/|\Z)
+  | '(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"|`(?:[^`\\]|\\.)*`
+  | \bimport\s+(?P<clause>[^;'"`()]*?)\s*from\s*(?P<module>'[^'\n]*'|"[^"\n]*")
+  | \bexport\s+(?:type\s+)?(?P<exported>\*(?:\s+as\s+[\w$]+)?|\{[^}]*\})\s*from\s*(?P<source>'[^'\n]*'|"[^"\n]*")
+  | \b(?:const|let|var)\s*(?P<pattern>[{\[][^=;]*?)\s*=
+  | \b(?:const|let|var|function\*?|class)\s+(?P<declared>[\w$]+)
+  | (?<![\w$])(?P<hook>use[A-Z0-9][\w$]*)\s*\(
+  )
+""", re.VERBOSE | re.DOTALL)
+# Parameter lists, `(a, { b }) {`, `(a: T): R =>`, and single arrow parameters `a =>`
+_PARAMETERS_RE = re.compile(r'(?P<list>\([^()]*(?:\([^()]*\)[^()]*)*\))\s*(?::[^=;{}()]*)?(?:=>|\{)'
+                            r'|(?<![\w$.])(?P<single>[\w$]+)\s*=>')
+# `if (x) {` and friends look like a parameter list followed by a body
+_CONTROL_KEYWORD_RE = re.compile(r'\b(?:if|for|while|switch|with|catch)\s*$')
+# `name(...) {` or `name(...): Type {` defines a method instead of calling a function
+_METHOD_DEFINITION_RE = re.compile(r'\([^()]*(?:\([^()]*\)[^()]*)*\)\s*(?::[^=;{}()]*)?\{')
+_HOOK_CANDIDATE_RE = re.compile(r'use[A-Z0-9]')
+_MEMBER_OBJECT_RE = re.compile(r'([\w$]+)\s*\??\.\s*$')
+_SPECIFIER_RE = re.compile(r'(?:\btype\s+)?([\w$]+|\'[^\']*\'|"[^"]*")(?:\s+as\s+([\w$]+))?')
+_NAMESPACE_RE = re.compile(r'\*\s*as\s+([\w$]+)')
+_DEFAULT_RE = re.compile(r'^(?:type\s+(?=[\w$]+\s*(?:,|$)))?([\w$]+)\s*(?:,|$)')
+
+
+class ImportTable(NamedTuple):
+    named: Dict[str, Tuple[str, str]]  # local name -> (module, imported name)
+    default: Dict[str, str]  # local name -> module
+    namespace: Dict[str, str]  # local name -> module
+    reexports: List[Tuple[str, str]]  # (module, exported name or '*')
+    declared: set  # names declared in this file (functions, classes, variables, parameters)
+    calls: List[Tuple[Optional[str], str]]  # (object or None, callee) for every use*() call
+
+    def binds(self, name: str) -> bool:
+        return name in self.named or name in self.default or name in self.namespace or name in self.declared
+
+
+def _specifiers(braced: str) -> List[Tuple[str, str]]:
+    """[(imported, local)] for the text of a `{ a, b as c, type d }` list"""
+    pairs = []
+    for part in braced.strip('{} \n\t').split(','):
+        match = _SPECIFIER_RE.match(part.strip())
+        if match:
+            pairs.append((match.group(1).strip('\'"'), match.group(2) or match.group(1)))
+    return pairs
+
+
+def build_import_table(content: str) -> ImportTable:
+    """Collect imports, re-exports, local declarations and use*() calls in one scan"""
+    table = ImportTable({}, {}, {}, [], set(), [])
+
+    for match in _IMPORT_SCAN_RE.finditer(content):
+        group = match.lastgroup
+        if group is None:
+            continue  # comment or string
+        if group == 'module':
+            module = match.group('module')[1:-1]
+            clause = match.group('clause').strip()
+            if clause.startswith('type ') and not clause.startswith('type ,'):
+                clause = clause[5:].lstrip()
+            brace = clause.find('{')
+            if brace != -1:
+                for imported, local in _specifiers(clause[brace:]):
+                    table.named[local] = (module, imported)
+                clause = clause[:brace]
+            namespace = _NAMESPACE_RE.search(clause)
+            if namespace:
+                table.namespace[namespace.group(1)] = module
+                clause = clause[:namespace.start()]
+            default = _DEFAULT_RE.match(clause.strip())
+            if default:
+                table.default[default.group(1)] = module
+        elif group == 'source':
+            source = match.group('source')[1:-1]
+            exported = match.group('exported')
+            if exported.startswith('*'):
+                namespace = re.search(r'as\s+([\w$]+)', exported)
+                table.reexports.append((source, namespace.group(1) if namespace else '*'))
+            else:
+                table.reexports.extend((source, local) for _, local in _specifiers(exported))
+        elif group == 'pattern':
+            # Destructuring declaration: every name in the pattern is (over-approximately) a binding
+            table.declared.update(re.findall(r'[\w$]+', match.group('pattern')))
+        elif group == 'declared':
+            table.declared.add(match.group('declared'))
+        elif group == 'hook':
+            # `useFoo() {` inside a class or object literal defines a method rather than calling a hook
+            if _METHOD_DEFINITION_RE.match(content, match.end() - 1):
+                continue
+            # Member calls (React.useState) are told apart by looking just behind the match
+            start = match.start()
+            member = _MEMBER_OBJECT_RE.search(content, max(0, start - 64), start) \
+                if content[start - 1:start] in ('.', ' ', '\n', '\t') else None
+            table.calls.append((member.group(1) if member else None, match.group('hook')))
+
+    # Parameters only matter for calls nothing else binds, e.g. `function C({ useThing }) { useThing() }`,
+    # so the second pass is skipped for the common file where every call resolves
+    if any(not table.binds(obj or hook) for obj, hook in table.calls):
+        for match in _PARAMETERS_RE.finditer(content):
+            if match.lastgroup == 'single':
+                table.declared.add(match.group('single'))
+            elif not _CONTROL_KEYWORD_RE.search(content, max(0, match.start() - 16), match.start()):
+                # Every name in the list except callees, over-approximating like destructuring patterns
+                table.declared.update(re.findall(r'[\w$]+(?!\s*\()', match.group('list')))
+
+    return table
+
+
+def check_hook_imports(path: str, content: str) -> Iterable[str]:
+    if not _HOOK_CANDIDATE_RE.search(content):
+        return  # most files mention "use" (e.g. 'use client') without calling a hook
+    table = build_import_table(content)
+    react_objects = {local for local, module in list(table.default.items()) + list(table.namespace.items())
+                     if module == 'react'}
+
+    reported = set()
+    for obj, hook in table.calls:
+        if obj is not None:
+            # React.useState() only needs React itself in scope; other objects may be parameters
+            if obj != 'React' or obj in react_objects or table.binds(obj):
+                continue
+            message = f'uses React.{hook} but React is not imported'
+        elif table.binds(hook):
+            continue
+        elif hook in HOOKS:
+            message = f'uses {hook} but not imported'
+        else:
+            message = f'uses custom hook {hook} but it is neither imported nor defined'
+        if message not in reported:
+            reported.add(message)
+            yield message
+
+
+HOOK_IMPORT_RULE = ScanRule('hook-imports', check_hook_imports, needle='use')
+
+
+# --- force-dynamic export on API routes (add-dynamic-exports-safe.py) ---
+
+def has_dynamic_export(content: str) -> bool:
+    """Check if file already has dynamic export."""
+    return "export const dynamic = 'force-dynamic'" in content or \
+           'export const dynamic = "force-dynamic"' in content
+
+
+def is_api_route(path: str) -> bool:
+    return '/app/api/' in _posix(path) and os.path.basename(path) == 'route.ts'
+
+
+def check_force_dynamic(path: str, content: str) -> Iterable[str]:
+    yield 'has force-dynamic export' if has_dynamic_export(content) else 'missing force-dynamic export'
+
+
+FORCE_DYNAMIC_RULE = ScanRule('force-dynamic', check_force_dynamic, suffixes=('.ts',), path_filter=is_api_route)
+
+
+# --- useSearchParams() usage in app pages (add-layout-for-search-params.py) ---
+
+def check_search_params(path: str, content: str) -> Iterable[str]:
+    if re.search(r'\buseSearchParams\s*\(', content):
+        yield 'uses useSearchParams()'
+
+
+def is_app_file(path: str) -> bool:
+    return '/app/' in _posix(path)
+
+
+SEARCH_PARAMS_RULE = ScanRule('use-search-params', check_search_params,
+                              path_filter=is_app_file, needle='useSearchParams')
+
+
+# --- module import edges (add-layout-for-search-params.py --discover) ---
+
+SOURCE_ROOT = 'src'
+MODULE_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx')
+_BARE_IMPORT_RE = re.compile(r'\bimport\s*\(?\s*[\'"]([^\'"\n]+)[\'"]')
+
+
+def check_module_imports(path: str, content: str) -> Iterable[dict]:
+    """Project-local modules a file imports (static, side-effect, re-export and dynamic import())"""
+    table = build_import_table(content)
+    modules = set(table.default.values()) | set(table.namespace.values())
+    modules.update(module for module, _ in table.named.values())
+    modules.update(module for module, _ in table.reexports)
+    modules.update(_BARE_IMPORT_RE.findall(content))
+    yield {
+        'imports': sorted(module for module in modules if module.startswith(('.', '@/'))),
+        'uses_search_params': 'useSearchParams' in content and any(check_search_params(path, content)),
+    }
+
+
+def resolve_import(from_path: str, module: str, source_root: str = SOURCE_ROOT) -> Optional[str]:
+    """File a local import specifier points at ('@/x' maps to src/x, as in tsconfig paths)"""
+    if module.startswith('@/'):
+        base = os.path.join(source_root, module[2:])
+    else:
+        base = os.path.join(os.path.dirname(from_path), module)
+    base = os.path.normpath(base)
+    candidates = [base] + [base + ext for ext in MODULE_EXTENSIONS] + \
+                 [os.path.join(base, 'index' + ext) for ext in MODULE_EXTENSIONS]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+MODULE_IMPORTS_RULE = ScanRule('module-imports', check_module_imports, suffixes=MODULE_EXTENSIONS)
+
+# --- route segment facts for the route manifest (route_manifest.py) ---
+
+ROUTE_FILE_NAMES = ('route', 'page', 'layout')
+HTTP_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS')
+
+_HANDLER_RE = re.compile(r'\bexport\s+(?:async\s+)?(?:function\s*\*?\s*|(?:const|let|var)\s+)(%s)\b'
+                         % '|'.join(HTTP_METHODS))
+_EXPORT_LIST_RE = re.compile(r'\bexport\s*\{([^}]*)\}')
+_SEGMENT_CONFIG_RE = re.compile(
+    r'\bexport\s+const\s+(dynamic|revalidate|runtime)\s*(?::[^=]+)?=\s*(\'[^\']*\'|"[^"]*"|[\w.]+)')
+
+
+def is_route_file(path: str) -> bool:
+    return os.path.splitext(os.path.basename(path))[0] in ROUTE_FILE_NAMES and '/app/' in _posix(path)
+
+
+def check_route_info(path: str, content: str) -> Iterable[dict]:
+    """One JSON-able record per route/page/layout file: handlers, segment config, useSearchParams"""
+    methods = set(_HANDLER_RE.findall(content))
+    for exported in _EXPORT_LIST_RE.findall(content):
+        for part in exported.split(','):
+            local = part.split(' as ')[-1].strip()
+            if local in HTTP_METHODS:
+                methods.add(local)
+    config = {}
+    for key, value in _SEGMENT_CONFIG_RE.findall(content):
+        config[key] = value.strip('\'"') if value[0] in '\'"' else value
+    yield {
+        'methods': [method for method in HTTP_METHODS if method in methods],
+        'config': config,
+        'uses_search_params': 'useSearchParams' in content and any(check_search_params(path, content)),
+    }
+
+
+ROUTE_INFO_RULE = ScanRule('route-info', check_route_info, suffixes=('.ts', '.tsx', '.js', '.jsx'),
+                           path_filter=is_route_file)
+
+
+DEFAULT_RULES = [HOOK_IMPORT_RULE, FORCE_DYNAMIC_RULE, SEARCH_PARAMS_RULE]
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else 'src'
+    findings = scan(DEFAULT_RULES, root)
+
+    for rule in DEFAULT_RULES:
+        rule_findings = findings[rule.name]
+        if rule is FORCE_DYNAMIC_RULE:
+            rule_findings = [f for f in rule_findings if f.message.startswith('missing')]
+        print(f"[{rule.name}] {len(rule_findings)} findings")
+        for finding in rule_findings:
+            print(f"  {finding.path}: {finding.message}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,26 @@
 import subprocess
 import json
 import time
-import requests
 import sys
 import os
-from typing import Dict, List, Any
+import argparse
+import glob
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts'))
+from check_reports import write_json_report, write_junit_report
+from compose_config import load_yaml
+from deploy_probe import probe_stats, start_stand_in_server
+from dockerfile_check import BUILD_CONTEXT_LIMIT, DOCKER_SCORE_THRESHOLD, DOCKERFILES, docker_report
+from loadtest import compare_to_baseline, parse_route_mix, run_load
+from monitoring_check import PROMETHEUS_CONFIG, SCRAPE_PAYLOAD_LIMIT, load_compose_services, simulate_scrape, \
+    simulated_app_metrics, validate_alert_rules, validate_prometheus_config
+from route_manifest import RouteManifest, build_manifest
+import pg_config_check
+import prisma_index_advisor
+import report_store
 
 class DeploymentTestResult:
     def __init__(self, test: str, success: bool, error: str = None, data: Any = None):
@@ -15,6 +31,12 @@ class DeploymentTestResult:
         self.success = success
         self.error = error
         self.data = data
+        self.check = None  # 产生该结果的检查函数名
+        self.duration = None  # 该检查函数的墙钟耗时（秒）
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'test': self.test, 'check': self.check, 'success': self.success, 'error': self.error,
+                'data': self.data, 'duration_s': round(self.duration, 4) if self.duration is not None else None}
 
 def test_docker_configuration() -> List[DeploymentTestResult]:
     """测试Docker配置"""
@@ -82,6 +104,31 @@ def test_docker_configuration() -> List[DeploymentTestResult]:
             f'检查失败: {str(e)}'
         ))
 
+    # 静态分析：分层缓存、多阶段、镜像体积、构建上下文
+    try:
+        report = docker_report()
+        for path, analysis in report['dockerfiles'].items():
+            top = [f"L{finding['line']} {finding['message']}" for finding in analysis['findings'][:3]]
+            results.append(DeploymentTestResult(
+                f'{path}构建效率分析',
+                analysis['score'] >= DOCKER_SCORE_THRESHOLD,
+                f"得分 {analysis['score']}，主要问题: {top}" if analysis['score'] < DOCKER_SCORE_THRESHOLD else None,
+                {'score': analysis['score'], 'penalties': analysis['penalties'], 'findings': len(analysis['findings'])}
+            ))
+        context = report['context']
+        results.append(DeploymentTestResult(
+            '构建上下文大小',
+            context['bytes'] <= BUILD_CONTEXT_LIMIT,
+            f"上下文 {context['bytes'] / 1024 / 1024:.1f} MiB，检查 .dockerignore" if context['bytes'] > BUILD_CONTEXT_LIMIT else None,
+            context
+        ))
+    except Exception as e:
+        results.append(DeploymentTestResult(
+            'Dockerfile静态分析',
+            False,
+            f'分析失败: {str(e)}'
+        ))
+
     return results
 
 def test_ci_cd_configuration() -> List[DeploymentTestResult]:
@@ -129,8 +176,8 @@ def test_ci_cd_configuration() -> List[DeploymentTestResult]:
 
     return results
 
-def test_health_check() -> List[DeploymentTestResult]:
-    """测试健康检查功能"""
+def test_health_check(manifest: Optional[RouteManifest] = None) -> List[DeploymentTestResult]:
+    """测试健康检查功能；manifest 为 run_all_tests 共享的路由清单，单独调用时现建"""
     results = []
 
     print("🏥 测试健康检查功能...")
@@ -159,9 +206,10 @@ def test_health_check() -> List[DeploymentTestResult]:
 
     # 检查健康检查API路由
     try:
-        health_route_path = 'src/app/api/health/route.ts'
-        if os.path.exists(health_route_path):
-            with open(health_route_path, 'r') as f:
+        # 从路由清单查找健康检查路由，而不是写死文件路径
+        health_route = (manifest or build_manifest()).find('/api/health', 'route')
+        if health_route:
+            with open(health_route.file, 'r') as f:
                 content = f.read()
 
             # 检查关键功能
@@ -178,7 +226,8 @@ def test_health_check() -> List[DeploymentTestResult]:
                 '健康检查API功能检查',
                 len(missing_functions) == 0,
                 f'缺少功能: {missing_functions}' if missing_functions else None,
-                {'functions_implemented': len(required_functions) - len(missing_functions), 'total_functions': len(required_functions)}
+                {'functions_implemented': len(required_functions) - len(missing_functions), 'total_functions': len(required_functions),
+                 'file': health_route.file, 'methods': health_route.methods}
             ))
         else:
             results.append(DeploymentTestResult(
@@ -195,27 +244,79 @@ def test_health_check() -> List[DeploymentTestResult]:
 
     return results
 
-def test_monitoring_configuration() -> List[DeploymentTestResult]:
-    """测试监控配置"""
+def test_monitoring_configuration(manifest: Optional[RouteManifest] = None) -> List[DeploymentTestResult]:
+    """测试监控配置；manifest 为 run_all_tests 共享的路由清单，单独调用时现建"""
     results = []
 
     print("📊 测试监控配置...")
 
-    # 检查监控相关的配置文件
-    monitoring_files = [
-        'docker/prometheus/prometheus.yml',
-        'docker/grafana/provisioning',
-        'docker/filebeat/filebeat.yml'
-    ]
+    # Prometheus 主配置：结构、抓取目标能否在 compose 服务中找到、应用抓取路径是否存在
+    try:
+        config = load_yaml(PROMETHEUS_CONFIG) or {}
+        services = load_compose_services()
+        errors, unresolved, jobs = validate_prometheus_config(config, services)
+
+        results.append(DeploymentTestResult(
+            'Prometheus配置检查',
+            len(errors) == 0,
+            f'配置问题: {errors}' if errors else None,
+            {'jobs': len(jobs), 'rule_files': config.get('rule_files') or []}
+        ))
+        results.append(DeploymentTestResult(
+            'Prometheus抓取目标解析',
+            len(unresolved) == 0,
+            f'无法解析的目标: {unresolved}' if unresolved else None,
+            {'compose_services': len(services)}
+        ))
 
-    for file_path in monitoring_files:
+        manifest = manifest or build_manifest()
+        missing_paths = []
+        for job in jobs:
+            targets = [target for static in job.get('static_configs') or [] for target in static.get('targets') or []]
+            path = job.get('metrics_path', '/metrics')
+            if any(str(target).startswith('app:') for target in targets) and not manifest.find(path, 'route'):
+                missing_paths.append(f"{job['job_name']}: {path}")
+        results.append(DeploymentTestResult(
+            '应用抓取路径检查',
+            len(missing_paths) == 0,
+            f'路由不存在: {missing_paths}' if missing_paths else None
+        ))
+    except Exception as e:
+        results.append(DeploymentTestResult(
+            'Prometheus配置检查',
+            False,
+            f'检查失败: {str(e)}'
+        ))
+
+    # 告警规则
+    try:
+        rules_path = os.path.join(os.path.dirname(PROMETHEUS_CONFIG), 'alert_rules.yml')
+        rule_errors = validate_alert_rules(rules_path)
+        results.append(DeploymentTestResult(
+            '告警规则检查',
+            len(rule_errors) == 0,
+            f'规则问题: {rule_errors}' if rule_errors else None,
+            {'file': rules_path}
+        ))
+    except Exception as e:
+        results.append(DeploymentTestResult(
+            '告警规则检查',
+            False,
+            f'检查失败: {str(e)}'
+        ))
+
+    # Grafana / Filebeat 配置需真实存在且可解析
+    for file_path in ['docker/grafana/provisioning', 'docker/filebeat/filebeat.yml']:
         try:
-            # 这里只是检查路径结构，实际文件可能不存在
+            files = sorted(glob.glob(os.path.join(file_path, '**', '*.yml'), recursive=True)) \
+                if os.path.isdir(file_path) else [file_path] if os.path.exists(file_path) else []
+            for config_file in files:
+                load_yaml(config_file)
             results.append(DeploymentTestResult(
                 f'监控配置路径: {file_path}',
-                True,  # 假设配置正确
-                None,
-                {'config_path': file_path}
+                bool(files),
+                None if files else f'{file_path} 不存在',
+                {'config_files': len(files)}
             ))
         except Exception as e:
             results.append(DeploymentTestResult(
@@ -224,6 +325,117 @@ def test_monitoring_configuration() -> List[DeploymentTestResult]:
                 f'检查失败: {str(e)}'
             ))
 
+    # 抓取模拟：设置 METRICS_URL 时抓取真实端点并据此判定；否则只对按路由清单生成的替身 /metrics
+    # 做开销估算，仅供参考——替身数据是假设应用按路由打点，不能让检查因自己生成的数据失败
+    server = None
+    url = os.environ.get('METRICS_URL')
+    try:
+        if not url:
+            server = start_stand_in_server(metrics=simulated_app_metrics((manifest or build_manifest()).api_routes()))
+        scrape = simulate_scrape(url or 'http://%s:%d/metrics' % server.server_address)
+        problems = list(scrape['high_cardinality'])
+        if scrape['payload_bytes'] > SCRAPE_PAYLOAD_LIMIT:
+            problems.append(f"单次抓取 {scrape['payload_bytes']} 字节")
+        if url:
+            results.append(DeploymentTestResult(
+                '指标抓取模拟',
+                len(problems) == 0,
+                f'监控开销风险: {problems}' if problems else None,
+                scrape
+            ))
+        else:
+            results.append(DeploymentTestResult(
+                '指标抓取估算（替身数据）',
+                True,
+                None,
+                {**scrape, 'note': '未设置 METRICS_URL，按每条路由 × 方法 × 状态码打点估算，仅供参考',
+                 'risks_if_instrumented': problems}
+            ))
+    except Exception as e:
+        results.append(DeploymentTestResult(
+            '指标抓取模拟' if url else '指标抓取估算（替身数据）',
+            not url,
+            f'抓取失败: {str(e)}' if url else None,
+            None if url else {'note': f'估算未完成: {str(e)}'}
+        ))
+    finally:
+        if server:
+            server.shutdown()
+
+    return results
+
+def test_database_configuration() -> List[DeploymentTestResult]:
+    """测试数据库配置（postgresql.conf / pg_hba.conf 与容器资源、Prisma 连接池的匹配）"""
+    results = []
+
+    print("🐘 测试数据库配置...")
+
+    try:
+        findings, recommendations, postgres, apps = pg_config_check.run_check()
+        errors = [finding.message for finding in findings if finding.level == 'error']
+        warnings = [finding.message for finding in findings if finding.level == 'warning']
+        changes = {name: f"{values['current']} -> {values['recommended']}"
+                   for name, values in recommendations.items() if values['current'] != values['recommended']}
+
+        results.append(DeploymentTestResult(
+            'PostgreSQL配置检查',
+            len(errors) == 0,
+            f'配置错误: {errors}' if errors else None,
+            {'postgres_services': [f'{service.compose_file}:{service.name}' for service in postgres],
+             'warnings': warnings}
+        ))
+        results.append(DeploymentTestResult(
+            'PostgreSQL容量建议',
+            True,
+            None,
+            {'recommended_changes': changes}
+        ))
+    except Exception as e:
+        results.append(DeploymentTestResult(
+            'PostgreSQL配置检查',
+            False,
+            f'检查失败: {str(e)}'
+        ))
+
+    return results
+
+def test_query_indexes() -> List[DeploymentTestResult]:
+    """对照 src/ 中的 Prisma 查询检查 schema 索引：缺失索引（按调用点数量排优先级）和无人使用的索引
+
+    静态分析只是建议，发现的缺口只作为警告输出，不计入通过/失败；分析本身失败则记为失败。
+    """
+    results = []
+
+    print("🗂️ 测试查询索引...")
+
+    try:
+        missing, unused, site_count = prisma_index_advisor.run_advisor()
+        high = [item for item in missing if item.priority == 'high']
+        for item in high:
+            print(f"⚠️ 缺少索引: {item.model} {item.shape} -> {item.suggestion} ({len(item.sites)} 个调用点)")
+        results.append(DeploymentTestResult(
+            'Prisma查询索引覆盖',
+            True,
+            None,
+            {'call_sites': site_count,
+             'missing': {priority: sum(1 for item in missing if item.priority == priority)
+                         for priority in ('high', 'medium', 'low')},
+             'warnings': [f'{item.model} {item.shape} -> {item.suggestion}' for item in high],
+             'suggestions': [f'{item.model}: {item.suggestion} ({len(item.sites)} 个调用点)' for item in missing[:10]]}
+        ))
+        results.append(DeploymentTestResult(
+            'Prisma未使用索引',
+            True,
+            None,
+            {'unused': [f"{item.model} @@index([{', '.join(item.fields)}]): {item.reason}" for item in unused]}
+        ))
+    except Exception as e:
+        results.append(DeploymentTestResult(
+            'Prisma查询索引覆盖',
+            False,
+            f'分析失败: {str(e)}'
+        ))
+
     return results
 
 def test_environment_configuration() -> List[DeploymentTestResult]:
@@ -308,39 +520,36 @@ def test_security_configuration() -> List[DeploymentTestResult]:
 
     return results
 
-def run_all_tests():
-    """运行所有部署和监控测试"""
-    print("🚀 部署和监控系统集成测试开始...\n")
+# ---- 在线健康探测 ----
 
-    all_results = []
+DEFAULT_BASE_URL = os.environ.get('DEPLOY_BASE_URL', 'http://localhost:3000')
+DEFAULT_PROBE_ENDPOINTS = ['/api/health']
 
-    # 运行各种测试
-    test_functions = [
-        test_docker_configuration,
-        test_ci_cd_configuration,
-        test_health_check,
-        test_monitoring_configuration,
-        test_environment_configuration,
-        test_security_configuration
-    ]
+def probe_endpoints(base_url: str, endpoints: List[str], requests_per_endpoint: int = 20,
+                    concurrency: int = 10, timeout: float = 5.0, retries: int = 2) -> List[DeploymentTestResult]:
+    """并发探测各个端点，统计每个端点的 p50/p95/p99 延迟和错误率"""
+    print(f"🩺 在线健康探测: {base_url} ({len(endpoints)} 个端点, 每个 {requests_per_endpoint} 次, 并发 {concurrency})")
 
-    for test_func in test_functions:
-        try:
-            results = test_func()
-            all_results.extend(results)
-        except Exception as e:
-            all_results.append(DeploymentTestResult(
-                f'{test_func.__name__}执行',
-                False,
-                f'测试执行失败: {str(e)}'
-            ))
+    started = time.perf_counter()
+    stats = probe_stats(base_url, endpoints, requests_per_endpoint, concurrency, timeout, retries)
+    elapsed = time.perf_counter() - started
 
-    # 生成测试报告
-    print("\n📋 测试结果汇总:")
-    print("=" * 60)
+    results = []
+    for endpoint, data in stats.items():
+        results.append(DeploymentTestResult(
+            f'在线探测 {endpoint}',
+            data['errors'] == 0,
+            f"{data['errors']}/{data['requests']} 次请求失败: {data['statuses']}" if data['errors'] else None,
+            data
+        ))
+
+    total = sum(data['requests'] for data in stats.values())
+    print(f"   完成 {total} 次请求，用时 {elapsed:.2f}s ({total / max(elapsed, 1e-9):.1f} req/s)")
+    return results
 
+def print_results(all_results: List[DeploymentTestResult]) -> int:
+    """打印结果列表，返回通过数"""
     success_count = 0
-    total_count = len(all_results)
 
     for i, result in enumerate(all_results, 1):
         status = "✅ 成功" if result.success else "❌ 失败"
@@ -356,9 +565,183 @@ def run_all_tests():
             success_count += 1
         print()
 
+    return success_count
+
+def run_probe(args) -> int:
+    """probe 子命令"""
+    endpoints = args.endpoint or DEFAULT_PROBE_ENDPOINTS
+    server = None
+    base_url = args.base_url
+    if args.stand_in:
+        server = start_stand_in_server(args.stand_in_delay)
+        base_url = 'http://%s:%d' % server.server_address
+        print(f"🧪 使用本地替身服务 {base_url}")
+
+    try:
+        results = probe_endpoints(base_url, endpoints, args.requests, args.concurrency, args.timeout, args.retries)
+    finally:
+        if server:
+            server.shutdown()
+
+    print("\n📋 探测结果:")
+    print("=" * 60)
+    success_count = print_results(results)
+    print("=" * 60)
+    print(f"🎯 探测总结: {success_count}/{len(results)} 个端点健康")
+    return 0 if success_count == len(results) else 1
+
+# ---- 压力测试 ----
+
+def routes_from_manifest(patterns: List[str]) -> List[str]:
+    """路由清单中包含任一关键字、无动态段且导出 GET 的 API 路由"""
+    return [route.route for route in build_manifest().api_routes()
+            if 'GET' in route.methods and '[' not in route.route
+            and any(pattern in route.route for pattern in patterns)]
+
+def run_loadtest(args) -> int:
+    """loadtest 子命令"""
+    mix = parse_route_mix(args.route or [])
+    for route in routes_from_manifest(args.from_routes or []):
+        mix.setdefault(route, 1.0)
+    if not mix:
+        mix = {'/api/health': 1.0}
+    if not args.rps and not args.concurrency:
+        args.concurrency = 10
+
+    server = None
+    base_url = args.base_url
+    if args.stand_in:
+        server = start_stand_in_server(args.stand_in_delay)
+        base_url = 'http://%s:%d' % server.server_address
+        print(f"🧪 使用本地替身服务 {base_url}", file=sys.stderr)
+
+    mode = f"{args.rps} req/s" if args.rps else f"并发 {args.concurrency}"
+    print(f"🔥 压力测试: {base_url}, {len(mix)} 条路由, {mode}, 持续 {args.duration}s", file=sys.stderr)
+    try:
+        report = run_load(base_url, mix, args.duration, concurrency=args.concurrency, rps=args.rps,
+                          timeout=args.timeout, seed=args.seed)
+    finally:
+        if server:
+            server.shutdown()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = compare_to_baseline(report, baseline, args.tolerance, args.max_error_rate)
+    report['regressions'] = regressions
+    if not args.no_store:
+        report_store.append_report('loadtest', report, 'stand-in' if args.stand_in else base_url)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    latency = report['latency']
+    print(f"🎯 {report['requests']} 次请求, {report['throughput_rps']} req/s, 错误率 {report['error_rate']:.2%}, "
+          f"p50 {latency['p50_ms']}ms / p99 {latency['p99_ms']}ms", file=sys.stderr)
+    if 'dispatch_lag' in report:
+        print(f"⏱️  线程池调度等待 p99 {report['dispatch_lag']['p99_ms']}ms（已计入上面的延迟）", file=sys.stderr)
+    for regression in regressions:
+        print(f"❌ 回归: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+def run_check(test_func, *args) -> List[DeploymentTestResult]:
+    """运行单个检查函数，记录墙钟耗时；异常转换成失败结果"""
+    start = time.perf_counter()
+    try:
+        results = test_func(*args)
+    except Exception as e:
+        results = [DeploymentTestResult(
+            f'{test_func.__name__}执行',
+            False,
+            f'测试执行失败: {str(e)}'
+        )]
+    duration = time.perf_counter() - start
+    for result in results:
+        result.check = test_func.__name__
+        result.duration = duration
+    return results
+
+def run_docker_report(args) -> int:
+    """dockerfile 子命令"""
+    report = docker_report(args.paths)
+    if args.docker_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        labels = {'build-time': '构建时间', 'image-size': '镜像体积', 'security': '安全'}
+        for path, analysis in report['dockerfiles'].items():
+            print(f"🐳 {path}: {analysis['score']}/100")
+            for finding in analysis['findings']:
+                print(f"   [-{finding['penalty']:>2} {labels[finding['category']]}] L{finding['line']} {finding['message']}")
+                print(f"        💡 {finding['suggestion']}")
+            print()
+        context = report['context']
+        print(f"📦 构建上下文: {context['files']} 个文件, {context['bytes'] / 1024 / 1024:.1f} MiB")
+        for entry in context['largest_entries']:
+            print(f"   {entry['path']}: {entry['bytes'] / 1024 / 1024:.1f} MiB")
+    return 0 if all(a['score'] >= DOCKER_SCORE_THRESHOLD for a in report['dockerfiles'].values()) else 1
+
+def run_all_tests(workers: int = 0, json_path: str = None, junit_path: str = None, store: bool = True):
+    """运行所有部署和监控测试"""
+    print("🚀 部署和监控系统集成测试开始...\n")
+
+    # 运行各种测试
+    test_functions = [
+        test_docker_configuration,
+        test_ci_cd_configuration,
+        test_health_check,
+        test_monitoring_configuration,
+        test_database_configuration,
+        test_query_indexes,
+        test_environment_configuration,
+        test_security_configuration
+    ]
+
+    # 各检查互不依赖，并发执行，总耗时约等于最慢的那个检查；结果仍按上面的顺序汇总
+    start = time.perf_counter()
+    # 路由清单只扫描一次，共享给需要它的检查，避免各线程重复扫描、同时写清单缓存
+    try:
+        manifest = build_manifest()
+    except Exception as e:
+        print(f"⚠️ 路由清单构建失败，相关检查将各自报告: {e}")
+        manifest = None
+    manifest_checks = {test_health_check, test_monitoring_configuration}
+    with ThreadPoolExecutor(max_workers=workers or len(test_functions)) as pool:
+        futures = [pool.submit(run_check, func, *([manifest] if func in manifest_checks else []))
+                   for func in test_functions]
+        all_results = [result for future in futures for result in future.result()]
+    wall_time = time.perf_counter() - start
+
+    # 生成测试报告
+    print("\n📋 测试结果汇总:")
+    print("=" * 60)
+
+    total_count = len(all_results)
+    success_count = print_results(all_results)
+
     print("=" * 60)
     print(f"🎯 测试总结: {success_count}/{total_count} 个测试通过")
 
+    durations = {result.check: result.duration for result in all_results}
+    print(f"⏱️ 总耗时 {wall_time:.3f}s，各检查耗时:")
+    for check, duration in sorted(durations.items(), key=lambda item: -item[1]):
+        print(f"   {check}: {duration:.3f}s")
+
+    if json_path:
+        write_json_report(json_path, all_results, wall_time)
+        print(f"📝 JSON 报告: {json_path}")
+    if junit_path:
+        write_junit_report(junit_path, all_results, wall_time)
+        print(f"📝 JUnit 报告: {junit_path}")
+    if store:
+        # 追加到本地 SQLite 报告库（.reports/ 不入库，REPORT_STORE_DB 可改路径），用 scripts/report_store.py regressions/trend 查询
+        report_store.append_deployment_run(all_results, wall_time)
+        print(f"📝 已记录到 {report_store.REPORT_DB}")
+
     if success_count >= total_count * 0.8:  # 80%通过率
         print("\n🎉 部署和监控系统配置基本完成！")
 
@@ -390,6 +773,57 @@ def run_all_tests():
 
         return 1
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='部署和监控系统集成测试')
+    parser.add_argument('--workers', type=int, default=0, help='并发执行检查的线程数 (默认每个检查一个线程)')
+    parser.add_argument('--json', dest='json_path', help='同时把结果写成 JSON 报告')
+    parser.add_argument('--junit', dest='junit_path', help='同时把结果写成 JUnit XML 报告')
+    parser.add_argument('--no-store', action='store_true',
+                        help=f'不把本次结果（含 loadtest 报告）追加到 {report_store.REPORT_DB}（路径可用 REPORT_STORE_DB 指定）')
+    sub = parser.add_subparsers(dest='command')
+
+    probe = sub.add_parser('probe', help='并发探测在线端点并统计 p50/p95/p99 延迟')
+    probe.add_argument('--base-url', default=DEFAULT_BASE_URL, help='服务地址 (默认 $DEPLOY_BASE_URL 或 http://localhost:3000)')
+    probe.add_argument('--endpoint', action='append', help='要探测的路径，可重复 (默认 /api/health)')
+    probe.add_argument('--requests', type=int, default=20, help='每个端点的请求次数')
+    probe.add_argument('--concurrency', type=int, default=10, help='并发请求数（也是连接池大小）')
+    probe.add_argument('--timeout', type=float, default=5.0, help='单次请求超时秒数')
+    probe.add_argument('--retries', type=int, default=2, help='连接错误和 502/503/504 的重试次数')
+    probe.add_argument('--stand-in', action='store_true', help='对本地替身服务探测，不需要真实部署')
+    probe.add_argument('--stand-in-delay', type=float, default=0.0, help='替身服务每次响应的人为延迟秒数')
+
+    load = sub.add_parser('loadtest', help='按路由权重压测 API，输出 JSON 报告（吞吐、延迟直方图、错误率）')
+    load.add_argument('--base-url', default=DEFAULT_BASE_URL, help='服务地址 (默认 $DEPLOY_BASE_URL 或 http://localhost:3000)')
+    load.add_argument('--route', action='append', metavar='PATH[=WEIGHT]', help='压测路由及权重，可重复')
+    load.add_argument('--from-routes', action='append', metavar='KEYWORD',
+                      help='从路由清单加入包含关键字的静态 GET 路由，如 bidding、business-plan、health')
+    mode = load.add_mutually_exclusive_group()
+    mode.add_argument('--concurrency', type=int, default=0, help='固定并发（闭环），默认 10')
+    mode.add_argument('--rps', type=float, default=0, help='固定每秒请求数（开环）')
+    load.add_argument('--duration', type=float, default=10.0, help='持续秒数')
+    load.add_argument('--timeout', type=float, default=5.0, help='单次请求超时秒数')
+    load.add_argument('--seed', type=int, default=0, help='路由抽样的随机种子')
+    load.add_argument('--output', help='JSON 报告写入文件（默认输出到 stdout）')
+    load.add_argument('--baseline', help='与之前的 JSON 报告比较，回归时返回非零')
+    load.add_argument('--tolerance', type=float, default=0.2, help='p99 与吞吐量允许的相对退化')
+    load.add_argument('--max-error-rate', type=float, default=0.01, help='允许的最大错误率')
+    load.add_argument('--stand-in', action='store_true', help='对本地替身服务压测')
+    load.add_argument('--stand-in-delay', type=float, default=0.0, help='替身服务每次响应的人为延迟秒数')
+
+    docker = sub.add_parser('dockerfile', help='静态分析 Dockerfile 的分层缓存、镜像体积和构建上下文，输出评分报告')
+    docker.add_argument('paths', nargs='*', help=f"要分析的 Dockerfile (默认 {' '.join(DOCKERFILES)})")
+    docker.add_argument('--json', dest='docker_json', action='store_true', help='输出 JSON')
+
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    exit_code = run_all_tests()
+    args = parse_args()
+    if args.command == 'probe':
+        exit_code = run_probe(args)
+    elif args.command == 'loadtest':
+        exit_code = run_loadtest(args)
+    elif args.command == 'dockerfile':
+        exit_code = run_docker_report(args)
+    else:
+        exit_code = run_all_tests(args.workers, args.json_path, args.junit_path, not args.no_store)
     sys.exit(exit_code)
\ No newline at end of file
@@ -2,11 +2,35 @@
 """
 Simple sshpass replacement using Python
 Usage: python3 ssh_with_password.py <password> <ssh_command>
+
+Multiplexed mode: one ControlMaster connection per host, commands run over it in
+order, hosts in parallel, output streamed line by line with per-host exit codes.
+  SSHPASS=... python3 ssh_with_password.py --host root@a --host root@b -c 'cd /app' -c 'docker compose ps'
+  python3 ssh_with_password.py --stand-in --host a --host b --script deploy-steps.txt
+
+Transfer mode: diff content-hash manifests with the host's live release, stream only the
+missing chunks (zlib-compressed, one connection) into a new release, then switch the
+`current` symlink atomically. A host whose `current` is a real directory, or that already
+has a release of the same name, is refused before anything is uploaded.
+  python3 ssh_with_password.py transfer --host ubuntu@server --remote-dir ~/app .next public package.json
 """
 
 import sys
 import subprocess
 import os
+import argparse
+import fnmatch
+import hashlib
+import json
+import shlex
+import shutil
+import signal
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, PIPE, STDOUT
 
 def ssh_with_password(password, ssh_command):
@@ -33,13 +57,525 @@ def ssh_with_password(password, ssh_command):
         print(f"Error: {e}")
         return 1
 
+# ---- multiplexed fan-out ----
+
+ASKPASS_SCRIPT = '#!/bin/sh\nprintf \'%s\\n\' "$SSH_MUX_PASSWORD"\n'
+
+_print_lock = threading.Lock()
+
+def emit(host, line):
+    """Print one output line prefixed with its host; lines from parallel hosts never interleave"""
+    with _print_lock:
+        print(f"[{host}] {line}", flush=True)
+
+def stream_process(host, cmd, timeout, env=None):
+    """Run a command, streaming merged stdout/stderr line by line; returns its exit code (124 on timeout)"""
+    # Own process group, so a timeout also kills whatever the command started
+    process = Popen(cmd, stdin=subprocess.DEVNULL, stdout=PIPE, stderr=STDOUT, text=True, bufsize=1,
+                    env=env, errors='replace', start_new_session=True)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        for line in process.stdout:
+            emit(host, line.rstrip('\n'))
+        code = process.wait()
+    finally:
+        if timer:
+            timer.cancel()
+    if timed_out.is_set():
+        emit(host, f"timed out after {timeout:g}s")
+        return 124
+    return code
+
+class SshMux:
+    """A persistent ControlMaster connection to one host; every command reuses its socket"""
+
+    def __init__(self, host, control_dir, port=None, identity=None, password=None, ssh='ssh',
+                 connect_timeout=10, persist=600):
+        self.host = host
+        self.ssh = ssh
+        self.control_dir = control_dir
+        self.password = password
+        self.connect_timeout = connect_timeout
+        self.persist = persist
+        # %C hashes host, port and user, keeping the socket path under the unix socket length limit
+        self.options = ['-o', f'ControlPath={os.path.join(control_dir, "%C")}',
+                        '-o', 'StrictHostKeyChecking=accept-new']
+        if port:
+            self.options += ['-p', str(port)]
+        if identity:
+            self.options += ['-i', identity]
+
+    def open(self):
+        """Authenticate once and leave the master running in the background"""
+        cmd = [self.ssh, *self.options, '-o', 'ControlMaster=yes', '-o', f'ControlPersist={self.persist}',
+               '-o', f'ConnectTimeout={self.connect_timeout}', '-N', '-f', self.host]
+        env = dict(os.environ)
+        if self.password:
+            # ssh reads passwords from the terminal, never stdin; hand it over through SSH_ASKPASS instead
+            askpass = os.path.join(self.control_dir, 'askpass.sh')
+            if not os.path.exists(askpass):
+                with open(askpass, 'w') as f:
+                    f.write(ASKPASS_SCRIPT)
+                os.chmod(askpass, 0o700)
+            env.update(SSH_ASKPASS=askpass, SSH_ASKPASS_REQUIRE='force', SSH_MUX_PASSWORD=self.password,
+                       DISPLAY=env.get('DISPLAY', ':0'))
+        else:
+            cmd[1:1] = ['-o', 'BatchMode=yes']
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=PIPE, stderr=STDOUT, text=True,
+                                env=env, timeout=self.connect_timeout + 30, start_new_session=True)
+        for line in result.stdout.splitlines():
+            emit(self.host, line)
+        return result.returncode
+
+    def command_argv(self, command):
+        """argv running `command` on the host over the master's socket"""
+        return [self.ssh, *self.options, '-o', 'ControlMaster=no', self.host, command]
+
+    def run(self, command, timeout=None):
+        return stream_process(self.host, self.command_argv(command), timeout)
+
+    def close(self):
+        subprocess.run([self.ssh, *self.options, '-O', 'exit', self.host], stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+class LocalStandIn:
+    """Stand-in for SshMux that runs commands in a local shell, for exercising the fan-out without sshd"""
+
+    def __init__(self, host, connect_delay=0.0):
+        self.host = host
+        self.connect_delay = connect_delay
+
+    def open(self):
+        time.sleep(self.connect_delay)  # the handshake a real master pays once per host
+        return 0
+
+    def command_argv(self, command):
+        return ['env', f'MUX_HOST={self.host}', 'sh', '-c', command]
+
+    def run(self, command, timeout=None):
+        return stream_process(self.host, self.command_argv(command), timeout)
+
+    def close(self):
+        pass
+
+def run_on_host(connection, commands, timeout=None, keep_going=False):
+    """Open the connection, run the commands in order over it; returns the host's exit code"""
+    started = time.time()
+    code = connection.open()
+    if code != 0:
+        emit(connection.host, f"connection failed (exit {code})")
+        return code
+    try:
+        final = 0
+        for command in commands:
+            emit(connection.host, f"$ {command}")
+            code = connection.run(command, timeout)
+            if code != 0:
+                emit(connection.host, f"exit {code}")
+                final = final or code
+                if not keep_going:
+                    break
+        emit(connection.host, f"done in {time.time() - started:.1f}s")
+        return final
+    finally:
+        connection.close()
+
+def duplicate_hosts(hosts):
+    """Hosts named more than once; results are keyed by host, so a repeat would overwrite the first run"""
+    return sorted({host for host in hosts if hosts.count(host) > 1})
+
+def fan_out(connections, commands, parallel=0, timeout=None, keep_going=False):
+    """Run the same command list on every host in parallel; returns {host: exit code}"""
+    duplicates = duplicate_hosts([conn.host for conn in connections])
+    if duplicates:
+        raise ValueError(f"host given more than once: {', '.join(duplicates)}")
+    with ThreadPoolExecutor(max_workers=parallel or len(connections)) as pool:
+        futures = {conn.host: pool.submit(run_on_host, conn, commands, timeout, keep_going) for conn in connections}
+        results = {}
+        for host, future in futures.items():
+            try:
+                results[host] = future.result()
+            except Exception as e:
+                emit(host, f"Error: {e}")
+                results[host] = 255
+    return results
+
+def read_commands(args):
+    commands = list(args.command or [])
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            commands += [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    return commands
+
+def add_connection_arguments(parser):
+    parser.add_argument('--host', action='append', required=True, help='[user@]host, repeat for each host')
+    parser.add_argument('-p', '--port', type=int, help='ssh port')
+    parser.add_argument('-i', '--identity', help='private key file')
+    parser.add_argument('--password-env', default='SSHPASS', help='environment variable holding the password (default: SSHPASS)')
+    parser.add_argument('--parallel', type=int, default=0, help='hosts to run at once (default: all)')
+    parser.add_argument('--ssh', default='ssh', help='ssh binary')
+    parser.add_argument('--stand-in', action='store_true', help='run commands locally instead of over ssh')
+    parser.add_argument('--stand-in-delay', type=float, default=0.0, help='simulated handshake seconds per host')
+
+def make_connections(args, control_dir):
+    if args.stand_in:
+        return [LocalStandIn(host, args.stand_in_delay) for host in args.host]
+    password = os.environ.get(args.password_env)
+    return [SshMux(host, control_dir, args.port, args.identity, password, args.ssh) for host in args.host]
+
+def print_exit_codes(results):
+    print()
+    for host, code in results.items():
+        print(f"{'OK ' if code == 0 else 'ERR'} {host}: exit {code}")
+    return next((code for code in results.values() if code), 0)
+
+def main_multiplexed(argv):
+    parser = argparse.ArgumentParser(description='Run commands on several hosts over multiplexed ssh connections')
+    add_connection_arguments(parser)
+    parser.add_argument('-c', '--command', action='append', help='command to run, repeat to run several in order')
+    parser.add_argument('--script', help='file with one command per line (# comments allowed)')
+    parser.add_argument('--timeout', type=float, help='per-command timeout in seconds')
+    parser.add_argument('--keep-going', action='store_true', help='run the remaining commands after one fails')
+    args = parser.parse_args(argv)
+
+    commands = read_commands(args)
+    if not commands:
+        parser.error('no commands given (use -c or --script)')
+    if duplicate_hosts(args.host):
+        parser.error(f"--host given more than once: {', '.join(duplicate_hosts(args.host))}")
+
+    control_dir = tempfile.mkdtemp(prefix='ssh-mux-')
+    try:
+        results = fan_out(make_connections(args, control_dir), commands, args.parallel, args.timeout,
+                          args.keep_going)
+    finally:
+        shutil.rmtree(control_dir, ignore_errors=True)
+    return print_exit_codes(results)
+
+# ---- delta artifact transfer ----
+
+CHUNK_SIZE = 1024 * 1024
+RELEASE_MANIFEST = '.release-manifest.json'
+DEFAULT_EXCLUDES = ['.next/cache/*']
+
+# Runs on the remote host as `python3 -c`, so the manifest and the upload share one connection each
+REMOTE_HELPER = r'''
+import hashlib, json, os, shutil, struct, sys, zlib
+
+MANIFEST = '.release-manifest.json'
+
+def hash_tree(root, chunk_size):
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            if rel == MANIFEST or os.path.islink(path):
+                continue
+            chunks, whole = [], hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    chunks.append(hashlib.sha256(block).hexdigest())
+                    whole.update(block)
+            st = os.stat(path)
+            files[rel] = {'size': st.st_size, 'mode': st.st_mode & 0o777, 'sha': whole.hexdigest(), 'chunks': chunks}
+    return {'chunk_size': chunk_size, 'files': files}
+
+def current_manifest(base, chunk_size):
+    current = os.path.join(base, 'current')
+    if not os.path.isdir(current):
+        return {'chunk_size': chunk_size, 'files': {}}
+    try:
+        with open(os.path.join(current, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return hash_tree(current, chunk_size)
+
+def preflight(base, release):
+    """Refuse before anything is uploaded: the switch needs `current` to be a symlink and the release name free"""
+    current = os.path.join(base, 'current')
+    if os.path.lexists(current) and not os.path.islink(current):
+        sys.exit('error: %s is a real directory, not a release symlink; move it aside before the first transfer' % current)
+    if os.path.lexists(os.path.join(base, 'releases', release)):
+        sys.exit('error: release %s already exists on the host; pass another --release' % release)
+
+class Stream:
+    def __init__(self, f):
+        self.f, self.z, self.buf = f, zlib.decompressobj(), bytearray()
+
+    def read(self, n):
+        while len(self.buf) < n:
+            data = self.f.read(65536)
+            if not data:
+                raise EOFError('upload stream ended early')
+            self.buf += self.z.decompress(data)
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        return out
+
+    def at_end(self):
+        self.buf += self.z.decompress(self.f.read()) + self.z.flush()
+        return not self.buf
+
+def receive(base, release, keep):
+    preflight(base, release)
+    stream = Stream(sys.stdin.buffer)
+    manifest = json.loads(stream.read(struct.unpack('>I', stream.read(4))[0]))
+    old_root = os.path.realpath(os.path.join(base, 'current'))
+    old = current_manifest(base, manifest['chunk_size'])
+
+    # Every chunk the host already has, and whole files that can be hard-linked unchanged
+    known, linkable = {}, {}
+    for rel, info in old['files'].items():
+        path, offset = os.path.join(old_root, rel), 0
+        for sha in info['chunks']:
+            length = min(old['chunk_size'], info['size'] - offset)
+            known.setdefault(sha, (path, offset, length))
+            offset += length
+        linkable.setdefault((info['sha'], info['mode']), path)
+
+    releases = os.path.join(base, 'releases')
+    target = os.path.join(releases, release)
+    staging = target + '.partial'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    stats = {'release': target, 'files': 0, 'linked': 0, 'received_bytes': 0, 'reused_bytes': 0}
+
+    for rel in sorted(manifest['files']):
+        info = manifest['files'][rel]
+        dest = os.path.join(staging, rel)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        stats['files'] += 1
+        source = linkable.get((info['sha'], info['mode']))
+        if source:
+            try:
+                os.link(source, dest)
+            except OSError:
+                shutil.copy2(source, dest)
+            stats['linked'] += 1
+            stats['reused_bytes'] += info['size']
+            continue
+        with open(dest, 'wb') as out:
+            offset = 0
+            for sha in info['chunks']:
+                if sha in known:
+                    path, chunk_offset, length = known[sha]
+                    out.flush()
+                    with open(path, 'rb') as f:
+                        f.seek(chunk_offset)
+                        data = f.read(length)
+                    stats['reused_bytes'] += length
+                else:
+                    data = stream.read(min(manifest['chunk_size'], info['size'] - offset))
+                    stats['received_bytes'] += len(data)
+                if hashlib.sha256(data).hexdigest() != sha:
+                    raise ValueError('chunk mismatch in ' + rel)
+                known.setdefault(sha, (dest, offset, len(data)))
+                out.write(data)
+                offset += len(data)
+        os.chmod(dest, info['mode'])
+    if not stream.at_end():
+        raise ValueError('unexpected data after the last chunk')
+
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    os.rename(staging, target)
+
+    # Atomic switch: a new symlink renamed over `current`
+    link = os.path.join(base, '.current-%d' % os.getpid())
+    os.symlink(os.path.relpath(target, base), link)
+    os.replace(link, os.path.join(base, 'current'))
+
+    finished = sorted(name for name in os.listdir(releases) if not name.endswith('.partial'))
+    for name in finished[:-keep] if keep > 0 else []:
+        if os.path.join(releases, name) != target:
+            shutil.rmtree(os.path.join(releases, name), ignore_errors=True)
+    print(json.dumps(stats))
+
+command, base = sys.argv[1], os.path.abspath(os.path.expanduser(sys.argv[2]))
+if command == 'manifest':
+    preflight(base, sys.argv[4])
+    manifest = current_manifest(base, int(sys.argv[3]))
+    print(json.dumps({'chunk_size': manifest['chunk_size'],
+                      'files': {rel: {'sha': info['sha'], 'mode': info['mode'], 'chunks': info['chunks']}
+                                for rel, info in manifest['files'].items()}}))
+else:
+    os.makedirs(base, exist_ok=True)
+    receive(base, sys.argv[3], int(sys.argv[4]))
+'''
+
+def local_manifest(root, sources, excludes, chunk_size=CHUNK_SIZE):
+    """Content hashes of every file under `sources`, keyed by path relative to `root`"""
+    paths = []
+    for source in sources:
+        top = os.path.join(root, source)
+        if os.path.isfile(top):
+            paths.append(top)
+        for dirpath, _, filenames in os.walk(top):
+            paths.extend(os.path.join(dirpath, name) for name in filenames)
+
+    files = {}
+    for path in paths:
+        rel = os.path.relpath(path, root).replace(os.sep, '/')
+        if os.path.islink(path) or any(fnmatch.fnmatch(rel, pattern) for pattern in excludes):
+            continue
+        chunks, whole = [], hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(chunk_size), b''):
+                chunks.append(hashlib.sha256(block).hexdigest())
+                whole.update(block)
+        st = os.stat(path)
+        files[rel] = {'size': st.st_size, 'mode': st.st_mode & 0o777, 'sha': whole.hexdigest(), 'chunks': chunks}
+    return {'chunk_size': chunk_size, 'files': files}
+
+def upload_stream(root, manifest, remote):
+    """Yield the compressed upload: the manifest, then only the chunks the host lacks, in receive order"""
+    have = {sha for info in remote['files'].values() for sha in info['chunks']}
+    linkable = {(info['sha'], info['mode']) for info in remote['files'].values()}
+    compressor = zlib.compressobj(6)
+    header = json.dumps(manifest).encode('utf-8')
+    yield compressor.compress(struct.pack('>I', len(header)) + header)
+
+    sent = set()
+    for rel in sorted(manifest['files']):
+        info = manifest['files'][rel]
+        if (info['sha'], info['mode']) in linkable:
+            continue  # the receiver hard-links the unchanged file
+        with open(os.path.join(root, rel), 'rb') as f:
+            for sha in info['chunks']:
+                block = f.read(manifest['chunk_size'])
+                if sha in have or sha in sent:
+                    continue
+                sent.add(sha)
+                data = compressor.compress(block)
+                if data:
+                    yield data
+    yield compressor.flush()
+
+def transfer_to_host(connection, root, manifest, remote_dir, release, keep, remote_python, after):
+    """Diff against the host's current release, stream the missing chunks, switch, then run `after`"""
+    started = time.time()
+    code = connection.open()
+    if code != 0:
+        emit(connection.host, f"connection failed (exit {code})")
+        return code
+    try:
+        helper = f"{remote_python} -c {shlex.quote(REMOTE_HELPER)}"
+        listing = subprocess.run(
+            connection.command_argv(f"{helper} manifest {shlex.quote(remote_dir)} {manifest['chunk_size']} "
+                                    f"{shlex.quote(release)}"),
+            stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        if listing.returncode != 0:
+            for line in listing.stderr.splitlines():
+                emit(connection.host, line)
+            emit(connection.host, f"nothing uploaded (exit {listing.returncode})")
+            return listing.returncode
+        remote = json.loads(listing.stdout)
+
+        process = Popen(connection.command_argv(f"{helper} receive {shlex.quote(remote_dir)} {shlex.quote(release)} {keep}"),
+                        stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        # Drain the replies while writing so neither side can block on a full pipe
+        replies = {}
+        readers = [threading.Thread(target=lambda name, pipe: replies.__setitem__(name, pipe.read()),
+                                    args=(name, pipe)) for name, pipe in (('out', process.stdout), ('err', process.stderr))]
+        for reader in readers:
+            reader.start()
+        wire = 0
+        try:
+            for data in upload_stream(root, manifest, remote):
+                wire += len(data)
+                process.stdin.write(data)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        for reader in readers:
+            reader.join()
+        code = process.wait()
+        for line in replies['err'].decode('utf-8', 'replace').splitlines():
+            emit(connection.host, line)
+        if code != 0:
+            emit(connection.host, f"upload failed (exit {code})")
+            return code
+
+        stats = json.loads(replies['out'])
+        total = sum(info['size'] for info in manifest['files'].values())
+        emit(connection.host, f"{stats['files']} files ({total / 1048576:.1f} MiB): {stats['linked']} unchanged, "
+                              f"{stats['received_bytes'] / 1048576:.2f} MiB new, "
+                              f"{wire / 1048576:.2f} MiB on the wire")
+        emit(connection.host, f"current -> {stats['release']} in {time.time() - started:.1f}s")
+        if after:
+            emit(connection.host, f"$ {after}")
+            code = connection.run(after)
+            if code != 0:
+                emit(connection.host, f"exit {code}")
+        return code
+    finally:
+        connection.close()
+
+def main_transfer(argv):
+    parser = argparse.ArgumentParser(prog='ssh_with_password.py transfer',
+                                     description='Upload a build as a new release, sending only changed chunks')
+    add_connection_arguments(parser)
+    parser.add_argument('sources', nargs='+', help='files or directories to ship, relative to --root (e.g. .next public)')
+    parser.add_argument('--remote-dir', required=True, help='release base on the host; `current` links to the live release')
+    parser.add_argument('--root', default='.', help='local directory the sources are relative to')
+    parser.add_argument('--exclude', action='append', help=f"glob of paths to skip (default: {' '.join(DEFAULT_EXCLUDES)})")
+    parser.add_argument('--release', default=time.strftime('%Y%m%d%H%M%S'), help='release name (default: timestamp)')
+    parser.add_argument('--keep', type=int, default=3, help='finished releases to keep on the host')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='chunk size in bytes')
+    parser.add_argument('--remote-python', default='python3', help='python interpreter on the host')
+    parser.add_argument('--after', help='command to run on the host after the switch, e.g. "pm2 reload app"')
+    args = parser.parse_args(argv)
+    if duplicate_hosts(args.host):
+        parser.error(f"--host given more than once: {', '.join(duplicate_hosts(args.host))}")
+
+    started = time.time()
+    manifest = local_manifest(args.root, args.sources, args.exclude or DEFAULT_EXCLUDES, args.chunk_size)
+    print(f"Hashed {len(manifest['files'])} files in {time.time() - started:.1f}s")
+
+    control_dir = tempfile.mkdtemp(prefix='ssh-mux-')
+    try:
+        connections = make_connections(args, control_dir)
+        with ThreadPoolExecutor(max_workers=args.parallel or len(connections)) as pool:
+            futures = {conn.host: pool.submit(transfer_to_host, conn, args.root, manifest, args.remote_dir,
+                                              args.release, args.keep, args.remote_python, args.after)
+                       for conn in connections}
+            results = {}
+            for host, future in futures.items():
+                try:
+                    results[host] = future.result()
+                except Exception as e:
+                    emit(host, f"Error: {e}")
+                    results[host] = 255
+    finally:
+        shutil.rmtree(control_dir, ignore_errors=True)
+    return print_exit_codes(results)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'transfer':
+        sys.exit(main_transfer(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1].startswith('-'):
+        sys.exit(main_multiplexed(sys.argv[1:]))
+
     if len(sys.argv) < 3:
         print("Usage: python3 ssh_with_password.py <password> '<ssh_command>'")
+        print("       python3 ssh_with_password.py --host HOST [--host HOST ...] -c COMMAND [-c COMMAND ...]")
+        print("       python3 ssh_with_password.py transfer --host HOST --remote-dir DIR SOURCE [SOURCE ...]")
         sys.exit(1)
 
     password = sys.argv[1]
     ssh_command = ' '.join(sys.argv[2:])
 
     exit_code = ssh_with_password(password, ssh_command)
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(exit_code)
@@ -0,0 +1,58 @@
+import importlib.util
+import os
+import pickle
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts',
+                      'analyze-route-cacheability.py')
+_spec = importlib.util.spec_from_file_location('analyze_route_cacheability', SCRIPT)
+analyzer = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = analyzer  # pool workers and pickle look the rule up by module name
+_spec.loader.exec_module(analyzer)
+
+
+def test_rules_are_picklable_for_spawned_pool_workers():
+    # spawn (macOS/Windows) pickles the rules; a lambda anywhere in a rule fails there
+    assert pickle.loads(pickle.dumps(analyzer.ROUTE_CACHE_RULE)).path_filter('src/app/api/x/route.ts')
+
+
+def cacheability(path, content):
+    return next(iter(analyzer.check_route_cacheability(path, content)))
+
+
+def test_route_cacheability_allows_only_plain_reads():
+    info = cacheability('src/app/api/items/route.ts',
+                        "export async function GET() { return Response.json(await prisma.item.findMany()) }\n")
+    assert (info['class'], info['revalidate'], info['signals']) == ('isr', 60, ['db-read'])
+    assert cacheability('src/app/api/about/route.ts',
+                        "const INFO = {v: 1}\nexport function GET() { return Response.json(INFO) }\n")['class'] == 'static'
+
+
+def test_route_cacheability_keeps_generators_and_side_effects_dynamic():
+    generated = cacheability('src/app/api/plan/modules/x/route.ts',
+                             "export async function GET() { return Response.json(generateDefaultModel({})) }\n")
+    assert generated['class'] == 'dynamic' and 'generator' in generated['signals']
+
+    pdf = cacheability('src/app/api/workshop/generate-pdf/route.ts',
+                       "export async function GET() { return Response.json({ ok: true }) }\n")
+    assert pdf['class'] == 'dynamic' and 'generator' in pdf['signals']
+
+    helper = cacheability('src/app/api/stats/route.ts',
+                          "export async function GET() { return Response.json(await getStats()) }\n")
+    assert helper['class'] == 'dynamic' and 'awaited-call' in helper['signals']
+
+
+def test_route_cacheability_skips_stub_handlers():
+    content = ("export function GET() { return Response.json({}) }\n"
+               "export function PUT() { return Response.json({ error: 'todo' }, { status: 501 }) }\n")
+    info = cacheability('src/app/api/agents/[id]/route.ts', content)
+    assert (info['class'], info['revalidate'], info['signals']) == ('stub', None, ['stub'])
+
+
+def test_revalidate_export_replaces_force_dynamic_and_its_comment():
+    transform = analyzer.RevalidateExport({'a/route.ts': 60})
+    content = "import x from 'y'\n\n// 强制动态渲染\nexport const dynamic = 'force-dynamic'\nexport function GET() {}\n"
+    assert transform('a/route.ts', content) == (
+        'updated', 'force-dynamic -> revalidate 60',
+        "import x from 'y'\n\nexport const revalidate = 60\nexport function GET() {}\n")
+    assert transform('b/route.ts', content)[:2] == ('skipped', 'must stay dynamic')
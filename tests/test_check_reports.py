@@ -0,0 +1,48 @@
+import json
+import xml.etree.ElementTree as ET
+from typing import Any, NamedTuple, Optional
+
+from check_reports import write_json_report, write_junit_report
+
+
+class Result(NamedTuple):
+    """The attributes the writers read from DeploymentTestResult"""
+    test: str
+    check: str
+    success: bool
+    error: Optional[str] = None
+    data: Any = None
+    duration: float = 0.5
+
+    def to_dict(self):
+        return self._asdict()
+
+
+RESULTS = [
+    Result('Dockerfile', 'test_docker_configuration', True, data={'score': 90}),
+    Result('Dockerfile.simple', 'test_docker_configuration', False, '得分 40'),
+    Result('PostgreSQL配置检查', 'test_database_configuration', True, duration=0.25),
+]
+
+
+def test_json_report_counts_passes_and_times_each_check(tmp_path):
+    path = tmp_path / 'report.json'
+    write_json_report(str(path), RESULTS, 1.23456)
+    report = json.loads(path.read_text(encoding='utf-8'))
+    assert (report['wall_time_s'], report['passed'], report['total']) == (1.2346, 2, 3)
+    assert report['checks'] == {'test_docker_configuration': 0.5, 'test_database_configuration': 0.25}
+    assert report['results'][1]['error'] == '得分 40'
+
+
+def test_junit_report_has_one_suite_per_check_and_one_case_per_result(tmp_path):
+    path = tmp_path / 'report.xml'
+    write_junit_report(str(path), RESULTS, 1.0)
+    suites = ET.parse(str(path)).getroot()
+    assert (suites.get('tests'), suites.get('failures'), suites.get('time')) == ('3', '1', '1.0000')
+    assert [(suite.get('name'), suite.get('tests'), suite.get('failures'), suite.get('time')) for suite in suites] == [
+        ('test_docker_configuration', '2', '1', '0.5000'), ('test_database_configuration', '1', '0', '0.2500')]
+    cases = suites.findall('.//testcase')
+    assert [case.get('name') for case in cases] == ['Dockerfile', 'Dockerfile.simple', 'PostgreSQL配置检查']
+    assert cases[1].find('failure').get('message') == '得分 40'
+    assert json.loads(cases[0].find('system-out').text) == {'score': 90}
+    assert cases[2].find('failure') is None and cases[2].find('system-out') is None
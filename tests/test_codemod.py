@@ -0,0 +1,95 @@
+import json
+import os
+
+from codemod import Codemod, apply, create_file, list_journals, plan, rollback
+
+
+def shout(path, content):
+    if 'skip' in content:
+        return 'skipped', 'marked skip', None
+    return 'updated', 'upper-cased', content.upper()
+
+
+SHOUT = Codemod('shout', shout, suffixes=('.ts',))
+
+
+def make_tree(tmp_path, **files):
+    root = tmp_path / 'src'
+    root.mkdir()
+    for name, text in files.items():
+        (root / f'{name}.ts').write_text(text, encoding='utf-8')
+    return root
+
+
+def read(root, name):
+    return (root / f'{name}.ts').read_text(encoding='utf-8')
+
+
+def test_apply_writes_planned_edits_and_rollback_restores_them(tmp_path):
+    root = make_tree(tmp_path, a='const a = 1\n', b='const b = 2\n', c='// skip\n')
+    journals = str(tmp_path / 'journal')
+    edits = plan(SHOUT, str(root))
+    assert sorted((os.path.basename(edit.path), edit.status) for edit in edits) == \
+        [('a.ts', 'updated'), ('b.ts', 'updated'), ('c.ts', 'skipped')]
+
+    result = apply(SHOUT.name, edits, workers=2, journal_root=journals)
+    assert not result.failed and not result.rolled_back
+    assert read(root, 'a') == 'CONST A = 1\n' and read(root, 'c') == '// skip\n'
+    assert list_journals(journals) == [result.journal]
+
+    report = rollback(result.journal)
+    assert len(report['restored']) == 2 and not report['conflict']
+    assert read(root, 'a') == 'const a = 1\n' and read(root, 'b') == 'const b = 2\n'
+    with open(os.path.join(result.journal, 'journal.json'), encoding='utf-8') as f:
+        assert json.load(f)['state'] == 'rolled-back'
+
+
+def test_a_failed_write_rolls_back_the_whole_run(tmp_path):
+    root = make_tree(tmp_path, a='const a = 1\n', b='const b = 2\n')
+    edits = plan(SHOUT, str(root))
+    (root / 'b.ts').write_text('const b = 3\n', encoding='utf-8')  # edited after planning
+
+    result = apply(SHOUT.name, edits, workers=1, journal_root=str(tmp_path / 'journal'))
+    assert result.rolled_back
+    assert result.failed == [(str(root / 'b.ts'), 'file changed since the edit was planned')]
+    assert read(root, 'a') == 'const a = 1\n' and read(root, 'b') == 'const b = 3\n'
+
+
+def test_rollback_leaves_files_edited_after_the_run_alone(tmp_path):
+    root = make_tree(tmp_path, a='const a = 1\n', b='const b = 2\n')
+    result = apply(SHOUT.name, plan(SHOUT, str(root)), workers=1, journal_root=str(tmp_path / 'journal'))
+    (root / 'b.ts').write_text('hand edit\n', encoding='utf-8')
+
+    report = rollback(result.journal)
+    assert report['conflict'] == [str(root / 'b.ts')]
+    assert read(root, 'a') == 'const a = 1\n' and read(root, 'b') == 'hand edit\n'
+    with open(os.path.join(result.journal, 'journal.json'), encoding='utf-8') as f:
+        assert json.load(f)['state'] == 'partially-rolled-back'
+
+
+def test_created_files_refuse_to_overwrite_and_are_removed_on_rollback(tmp_path):
+    root = make_tree(tmp_path, a='const a = 1\n')
+    journals = str(tmp_path / 'journal')
+    new_file = str(root / 'lib' / 'new.ts')
+
+    result = apply('create', [create_file(new_file, 'export {}\n')], journal_root=journals)
+    assert not result.failed and os.path.exists(new_file)
+    assert rollback(result.journal)['restored'] == [new_file]
+    assert not os.path.exists(new_file)
+
+    result = apply('create', [create_file(str(root / 'a.ts'), 'export {}\n')], journal_root=journals)
+    assert result.failed == [(str(root / 'a.ts'), 'file already exists')]
+    assert read(root, 'a') == 'const a = 1\n'
+
+
+def test_list_journals_orders_same_second_runs_by_start_time(tmp_path, monkeypatch):
+    import codemod
+    root = make_tree(tmp_path, a='const a = 1\n', b='const b = 2\n')
+    journals = str(tmp_path / 'journal')
+    monkeypatch.setattr(codemod.time, 'strftime', lambda fmt: '20250101T000000')
+    monkeypatch.setattr(codemod.os, 'getpid', lambda: 99999)
+    first = apply('create', [create_file(str(root / 'one.ts'), 'export {}\n')], journal_root=journals)
+    monkeypatch.setattr(codemod.os, 'getpid', lambda: 100)  # sorts before the first run's name
+    second = apply('create', [create_file(str(root / 'two.ts'), 'export {}\n')], journal_root=journals)
+    assert sorted([first.journal, second.journal]) == [second.journal, first.journal]
+    assert list_journals(journals) == [first.journal, second.journal]
@@ -0,0 +1,42 @@
+import pytest
+
+from deploy_probe import latency_summary, percentile, probe_stats, start_stand_in_server
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, pct) for pct in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([7.0], 99) == 7.0 and percentile([], 50) is None
+
+
+def test_latency_summary_rounds_and_handles_no_samples():
+    assert latency_summary([3.14159, 1.0, 2.0]) == {'p50_ms': 2.0, 'p95_ms': 3.14, 'p99_ms': 3.14, 'max_ms': 3.14}
+    assert latency_summary([]) == {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+
+
+@pytest.fixture
+def stand_in():
+    server = start_stand_in_server(metrics='up 1\n')
+    yield 'http://%s:%d' % server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_probe_stats_counts_every_request_per_endpoint(stand_in):
+    pytest.importorskip('requests')
+    stats = probe_stats(stand_in, ['/api/health', '/metrics'], requests_per_endpoint=5, concurrency=3)
+    assert {endpoint: (data['requests'], data['errors'], data['statuses']) for endpoint, data in stats.items()} == \
+        {'/api/health': (5, 0, {'200': 5}), '/metrics': (5, 0, {'200': 5})}
+    assert stats['/metrics']['p50_ms'] <= stats['/metrics']['max_ms']
+
+
+def test_probe_stats_reports_connection_failures_as_errors():
+    pytest.importorskip('requests')
+    server = start_stand_in_server()
+    base_url = 'http://%s:%d' % server.server_address
+    server.shutdown()
+    server.server_close()
+    stats = probe_stats(base_url, ['/api/health'], requests_per_endpoint=2, concurrency=2, timeout=1, retries=0)
+    assert (stats['/api/health']['errors'], stats['/api/health']['error_rate']) == (2, 1.0)
+    assert stats['/api/health']['statuses'] == {'ConnectionError': 2}
+    assert stats['/api/health']['p50_ms'] is None
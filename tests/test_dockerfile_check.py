@@ -0,0 +1,92 @@
+from dockerfile_check import analyze_dockerfile, docker_report, dockerignore_matcher, estimate_build_context, \
+    parse_dockerfile
+
+GOOD = """\
+# syntax=docker/dockerfile:1
+FROM node:20-alpine AS deps
+WORKDIR /app
+COPY package.json package-lock.json ./
+RUN --mount=type=cache,target=/root/.npm \\
+    npm ci --omit=dev
+
+FROM node:20-alpine AS builder
+WORKDIR /app
+COPY --from=deps /app/node_modules ./node_modules
+COPY . .
+RUN npm run build
+
+FROM node:20-alpine AS runner
+COPY --from=builder --chown=node:node /app/.next/standalone ./
+COPY --from=builder /app/.next/static ./.next/static
+USER node
+HEALTHCHECK CMD node healthcheck.js
+CMD ["node", "server.js"]
+"""
+
+BAD = """\
+FROM node:20
+WORKDIR /app
+COPY . .
+RUN echo cache-bust-1
+RUN npm install
+RUN chown -R node /app
+CMD ["npm", "start"]
+"""
+
+
+def test_parse_dockerfile_joins_continuations_and_keeps_first_lines():
+    stages = parse_dockerfile('\ufeff' + GOOD)
+    assert [(stage.index, stage.name, stage.base, stage.line) for stage in stages] == \
+        [(0, 'deps', 'node:20-alpine', 2), (1, 'builder', 'node:20-alpine', 8), (2, 'runner', 'node:20-alpine', 14)]
+    install = stages[0].instructions[-1]
+    assert (install.line, install.cmd, install.args) == \
+        (5, 'RUN', '--mount=type=cache,target=/root/.npm  npm ci --omit=dev')
+
+
+def test_a_multi_stage_standalone_build_has_no_findings():
+    assert analyze_dockerfile(GOOD) == []
+
+
+def test_analyze_dockerfile_flags_layer_order_size_and_security():
+    findings = analyze_dockerfile(BAD, next_config="module.exports = { // output: 'standalone'\n}")
+    assert sorted((finding.category, finding.penalty, finding.line) for finding in findings) == [
+        ('build-time', 5, 5),  # no BuildKit cache mount
+        ('build-time', 15, 4),  # cache bust
+        ('build-time', 20, 3),  # source copied before npm install
+        ('image-size', 10, 6),  # chown -R
+        ('image-size', 25, 1),  # single stage
+        ('security', 5, 1),  # no HEALTHCHECK
+        ('security', 10, 1),  # runs as root
+    ]
+    assert analyze_dockerfile('# empty\n')[0].penalty == 100
+
+
+def test_dockerignore_later_rules_win_and_directories_exclude_their_contents():
+    ignored = dockerignore_matcher("# comment\nnode_modules\n**/*.log\n/docs/\n!docs/keep.md\n")
+    assert ignored('node_modules/react/index.js') and ignored('src/deep/debug.log') and ignored('docs/a.md')
+    assert not ignored('docs/keep.md') and not ignored('src/index.ts')
+    assert ignored.has_exceptions and not dockerignore_matcher('node_modules\n').has_exceptions
+
+
+def test_estimate_build_context_counts_only_what_docker_sends(tmp_path):
+    (tmp_path / 'node_modules').mkdir()
+    (tmp_path / 'node_modules' / 'big.js').write_bytes(b'x' * 1000)
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'a.ts').write_bytes(b'x' * 30)
+    (tmp_path / 'package.json').write_bytes(b'x' * 10)
+    (tmp_path / '.dockerignore').write_text('node_modules\n', encoding='utf-8')
+    context = estimate_build_context(str(tmp_path))
+    assert (context['files'], context['bytes']) == (3, 40 + len('node_modules\n'))
+    assert context['largest_entries'][0] == {'path': 'src', 'bytes': 30}
+
+
+def test_docker_report_scores_each_dockerfile(tmp_path, monkeypatch):
+    (tmp_path / 'Dockerfile').write_text(GOOD, encoding='utf-8')
+    (tmp_path / 'Dockerfile.simple').write_text(BAD, encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    report = docker_report()
+    assert {path: analysis['score'] for path, analysis in report['dockerfiles'].items()} == \
+        {'Dockerfile': 100, 'Dockerfile.simple': 10}
+    worst = report['dockerfiles']['Dockerfile.simple']
+    assert worst['penalties'] == {'build-time': 40, 'image-size': 35, 'security': 15}
+    assert worst['findings'][0]['penalty'] == 25
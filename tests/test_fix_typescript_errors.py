@@ -0,0 +1,213 @@
+import os
+
+import pytest
+
+import fix_typescript_errors
+from fix_typescript_errors import FIX_RULES, Diagnostic, FixCache, TypeScriptErrorFixer, iter_diagnostics, load_plugin
+
+
+@pytest.fixture
+def fixer(tmp_path):
+    return TypeScriptErrorFixer(str(tmp_path))
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_write_files_atomically_writes_every_file(fixer, tmp_path):
+    a = write(tmp_path / 'a.ts', 'const a = 1\n')
+    b = write(tmp_path / 'b.ts', 'const b = 1\n')
+
+    assert fixer.write_files_atomically({a: ['const a = 2\n'], b: ['const b = 2\n']}) == 2
+    assert open(a).read() == 'const a = 2\n'
+    assert open(b).read() == 'const b = 2\n'
+    assert sorted(os.listdir(tmp_path)) == ['a.ts', 'b.ts']
+
+
+def test_write_files_atomically_restores_written_files_when_a_rename_fails(fixer, tmp_path, monkeypatch):
+    paths = [write(tmp_path / f'{name}.ts', f'const {name} = 1\n') for name in 'abc']
+    real_replace = os.replace
+    renames = []
+
+    def flaky_replace(src, dst):
+        # The third rename into place fails; restores go through fresh temp files and still work
+        if dst == paths[2] and not renames:
+            renames.append(dst)
+            raise OSError('disk full')
+        real_replace(src, dst)
+
+    monkeypatch.setattr(fix_typescript_errors.os, 'replace', flaky_replace)
+    with pytest.raises(OSError, match='disk full'):
+        fixer.write_files_atomically({path: ['changed\n'] for path in paths})
+
+    for name, path in zip('abc', paths):
+        assert open(path).read() == f'const {name} = 1\n'
+    assert sorted(os.listdir(tmp_path)) == ['a.ts', 'b.ts', 'c.ts']
+
+
+def test_write_files_atomically_leaves_tree_alone_when_staging_fails(fixer, tmp_path):
+    a = write(tmp_path / 'a.ts', 'const a = 1\n')
+    missing = str(tmp_path / 'gone.ts')
+
+    assert fixer.write_files_atomically({a: ['const a = 2\n'], missing: ['x\n']}) == 0
+    assert open(a).read() == 'const a = 1\n'
+    assert os.listdir(tmp_path) == ['a.ts']
+
+
+def test_iter_diagnostics_folds_continuation_lines():
+    output = [
+        "src/a.ts(3,7): error TS2322: Type 'string' is not assignable to type 'number'.\n",
+        "  Property 'x' is missing in type 'A'.\n",
+        "src/b.tsx(10,1): error TS6133: 'y' is declared but its value is never read.\r\n",
+        "\n",
+        "Found 2 errors in 2 files.\n",
+    ]
+
+    assert list(iter_diagnostics(output)) == [
+        Diagnostic('src/a.ts', 3, 7, 'TS2322',
+                   "Type 'string' is not assignable to type 'number'.\nProperty 'x' is missing in type 'A'."),
+        Diagnostic('src/b.tsx', 10, 1, 'TS6133', "'y' is declared but its value is never read."),
+    ]
+
+
+def test_iter_diagnostics_is_lazy():
+    def lines():
+        yield "src/a.ts(1,1): error TS1005: ';' expected.\n"
+        yield "src/a.ts(2,1): error TS1005: ';' expected.\n"
+        raise AssertionError('read past the second diagnostic')
+
+    stream = iter_diagnostics(lines())
+    assert next(stream).line == 1
+
+
+def plan_unused(fixer, tmp_path, text, *unused):
+    """Planned text after TS6133 fixes for each (line, col, name)"""
+    path = write(tmp_path / 'a.tsx', text)
+    errors = [Diagnostic(path, line, col, 'TS6133', f"'{name}' is declared but its value is never read.")
+              for line, col, name in unused]
+    result = fixer.plan_file_fixes(path, errors)
+    assert open(path).read() == text  # planning never touches the disk
+    return ''.join(result.fixed) if result.changed else text
+
+
+def test_edit_plan_removes_one_named_import(fixer, tmp_path):
+    fixed = plan_unused(fixer, tmp_path, "import { a, b, c } from 'x'\nuse(a, c)\n", (1, 13, 'b'))
+    assert fixed == "import { a, c } from 'x'\nuse(a, c)\n"
+
+
+def test_edit_plan_drops_multiline_import_when_every_name_is_unused(fixer, tmp_path):
+    fixed = plan_unused(fixer, tmp_path, "import {\n  a,\n  b,\n} from 'x'\nrun()\n", (2, 3, 'a'), (3, 3, 'b'))
+    assert fixed == 'run()\n'
+
+
+def test_edit_plan_keeps_positional_array_elements(fixer, tmp_path):
+    text = "const [value, setValue] = useState(0)\nconst [, second, third] = list\n"
+    fixed = plan_unused(fixer, tmp_path, text, (1, 15, 'setValue'), (2, 10, 'second'))
+    # Only a trailing run of an array pattern can go; `second` still fixes the position of `third`
+    assert fixed == "const [value] = useState(0)\nconst [, second, third] = list\n"
+
+
+def test_edit_plan_prefixes_unused_parameters(fixer, tmp_path):
+    fixed = plan_unused(fixer, tmp_path, "function f(a: number, b: string) { return b }\n", (1, 12, 'a'))
+    assert fixed == "function f(_a: number, b: string) { return b }\n"
+
+
+TSCONFIG = """{
+  // comments and trailing commas are allowed
+  "compilerOptions": {"paths": {"@/*": ["./src/*"]},},
+  "include": ["src/**/*.ts", "src/**/*.tsx", "**/*.d.ts", "lib"],
+  "exclude": ["node_modules", "src/legacy"],
+}
+"""
+
+
+def make_tree(root, files):
+    for rel, text in files.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(text, encoding='utf-8')
+
+
+def test_fix_cache_hashes_what_tsconfig_compiles(tmp_path):
+    make_tree(tmp_path, {
+        'tsconfig.json': TSCONFIG,
+        'src/a.ts': 'a', 'src/ui/b.tsx': 'b', 'src/legacy/old.ts': 'old',
+        'lib/c.ts': 'c', 'types/env.d.ts': 'd', 'tests/unit.test.ts': 't', 'node_modules/x/index.d.ts': 'x',
+    })
+
+    assert list(FixCache(str(tmp_path)).compiled_files()) == \
+        ['lib/c.ts', 'src/a.ts', 'src/ui/b.tsx', 'types/env.d.ts']
+
+
+def test_fix_cache_tree_digest_follows_included_tests(tmp_path):
+    make_tree(tmp_path, {'tsconfig.json': '{"include": ["src", "tests"]}', 'src/a.ts': 'a',
+                         'tests/a.test.ts': 'before'})
+    before = FixCache(str(tmp_path)).tree_digest()
+
+    (tmp_path / 'tests/a.test.ts').write_text('after, and longer', encoding='utf-8')
+    assert FixCache(str(tmp_path)).tree_digest() != before
+
+
+def test_fix_cache_salt_changes_with_plugin_code(tmp_path):
+    plugin = tmp_path / 'plugin.py'
+    source = ("from fix_typescript_errors import register_fixer\n\n"
+              "@register_fixer('TS9999', name='test_plugin_rule')\n"
+              "def fix(fixer, error, plan):\n    {}\n")
+    plugin.write_text(source.format('pass'), encoding='utf-8')
+    try:
+        load_plugin(str(plugin))
+        before = FixCache(str(tmp_path)).rules_digest(FIX_RULES.values())
+        plugin.write_text(source.format('return None'), encoding='utf-8')
+        assert FixCache(str(tmp_path)).rules_digest(FIX_RULES.values()) != before
+    finally:
+        FIX_RULES.pop('test_plugin_rule', None)
+
+
+def _rules_seen_by_spawned_worker(plugin):
+    """What a spawn-started worker sees when the parent ran fix_typescript_errors.py as a script:
+    the module is re-imported as __mp_main__ and nothing named fix_typescript_errors is loaded yet"""
+    import importlib.util
+    import sys
+    sys.modules.pop('fix_typescript_errors', None)
+    spec = importlib.util.spec_from_file_location('__mp_main__', fix_typescript_errors.__file__)
+    main = importlib.util.module_from_spec(spec)
+    sys.modules['__mp_main__'] = main
+    spec.loader.exec_module(main)
+    main._init_fix_worker(os.path.dirname(plugin), (plugin,))
+    return sorted(name for name in main.FIX_RULES if name == 'spawn_plugin_rule')
+
+
+def test_plugins_register_into_the_worker_module_under_spawn(tmp_path):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    plugin = tmp_path / 'plugin.py'
+    plugin.write_text("from fix_typescript_errors import register_fixer\n\n"
+                      "@register_fixer('TS9999', name='spawn_plugin_rule')\n"
+                      "def fix(fixer, error, plan):\n    pass\n", encoding='utf-8')
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        assert pool.submit(_rules_seen_by_spawned_worker, str(plugin)).result() == ['spawn_plugin_rule']
+
+
+def plan_undefined(fixer, tmp_path, text, line, col, code, message):
+    """Planned text after fixing one possibly-undefined diagnostic"""
+    path = write(tmp_path / 'a.ts', text)
+    result = fixer.plan_file_fixes(path, [Diagnostic(path, line, col, code, message)])
+    return ''.join(result.fixed) if result.changed else text
+
+
+@pytest.mark.parametrize('text, col, name, expected', [
+    ("const n = user.profile.name\n", 11, 'user.profile', "const n = user.profile?.name\n"),
+    ("const n = arr[0].x\n", 11, 'arr[0]', "const n = arr[0]?.x\n"),
+    ("const n = getUser().name\n", 11, 'getUser()', "const n = getUser()?.name\n"),
+    ("const n = obj.a.b\n", 11, 'obj.a', "const n = obj.a?.b\n"),
+    ("user.profile.name = 'x'\n", 1, 'user.profile', "user.profile.name = 'x'\n"),
+])
+def test_possibly_undefined_guards_the_named_expression(fixer, tmp_path, text, col, name, expected):
+    message = f"'{name}' is possibly 'undefined'."
+    assert plan_undefined(fixer, tmp_path, text, 1, col, 'TS18048', message) == expected
+
+
+@pytest.mark.parametrize('text', ["const n = arr[0].x\n", "const n = getUser().name\n", "const n = obj.a.b\n"])
+def test_possibly_undefined_leaves_unnamed_ts2532_alone(fixer, tmp_path, text):
+    assert plan_undefined(fixer, tmp_path, text, 1, 11, 'TS2532', "Object is possibly 'undefined'.") == text
@@ -0,0 +1,68 @@
+import pytest
+
+from deploy_probe import start_stand_in_server
+from loadtest import LatencyHistogram, LoadStats, compare_to_baseline, parse_route_mix, run_load
+
+
+def test_histogram_buckets_to_two_significant_digits():
+    assert [LatencyHistogram.bucket(value) for value in (7, 42, 123, 4567, 98765)] == [7, 42, 120, 4500, 98000]
+    histogram = LatencyHistogram()
+    for value_ms in range(1, 101):
+        histogram.record(value_ms)
+    assert (histogram.total, histogram.min_us, histogram.max_us) == (100, 1000, 100000)
+    # The upper bound of the bucket, never above the largest value recorded
+    assert [histogram.percentile(pct) for pct in (50, 99, 100)] == [51.0, 100.0, 100.0]
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_histogram_merge_keeps_counts_and_extremes():
+    fast, slow = LatencyHistogram(), LatencyHistogram()
+    fast.record(0.0001)  # clamped to 1us
+    slow.record(250)
+    fast.merge(slow)
+    summary = fast.to_json()
+    assert (summary['count'], summary['min_ms'], summary['max_ms']) == (2, 0.001, 250.0)
+    assert summary['buckets'] == [[0.001, 1], [250.0, 1]]
+
+
+def test_load_stats_report_counts_errors_per_route():
+    stats = LoadStats(['/a', '/b'])
+    stats.record('/a', 200, 10.0, None)
+    stats.record('/a', 503, 20.0, None)
+    stats.record('/b', None, 5.0, 'ConnectTimeout')
+    report = stats.report({'type': 'fixed-concurrency', 'concurrency': 2}, 2.0)
+    assert (report['requests'], report['errors'], report['throughput_rps']) == (3, 2, 1.5)
+    assert report['routes']['/a']['statuses'] == {'200': 1, '503': 1}
+    route = report['routes']['/b']
+    assert (route['error_rate'], route['statuses'], route['latency']['count']) == (1.0, {'ConnectTimeout': 1}, 1)
+
+
+def test_parse_route_mix_defaults_weights_to_one():
+    assert parse_route_mix(['/api/health=3', '/api/ideas', '/x=0.5']) == {'/api/health': 3.0, '/api/ideas': 1.0, '/x': 0.5}
+
+
+def loadtest_report(error_rate=0.0, p99=100.0, rps=200.0, mode='fixed-concurrency'):
+    return {'mode': {'type': mode}, 'error_rate': error_rate, 'throughput_rps': rps, 'latency': {'p99_ms': p99}}
+
+
+def test_compare_to_baseline_flags_latency_throughput_and_errors():
+    baseline = loadtest_report()
+    assert compare_to_baseline(loadtest_report(p99=110, rps=190), baseline, 0.2, 0.01) == []
+    assert len(compare_to_baseline(loadtest_report(error_rate=0.05, p99=150, rps=100), baseline, 0.2, 0.01)) == 3
+    # Under fixed RPS the schedule sets the throughput, so a lower rate is not a regression
+    assert compare_to_baseline(loadtest_report(rps=100, mode='fixed-rps'), baseline, 0.2, 0.01) == []
+    assert compare_to_baseline(loadtest_report(error_rate=0.05), {}, 0.2, 0.01) != []
+
+
+@pytest.mark.parametrize('mode', [{'concurrency': 2}, {'rps': 40}])
+def test_run_load_against_the_stand_in(mode):
+    pytest.importorskip('requests')
+    server = start_stand_in_server()
+    try:
+        report = run_load('http://%s:%d' % server.server_address, {'/api/health': 1, '/metrics': 1}, 0.5, **mode)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert report['requests'] > 0 and report['errors'] == 0
+    assert set(report['routes']) == {'/api/health', '/metrics'}
+    assert ('dispatch_lag' in report) == ('rps' in mode)
@@ -0,0 +1,114 @@
+import pytest
+
+from deploy_probe import start_stand_in_server
+from monitoring_check import find_high_cardinality, load_compose_services, parse_duration, parse_exposition, \
+    simulate_scrape, simulated_app_metrics, validate_alert_rules, validate_prometheus_config
+from route_manifest import Route
+
+
+def test_parse_duration_accepts_only_whole_prometheus_durations():
+    assert [parse_duration(value) for value in ('15s', '1m30s', '500ms', '2h', ' 1d ')] == [15, 90, 0.5, 7200, 86400]
+    assert [parse_duration(value) for value in ('', '15', '1.5s', '10s garbage', 'm')] == [None] * 5
+
+
+COMPOSE = """\
+services:
+  app:
+    ports: ["3000:3000"]
+  node-exporter:
+    expose: ["9100"]
+"""
+
+PROMETHEUS = {
+    'global': {'scrape_interval': '15s', 'scrape_timeout': '10s'},
+    'rule_files': ['alert_rules.yml', 'missing.yml'],
+    'scrape_configs': [
+        {'job_name': 'prometheus', 'static_configs': [{'targets': ['localhost:9090']}]},
+        {'job_name': 'app', 'metrics_path': '/api/metrics', 'static_configs': [{'targets': ['app:3000']}]},
+        {'job_name': 'app', 'static_configs': [{'targets': ['app:4000']}]},
+        {'job_name': 'node', 'scrape_interval': '5s', 'static_configs': [{'targets': ['node-exporter:9100']}]},
+        {'job_name': 'redis', 'scrape_timeout': '30s', 'static_configs': [{'targets': ['redis:9121']}]},
+        {'job_name': 'blackbox', 'sample_limt': 10, 'static_configs': [{'targets': ['https://example.com']}],
+         'relabel_configs': [{'target_label': '__address__', 'replacement': 'blackbox:9115'}]},
+    ],
+}
+
+
+def test_prometheus_config_is_checked_against_the_compose_services(tmp_path, monkeypatch):
+    (tmp_path / 'docker-compose.yml').write_text(COMPOSE, encoding='utf-8')
+    (tmp_path / 'docker' / 'prometheus').mkdir(parents=True)
+    (tmp_path / 'docker' / 'prometheus' / 'alert_rules.yml').write_text('groups: []\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+
+    services = load_compose_services()
+    assert services['app'] == {'files': ['docker-compose.yml'], 'ports': {'3000'}}
+    errors, unresolved, jobs = validate_prometheus_config(PROMETHEUS, services)
+    assert errors == [
+        '规则文件不存在: missing.yml',
+        'app: job_name 重复',
+        'node: scrape_timeout 10s 大于 scrape_interval 5s',
+        'redis: scrape_timeout 30s 大于 scrape_interval 15s',
+        "blackbox: 未知配置项 ['sample_limt']（Prometheus 会拒绝加载）",
+    ]
+    assert unresolved == [
+        'app: app:4000（app 未暴露端口 4000）',
+        'redis: redis:9121（没有名为 redis 的 compose 服务）',
+        'blackbox: blackbox:9115（没有名为 blackbox 的 compose 服务）',
+    ]
+    assert len(jobs) == 6
+
+
+def test_alert_rules_need_names_severity_durations_and_balanced_brackets(tmp_path):
+    rules = tmp_path / 'alert_rules.yml'
+    rules.write_text("""\
+groups:
+  - name: app
+    rules:
+      - alert: HighErrorRate
+        expr: rate(http_errors_total[5m]) > 1
+        for: 5m
+        labels: {severity: critical}
+      - alert: HighErrorRate
+        expr: sum(rate(x[5m]) > 1
+        for: five minutes
+      - record: job:requests:rate5m
+        expr: sum(rate(http_requests_total[5m]))
+      - expr: up == 0
+""", encoding='utf-8')
+    assert validate_alert_rules(str(rules)) == [
+        'HighErrorRate: 告警名重复',
+        'HighErrorRate: 无法解析的 for: five minutes',
+        'HighErrorRate: 缺少 severity 标签',
+        'HighErrorRate: 表达式括号不配对',
+        'app: 规则缺少 alert/record 或 expr',
+    ]
+
+
+def test_exposition_parsing_and_cardinality_limits():
+    text = '# HELP up Up\nup 1\nrequests_total{route="/a",method="GET"} 3\nrequests_total{route="/b\\"x",method="GET"} 4\n'
+    assert parse_exposition(text) == {'up': [{}], 'requests_total': [{'route': '/a', 'method': 'GET'},
+                                                                     {'route': '/b\\"x', 'method': 'GET'}]}
+    series = {'wide': [{'user': str(i)} for i in range(101)], 'narrow': [{'route': '/a'}]}
+    assert find_high_cardinality(series) == ['wide{user}: 101 个取值']
+
+
+def test_simulated_metrics_have_one_histogram_per_route_method_and_status():
+    routes = [Route('/api/ideas', 'route', 'src/app/api/ideas/route.ts', ['GET', 'POST'], {}, False, []),
+              Route('/api/health', 'route', 'src/app/api/health/route.ts', [], {}, False, [])]
+    series = parse_exposition(simulated_app_metrics(routes))
+    # (GET and POST, plus GET for the route without handlers) x 3 statuses, 12 buckets each
+    assert len(series['http_request_duration_seconds_count']) == 9
+    assert len(series['http_request_duration_seconds_bucket']) == 9 * 12
+    assert series['process_resident_memory_bytes'] == [{}]
+
+
+def test_simulate_scrape_reads_the_stand_in_metrics():
+    pytest.importorskip('requests')
+    server = start_stand_in_server(metrics='up 1\nrequests_total{route="/a"} 2\n')
+    try:
+        scrape = simulate_scrape('http://%s:%d/metrics' % server.server_address, scrapes=2)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert (scrape['scrapes'], scrape['metrics'], scrape['series'], scrape['high_cardinality']) == (2, 2, 2, [])
+    assert scrape['payload_bytes'] == len('up 1\nrequests_total{route="/a"} 2\n')
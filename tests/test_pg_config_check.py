@@ -0,0 +1,104 @@
+import sys
+
+import pytest
+
+from compose_config import compose_services, container_ports
+from pg_config_check import AppService, PostgresService, check, database_services, hba_rules, shadowing_rule
+
+HBA = """\
+# TYPE  DATABASE  USER       ADDRESS         METHOD
+local   all       all                        peer
+host    appdb     app        10.0.0.0/8      scram-sha-256
+host    all       admin      0.0.0.0/0       scram-sha-256
+host    appdb     app        10.1.0.0/16     md5
+host    otherdb   app        10.1.0.0/16     md5
+hostssl appdb     app,admin  0.0.0.0/0       md5
+host    replication all      0.0.0.0  0.0.0.0  md5
+hostssl all       admin      192.168.1.0/24  md5
+"""
+
+
+def shadowed(text):
+    rules = hba_rules(text)
+    return {rule.line: earlier.line for rule in rules for earlier in [shadowing_rule(rules, rule)] if earlier}
+
+
+def test_hba_rule_is_shadowed_only_when_database_user_and_address_are_covered():
+    # line 5: same database and user inside line 3's network; line 6: other database, reachable;
+    # line 7: user app is not covered by line 4 (admin only); line 8: all does not match replication;
+    # line 9: admin on all databases from anywhere is already line 4, which also covers hostssl
+    assert shadowed(HBA) == {5: 3, 9: 4}
+
+
+def test_hba_rules_join_a_separate_netmask():
+    rule = next(rule for rule in hba_rules(HBA) if rule.line == 8)
+    assert (rule.address, rule.method) == ('0.0.0.0/0', 'md5')
+
+
+COMPOSE = """\
+services:
+  db:
+    image: postgres:15-alpine
+    volumes: ["./docker/postgres/postgresql.conf:/etc/postgresql/postgresql.conf"]
+    command: postgres -c config_file=/etc/postgresql/postgresql.conf
+    deploy: {resources: {limits: {memory: 2G, cpus: '2'}}}
+  app:
+    environment:
+      DATABASE_URL: postgresql://u:p@db:5432/app?connection_limit=7
+    deploy: {replicas: 2}
+    ports: ["8080:3000/tcp", {target: 9229}]
+  cache:
+"""
+
+
+@pytest.fixture
+def compose_dir(tmp_path, monkeypatch):
+    (tmp_path / 'docker-compose.yml').write_text(COMPOSE, encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_compose_services_feed_both_callers(compose_dir):
+    services = list(compose_services())
+    assert [(service.compose_file, service.name) for service in services] == \
+        [('docker-compose.yml', 'db'), ('docker-compose.yml', 'app'), ('docker-compose.yml', 'cache')]
+    assert list(container_ports(services[1].config)) == ['3000', '9229']
+    assert services[2].config == {}
+
+    postgres, apps = database_services()
+    assert [(service.name, service.memory, service.cpus, service.loads_conf) for service in postgres] == \
+        [('db', 2 * 1024 ** 3, 2.0, True)]
+    assert [(app.name, app.replicas, app.pool_size) for app in apps] == [('app', 2, 7)]
+
+
+def test_compose_services_report_missing_pyyaml(compose_dir, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'yaml', None)
+    with pytest.raises(RuntimeError, match='PyYAML'):
+        list(compose_services())
+
+
+def test_compose_numbers_are_interpolated_and_unparsable_ones_reported(tmp_path, monkeypatch):
+    compose = COMPOSE.replace("{replicas: 2}", "{replicas: '${APP_REPLICAS:-3}'}").replace("cpus: '2'", "cpus: lots")
+    (tmp_path / 'docker-compose.yml').write_text(compose, encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('APP_REPLICAS', raising=False)
+    postgres, apps = database_services()
+    assert [(app.replicas, app.unparsed) for app in apps] == [(3, ())]
+    assert [(service.cpus, service.unparsed) for service in postgres] == [(None, ('cpus = lots',))]
+
+    monkeypatch.setenv('APP_REPLICAS', 'many')
+    postgres, apps = database_services()
+    assert [(app.replicas, app.unparsed) for app in apps] == [(1, ('replicas = ${APP_REPLICAS:-3}',))]
+    findings, _ = check('', '', postgres, apps)
+    assert [finding.message for finding in findings if 'cannot parse' in finding.message] == [
+        'docker-compose.yml:db cpus = lots: cannot parse, the capacity check uses the default',
+        'docker-compose.yml:app replicas = ${APP_REPLICAS:-3}: cannot parse, the capacity check uses the default']
+
+
+def test_unparsable_connection_settings_are_findings_not_crashes():
+    postgres = [PostgresService('c.yml', 'db', 'postgres:15', None, None, True, True)]
+    apps = [AppService('c.yml', 'app', 1, 1.0, 5)]
+    findings, _ = check("max_connections = '${MAX_CONN}'\nmax_wal_senders = ten\n", '', postgres, apps)
+    assert [finding for finding in findings if finding.level == 'error'] == [
+        ('error', 'max_connections = ${MAX_CONN}: cannot parse number'),
+        ('error', 'max_wal_senders = ten: cannot parse number')]
@@ -0,0 +1,73 @@
+from prisma_index_advisor import CallSite, advise, check_prisma_queries, parse_schema
+
+SCHEMA = '''
+model File {
+  id        String   @id
+  userId    String
+  type      String
+  createdAt DateTime
+
+  @@index([type])
+}
+'''
+
+
+def site(line, equality=(), order=(), optional=(), op='findMany'):
+    return CallSite('src/lib/storage.ts', line, 'file', op, equality, (), order, optional)
+
+
+def test_optional_filters_stay_out_of_the_suggested_key():
+    models = parse_schema(SCHEMA)
+    missing, unused = advise(models, [site(10, ('userId',), ('createdAt',), ('type',)), site(20, ('userId',))])
+    assert [(item.shape, item.suggestion) for item in missing] == [
+        ('where userId', '@@index([userId])'),
+        ('where userId order createdAt (optional: type)', '@@index([userId, createdAt])')]
+    assert unused == []  # the type index serves the calls that pass a type
+
+
+def test_a_query_with_only_optional_filters_is_judged_by_its_sort():
+    models = parse_schema(SCHEMA)
+    missing, _ = advise(models, [site(10, order=('createdAt',), optional=('userId', 'type'))])
+    assert [(item.shape, item.suggestion, item.priority) for item in missing] == [
+        ('order createdAt (optional: type, userId)', '@@index([createdAt])', 'medium')]
+
+
+def prisma_where(content):
+    record = next(iter(check_prisma_queries('src/lib/q.ts', content)))
+    return record['where'], record['optional']
+
+
+def test_conditional_where_assignments_are_optional():
+    content = ("const where: any = { userId }\nwhere.deleted = false\n"
+               "if (filters.category) {where.category = filters.category}\n"
+               "if (filters.status) {\n  where.status = filters.status\n}\n"
+               "if (filters.since) where.createdAt = { gte: filters.since }\n"
+               "prisma.idea.findMany({ where, orderBy: { createdAt: 'desc' } })\n")
+    assert prisma_where(content) == ([['userId', 'eq'], ['deleted', 'eq'], ['category', 'eq'], ['status', 'eq'],
+                                      ['createdAt', 'range']], ['category', 'status', 'createdAt'])
+
+
+def test_conditional_spreads_are_optional():
+    content = ("prisma.file.findMany({ where: { userId, ...(type && { type }), "
+               "...(q ? { name: { startsWith: q } } : {}) } })\n")
+    assert prisma_where(content) == ([['userId', 'eq'], ['type', 'eq'], ['name', 'range']], ['type', 'name'])
+
+
+def test_a_field_both_required_and_conditional_stays_required():
+    content = "const where = { status: 'OPEN' }\nif (x) { where.status = x }\nprisma.task.count({ where })\n"
+    assert prisma_where(content) == ([['status', 'eq']], [])
+
+
+def test_each_call_uses_the_where_declared_in_its_own_handler():
+    content = ("export async function GET() {\n  const where: any = { userId }\n"
+               "  return prisma.idea.findMany({ where })\n}\n"
+               "export async function POST() {\n  const where: any = {}\n"
+               "  if (c) { where.category = c }\n  return prisma.idea.count({ where })\n}\n"
+               "export async function PUT() {\n  const where = ({ AND: [{ status: 'OPEN' }] }) as Prisma.IdeaWhereInput\n"
+               "  await prisma.idea.updateMany({ where, data })\n"
+               "  const other = id ? { id } : {}\n  const where2 = other\n  return prisma.idea.findFirst({ where: other })\n}\n"
+               "function later() { where.status = s }\n")
+    records = list(check_prisma_queries('src/app/api/ideas/route.ts', content))
+    assert [(record['where'], record['optional'], record['resolved']) for record in records] == [
+        ([['userId', 'eq']], [], True), ([['category', 'eq']], ['category'], True),
+        ([['status', 'eq']], [], True), ([], [], False)]
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+import report_store
+from report_store import add_run, compare, connect, flatten, ingest, latest_pairs, run_values, trend
+
+
+def test_flatten_keeps_measurements_and_drops_payloads():
+    report = {'api': {'status': 200, 'responseTime': 120, 'ok': True, 'headers': {'x': '1'},
+                      'errors': ['a', 'b'], 'timestamp': '2025-01-01T00:00:00Z', 'state': 'healthy'}}
+    assert sorted(flatten(report)) == [('api.errors.count', 2.0, None), ('api.ok', 1.0, None),
+                                       ('api.responseTime', 120.0, None), ('api.state', None, 'healthy'),
+                                       ('api.status', 200.0, None)]
+
+
+def test_compare_reports_only_changes_for_the_worse():
+    before = {'api.ok': 1.0, 'api.status': 200.0, 'api.responseTime': 100.0, 'health.status': 'healthy',
+              'errors.count': 0.0, 'throughput_rps': 100.0, 'db.connected': 1.0, 'fast_ms': 10.0}
+    after = {'api.ok': 0.0, 'api.status': 503.0, 'api.responseTime': 400.0, 'health.status': 'degraded',
+             'errors.count': 2.0, 'throughput_rps': 50.0, 'fast_ms': 20.0}
+    changes = compare(before, after)
+    assert {change.key: change.kind for change in changes} == {
+        'api.ok': 'flag', 'api.status': 'http', 'api.responseTime': 'latency', 'health.status': 'status',
+        'errors.count': 'failures', 'throughput_rps': 'throughput'}
+    assert [change.kind for change in changes][-2:] == ['latency', 'throughput']  # slowdowns after breakage
+    assert compare(after, before) == []
+
+
+def test_ingest_skips_unchanged_files_and_replaces_changed_ones(tmp_path):
+    db = connect(str(tmp_path / 'reports.sqlite3'))
+    path = tmp_path / 'production-check-2025-01-01T00-00-00Z.json'
+    path.write_text(json.dumps({'url': 'https://site/', 'checks': {'api': {'responseTime': 100}}}), encoding='utf-8')
+    assert ingest(db, [str(path)]) == (1, 0)
+    assert ingest(db, [str(path)]) == (0, 1)
+
+    path.write_text(json.dumps({'url': 'https://site/', 'checks': {'api': {'responseTime': 900}}}), encoding='utf-8')
+    os.utime(path, ns=(1, 1))
+    assert ingest(db, [str(path)]) == (1, 0)
+    runs = db.execute('SELECT id, source, url FROM runs').fetchall()
+    assert [(source, url) for _, source, url in runs] == [('production-check', 'https://site')]
+    assert run_values(db, runs[0][0]) == {'api.responseTime': 900.0}
+
+
+def test_regressions_command_compares_the_latest_two_runs_per_series(tmp_path, monkeypatch, capsys):
+    db_path = str(tmp_path / 'reports.sqlite3')
+    db = connect(db_path)
+    with db:
+        add_run(db, 'loadtest', '2025-01-01T00:00:00', [('latency.p99_ms', 100.0, None)], 'http://a')
+        add_run(db, 'loadtest', '2025-01-02T00:00:00', [('latency.p99_ms', 300.0, None)], 'http://a/')
+        add_run(db, 'loadtest', '2025-01-02T00:00:00', [('latency.p99_ms', 100.0, None)], 'http://b')
+    assert len(latest_pairs(db)) == 1
+    assert trend(db, 'p99')[('loadtest', 'http://a', 'latency.p99_ms')] == [('2025-01-01T00:00:00', 100.0),
+                                                                         ('2025-01-02T00:00:00', 300.0)]
+    db.close()
+
+    monkeypatch.setattr(sys, 'argv', ['report_store.py', '--db', db_path, 'regressions'])
+    assert report_store.main() == 1
+    output = capsys.readouterr().out
+    assert 'loadtest http://a: 2025-01-01T00:00:00 -> 2025-01-02T00:00:00: 1 regressions' in output
+    assert '[latency] latency.p99_ms: 100 -> 300' in output
+
+
+def test_append_report_records_an_in_process_run(tmp_path):
+    db_path = str(tmp_path / 'sub' / 'reports.sqlite3')
+    run_id = report_store.append_report('loadtest', {'throughput_rps': 12.5, 'routes': {}}, 'http://a', db_path)
+    db = connect(db_path)
+    assert run_values(db, run_id) == {'throughput_rps': 12.5}
+
+
+def test_report_db_path_follows_the_environment(monkeypatch):
+    import importlib
+    monkeypatch.setenv('REPORT_STORE_DB', '/tmp/ci/reports.sqlite3')
+    try:
+        assert importlib.reload(report_store).REPORT_DB == '/tmp/ci/reports.sqlite3'
+    finally:
+        monkeypatch.delenv('REPORT_STORE_DB')
+        importlib.reload(report_store)
+    assert report_store.REPORT_DB == os.path.join('.reports', 'reports.sqlite3')
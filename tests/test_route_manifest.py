@@ -0,0 +1,47 @@
+import os
+
+from route_manifest import build_manifest, url_for
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_url_for_drops_groups_and_slots_and_rejects_private_segments():
+    app = os.path.join('src', 'app')
+    assert url_for(app, app) == '/'
+    assert url_for(app, os.path.join(app, '(admin)', '@modal', 'api', 'agents', '[id]')) == '/api/agents/[id]'
+    assert url_for(app, os.path.join(app, 'api', '_lib', 'helpers')) is None
+
+
+def test_build_manifest_records_routes_methods_and_layout_config(tmp_path):
+    app = tmp_path / 'app'
+    write(app / 'layout.tsx', "export const runtime = 'nodejs'\nexport default function L() {}\n")
+    write(app / 'api' / 'layout.tsx', "export const dynamic = 'force-dynamic'\nexport default function L() {}\n")
+    write(app / 'api' / 'items' / '[id]' / 'route.ts',
+          "export const revalidate = 60\nexport async function GET() {}\nexport async function DELETE() {}\n")
+    write(app / 'api' / '_private' / 'route.ts', "export async function GET() {}\n")
+    write(app / 'page.tsx', "export default function P() {}\n")
+
+    manifest = build_manifest(str(app), cache_path=None)
+
+    assert [(route.route, route.kind) for route in manifest.routes] == [('/', 'page'), ('/api/items/[id]', 'route')]
+    route = manifest.find('/api/items/[id]')
+    assert route.methods == ['GET', 'DELETE']
+    assert route.layouts == [str(app / 'layout.tsx'), str(app / 'api' / 'layout.tsx')]
+    assert manifest.segment_config(route, 'revalidate') == '60'
+    assert manifest.segment_config(route, 'dynamic') == 'force-dynamic'
+    assert manifest.segment_config(route, 'runtime') == 'nodejs'
+    assert manifest.segment_config(route, 'fetchCache') is None
+
+
+def test_build_manifest_refreshes_changed_files_from_cache(tmp_path):
+    app = tmp_path / 'app'
+    route_file = app / 'api' / 'ping' / 'route.ts'
+    write(route_file, "export async function GET() {}\n")
+    cache_path = str(tmp_path / 'routes.json')
+    assert build_manifest(str(app), cache_path).find('/api/ping').methods == ['GET']
+
+    write(route_file, "export async function GET() {}\nexport async function POST() {}\n")
+    assert build_manifest(str(app), cache_path).find('/api/ping').methods == ['GET', 'POST']
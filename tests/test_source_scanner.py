@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+
+from source_scanner import (HOOK_IMPORT_RULE, ResultCache, ScanRule, build_import_table, check_hook_imports,
+                            check_search_params, scan)
+
+
+def hook_findings(content):
+    return list(check_hook_imports('src/components/C.tsx', content))
+
+
+def test_hook_imports_resolve_named_and_namespace_imports():
+    content = ("import React, {\n  useState,\n  useEffect as useMountEffect,\n} from 'react'\n"
+               "import * as R from 'react'\n"
+               "export function C() { useState(0); useMountEffect(() => {}); R.useMemo(() => 1, []); "
+               "React.useRef(null) }\n")
+    assert hook_findings(content) == []
+
+
+def test_hook_imports_report_missing_hooks_once():
+    content = "export function C() { useState(0); useState(1); useThing() }\n"
+    assert hook_findings(content) == ['uses useState but not imported',
+                                      'uses custom hook useThing but it is neither imported nor defined']
+
+
+def test_hook_imports_ignore_comments_and_strings():
+    assert hook_findings("// useState(0)\nconst s = 'useEffect()'\n") == []
+
+
+def test_hook_passed_as_a_parameter_is_bound():
+    assert hook_findings("function C({ useThing }) { useThing() }\n") == []
+    assert hook_findings("const C = ({ useThing }: Props): JSX.Element => { return useThing() }\n") == []
+    assert hook_findings("const C = (useThing) => useThing()\n") == []
+    assert hook_findings("const C = useThing => useThing()\n") == []
+    assert 'useThing' in build_import_table("function C({ useThing }) { useThing() }").declared
+
+
+def test_condition_is_not_a_parameter_list():
+    assert hook_findings("if (useThing()) { run() }\n") == \
+        ['uses custom hook useThing but it is neither imported nor defined']
+
+
+def test_method_definitions_are_not_hook_calls():
+    content = ("class Store {\n  useFoo() { return 1 }\n  useBar(a: number, b = f()): string {\n"
+               "    return this.useFoo() + ''\n  }\n}\nconst o = { useBaz() { return 2 } }\n")
+    assert build_import_table(content).calls == [('this', 'useFoo')]
+    assert hook_findings(content) == []
+
+
+def test_result_cache_concurrent_saves_do_not_collide(tmp_path):
+    source = tmp_path / 'a.ts'
+    source.write_text('x', encoding='utf-8')
+    cache_path = str(tmp_path / 'cache' / 'routes.json')
+    stat = os.stat(source)
+    errors = []
+    start = threading.Barrier(8)
+
+    def save(n):
+        cache = ResultCache(cache_path)
+        cache.put(str(source), stat, 'rule', [n])
+        start.wait()
+        try:
+            for _ in range(20):
+                cache.dirty = True
+                cache.save()
+        except Exception as e:  # pragma: no cover - the failure being tested for
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert os.listdir(tmp_path / 'cache') == ['routes.json']
+    with open(cache_path, encoding='utf-8') as f:
+        assert json.load(f)['files'][str(source)][2]['rule'][0] in range(8)
+
+
+def test_result_cache_is_versioned_on_the_rule_sources(tmp_path):
+    source, rules = tmp_path / 'a.ts', tmp_path / 'rules.py'
+    source.write_text('x', encoding='utf-8')
+    rules.write_text('A = 1\n', encoding='utf-8')
+    cache_path = str(tmp_path / 'cache.json')
+    cache = ResultCache(cache_path, sources=[str(rules)])
+    cache.put(str(source), os.stat(source), 'rule', ['found'])
+    cache.save()
+
+    assert ResultCache(cache_path, sources=[str(rules)]).get(str(source), os.stat(source), 'rule') == ['found']
+    rules.write_text('A = 2\n', encoding='utf-8')
+    assert ResultCache(cache_path, sources=[str(rules)]).get(str(source), os.stat(source), 'rule') is None
+
+
+def make_sources(root, count=6):
+    for n in range(count):
+        call = 'useSearchParams()' if n % 2 else 'null'
+        (root / f'c{n}.tsx').write_text(f'export function C{n}() {{ return {call} }}\n', encoding='utf-8')
+
+
+SEARCH_RULE = ScanRule('search', check_search_params, needle='useSearchParams')
+
+
+def test_scan_pool_matches_serial_scan(tmp_path):
+    make_sources(tmp_path)
+    serial = scan([SEARCH_RULE, HOOK_IMPORT_RULE], str(tmp_path))
+    pooled = scan([SEARCH_RULE, HOOK_IMPORT_RULE], str(tmp_path), workers=3)
+
+    assert pooled == serial
+    assert [os.path.basename(finding.path) for finding in serial['search']] == ['c1.tsx', 'c3.tsx', 'c5.tsx']
+
+
+def test_scan_reuses_cached_results_for_unchanged_files(tmp_path):
+    (tmp_path / 'src').mkdir()
+    make_sources(tmp_path / 'src')
+    cache_path = str(tmp_path / 'cache.json')
+    first = ResultCache(cache_path)
+    expected = scan([SEARCH_RULE], str(tmp_path / 'src'), cache=first)
+    first.save()
+
+    calls = []
+    counting = ScanRule('search', lambda path, content: calls.append(path) or check_search_params(path, content))
+    (tmp_path / 'src' / 'c0.tsx').write_text('useSearchParams()', encoding='utf-8')
+    second = ResultCache(cache_path)
+    result = scan([counting], str(tmp_path / 'src'), cache=second)
+
+    assert calls == [str(tmp_path / 'src' / 'c0.tsx')]
+    assert len(result['search']) == len(expected['search']) + 1
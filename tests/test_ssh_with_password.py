@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+import zlib
+
+import pytest
+
+from ssh_with_password import (LocalStandIn, fan_out, local_manifest, main_multiplexed, main_transfer,
+                               transfer_to_host, upload_stream)
+
+
+def test_fan_out_runs_every_host_over_its_own_connection(capsys):
+    results = fan_out([LocalStandIn('a'), LocalStandIn('b')], ['echo "$MUX_HOST up"'])
+    assert results == {'a': 0, 'b': 0}
+    output = capsys.readouterr().out
+    assert '[a] a up' in output and '[b] b up' in output
+
+
+def test_fan_out_rejects_a_host_given_twice():
+    with pytest.raises(ValueError, match='host given more than once: a'):
+        fan_out([LocalStandIn('a'), LocalStandIn('b'), LocalStandIn('a')], ['true'])
+
+
+@pytest.mark.parametrize('main, extra', [(main_multiplexed, ['-c', 'true']),
+                                         (main_transfer, ['--remote-dir', '/srv/app', 'src'])])
+def test_duplicate_host_flags_are_rejected_before_anything_runs(main, extra, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--stand-in', '--host', 'a', '--host', 'b', '--host', 'a', *extra])
+    assert exit_info.value.code == 2
+    assert '--host given more than once: a' in capsys.readouterr().err
+
+
+def build(root, **files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return local_manifest(str(root), ['app'], [], chunk_size=4)
+
+
+def transfer(root, manifest, base, release):
+    return transfer_to_host(LocalStandIn('web'), str(root), manifest, str(base), release, 3, sys.executable, None)
+
+
+def test_local_manifest_skips_excluded_paths(tmp_path):
+    build(tmp_path, **{'app/a.txt': b'12345678', 'app/cache/x': b'x'})
+    manifest = local_manifest(str(tmp_path), ['app'], ['app/cache/*'], chunk_size=4)
+    assert list(manifest['files']) == ['app/a.txt']
+    assert len(manifest['files']['app/a.txt']['chunks']) == 2
+
+
+def test_upload_stream_sends_only_chunks_the_host_lacks(tmp_path):
+    manifest = build(tmp_path, **{'app/a.txt': b'aaaabbbb', 'app/b.txt': b'bbbbcccc'})
+    nothing = b''.join(upload_stream(str(tmp_path), manifest, {'files': {}}))
+    remote = {'files': {'app/a.txt': manifest['files']['app/a.txt']}}
+    delta = zlib.decompress(b''.join(upload_stream(str(tmp_path), manifest, remote)))
+    assert delta.endswith(json.dumps(manifest).encode('utf-8') + b'cccc')
+    assert len(zlib.decompress(nothing)) == len(delta) + 8  # aaaa and bbbb once each
+
+
+def test_transfer_switches_current_and_reuses_the_previous_release(tmp_path, capsys):
+    base = tmp_path / 'srv'
+    first = build(tmp_path / 'build', **{'app/a.txt': b'aaaabbbb', 'app/b.txt': b'cccc'})
+    assert transfer(tmp_path / 'build', first, base, 'r1') == 0
+
+    second = build(tmp_path / 'build', **{'app/b.txt': b'ccccdddd'})
+    assert transfer(tmp_path / 'build', second, base, 'r2') == 0
+    assert os.path.islink(base / 'current') and os.readlink(base / 'current') == os.path.join('releases', 'r2')
+    assert (base / 'current' / 'app' / 'b.txt').read_bytes() == b'ccccdddd'
+    assert os.path.samefile(base / 'releases' / 'r1' / 'app' / 'a.txt', base / 'releases' / 'r2' / 'app' / 'a.txt')
+    assert '1 unchanged, 0.00 MiB new' in capsys.readouterr().out
+
+
+def test_transfer_refuses_an_existing_release_before_uploading(tmp_path, capsys):
+    base = tmp_path / 'srv'
+    manifest = build(tmp_path / 'build', **{'app/a.txt': b'aaaa'})
+    assert transfer(tmp_path / 'build', manifest, base, 'r1') == 0
+    capsys.readouterr()
+
+    assert transfer(tmp_path / 'build', manifest, base, 'r1') == 1
+    output = capsys.readouterr().out
+    assert 'release r1 already exists on the host' in output and 'nothing uploaded' in output
+    assert sorted(os.listdir(base / 'releases')) == ['r1']
+
+
+def test_transfer_refuses_a_real_current_directory(tmp_path, capsys):
+    base = tmp_path / 'srv'
+    (base / 'current').mkdir(parents=True)
+    manifest = build(tmp_path / 'build', **{'app/a.txt': b'aaaa'})
+
+    assert transfer(tmp_path / 'build', manifest, base, 'r1') == 1
+    assert 'is a real directory, not a release symlink' in capsys.readouterr().out
+    assert not os.path.exists(base / 'releases')